@@ -0,0 +1,184 @@
+# gis_auditor_report/core/audit_history.py
+
+import hashlib
+import json
+import sqlite3
+from datetime import datetime
+
+from .diagnostics import check_label
+from .result_store import iter_errors
+
+# Column holding the value that identifies an error of each check type
+VALUE_COLUMNS = {
+    'duplicate': 'value',
+    'spatial': 'child_id',
+    'exclusion': 'target_id',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    project TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    report_path TEXT,
+    error_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS runs_project_config ON runs (project, config_hash, run_id);
+
+CREATE TABLE IF NOT EXISTS errors (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    error_key TEXT NOT NULL,
+    check_type TEXT NOT NULL,
+    check_label TEXT NOT NULL,
+    value TEXT,
+    fid INTEGER,
+    count INTEGER
+);
+CREATE INDEX IF NOT EXISTS errors_run_key ON errors (run_id, error_key);
+"""
+
+# An error of one run is matched to the other run through the (run_id, error_key) index
+_MATCH = "EXISTS (SELECT 1 FROM errors other WHERE other.run_id = :other AND other.error_key = e.error_key)"
+DIFF_QUERIES = {
+    'new': f"SELECT {{columns}} FROM errors e WHERE e.run_id = :run AND NOT {_MATCH}",
+    'resolved': f"SELECT {{columns}} FROM errors e WHERE e.run_id = :run AND NOT {_MATCH}",
+    'persisting': f"SELECT {{columns}} FROM errors e WHERE e.run_id = :run AND {_MATCH}",
+}
+ERROR_COLUMNS = ('check_type', 'check_label', 'value', 'fid', 'count')
+
+# Keys of a check configuration that hold a layer ID
+LAYER_KEYS = ('layer_id', 'parent_id', 'child_id', 'target_id', 'exclusion_id')
+
+
+def config_hash(all_configs: list, layer_sources: dict = None) -> str:
+    """
+    Hash of the check configurations, runs of the same audit share it.
+    With layer_sources (layer ID -> data source) the layers are hashed by their source,
+    their IDs change whenever the layers are loaded again, e.g. in every batch run.
+    """
+    if layer_sources:
+        all_configs = [{key: layer_sources.get(value, value) if key in LAYER_KEYS else value
+                        for key, value in config.items()} for config in all_configs]
+    text = json.dumps(all_configs, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _text(value):
+    """NULL (None or QGIS NULL) stays NULL, anything else is stored as text."""
+    if value is None or getattr(value, 'isNull', None) is not None and value.isNull():
+        return None
+    return str(value)
+
+
+class AuditHistory:
+    """
+    SQLite store of the errors of every audit run, one row per error.
+
+    An error is identified across runs by its error_key: the check type, the
+    check (e.g. 'poles in sites') and the ID value, or the duplicated value.
+    Feature IDs are kept for reference but not compared, they may change when
+    a layer is rewritten. Diffs between two runs are NOT EXISTS queries on the
+    (run_id, error_key) index, so they only read the rows of the two runs.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # Several batch processes may write the same history, wait for each other's locks
+        self.connection = sqlite3.connect(db_path, timeout=60)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _error_rows(results: dict):
+        """Yields (error_key, check_type, check_label, value, fid, count) for every error of the results."""
+        for check_type, value_column in VALUE_COLUMNS.items():
+            for check_result in results.get(check_type, []):
+                label = check_label(check_result)
+                if check_type == 'duplicate':
+                    rows = ((value, None, count) for value, count in
+                            iter_errors(check_result.get('errors', []), 'value', 'count'))
+                else:
+                    rows = ((value, fid, None) for value, fid in
+                            iter_errors(check_result.get('errors', []), value_column, 'fid'))
+                for value, fid, count in rows:
+                    value = _text(value)
+                    error_key = f"{check_type}\x1f{label}\x1f{value if value is not None else ''}"
+                    yield error_key, check_type, label, value, fid, count
+
+    def record_run(self, project: str, configs_hash: str, results: dict, report_path: str = None,
+                   started_at: str = None) -> int:
+        """
+        Stores one run and all its errors in a single transaction. Returns the run ID.
+        """
+        started_at = started_at or datetime.now().isoformat(timespec='seconds')
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (project, config_hash, started_at, report_path) VALUES (?, ?, ?, ?)",
+                (project, configs_hash, started_at, report_path))
+            run_id = cursor.lastrowid
+            cursor.executemany(
+                "INSERT INTO errors (run_id, error_key, check_type, check_label, value, fid, count) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((run_id,) + row for row in self._error_rows(results)))
+            cursor.execute("UPDATE runs SET error_count = (SELECT COUNT(*) FROM errors WHERE run_id = ?) "
+                           "WHERE run_id = ?", (run_id, run_id))
+        print(f"[DEBUG] Audit run {run_id} recorded in {self.db_path}")
+        return run_id
+
+    def runs(self, project: str = None, configs_hash: str = None) -> list:
+        """The recorded runs, oldest first, optionally of one project and configuration."""
+        query = "SELECT run_id, project, config_hash, started_at, report_path, error_count FROM runs"
+        conditions, parameters = [], []
+        if project is not None:
+            conditions.append("project = ?")
+            parameters.append(project)
+        if configs_hash is not None:
+            conditions.append("config_hash = ?")
+            parameters.append(configs_hash)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY run_id"
+        columns = ('run_id', 'project', 'config_hash', 'started_at', 'report_path', 'error_count')
+        return [dict(zip(columns, row)) for row in self.connection.execute(query, parameters)]
+
+    def previous_run(self, run_id: int):
+        """ID of the run before run_id of the same project and configuration, None if it is the first."""
+        row = self.connection.execute(
+            "SELECT previous.run_id FROM runs current JOIN runs previous "
+            "ON previous.project = current.project AND previous.config_hash = current.config_hash "
+            "AND previous.run_id < current.run_id "
+            "WHERE current.run_id = ? ORDER BY previous.run_id DESC LIMIT 1", (run_id,)).fetchone()
+        return row[0] if row else None
+
+    def _diff_query(self, kind: str, columns: str, old_run_id: int, new_run_id: int):
+        if kind not in DIFF_QUERIES:
+            raise ValueError(f"Unknown diff kind '{kind}', expected one of {', '.join(DIFF_QUERIES)}")
+        # Resolved errors are in the old run and not in the new one, the others the other way round
+        run, other = (old_run_id, new_run_id) if kind == 'resolved' else (new_run_id, old_run_id)
+        return self.connection.execute(DIFF_QUERIES[kind].format(columns=columns), {'run': run, 'other': other})
+
+    def diff_counts(self, old_run_id: int, new_run_id: int) -> dict:
+        """Number of new, resolved and persisting errors between two runs."""
+        return {kind: self._diff_query(kind, "COUNT(*)", old_run_id, new_run_id).fetchone()[0]
+                for kind in DIFF_QUERIES}
+
+    def diff_errors(self, old_run_id: int, new_run_id: int, kind: str):
+        """
+        Yields the 'new', 'resolved' or 'persisting' errors between two runs as
+        dictionaries of check_type, check_label, value, fid and count.
+        """
+        cursor = self._diff_query(kind, ", ".join(f"e.{column}" for column in ERROR_COLUMNS), old_run_id, new_run_id)
+        for row in cursor:
+            yield dict(zip(ERROR_COLUMNS, row))
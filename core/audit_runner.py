@@ -1,11 +1,21 @@
 # gis_auditor_report/core/audit_runner.py
 
-from qgis.PyQt.QtCore import QObject, pyqtSignal
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from qgis.PyQt.QtCore import QObject, Qt, QThread, pyqtSignal
 from qgis.PyQt.QtWidgets import QProgressBar
+from qgis.core import QgsApplication, QgsFeedback, QgsProject
 from .check.duplicate_check import DuplicateCheck # Corrected import path
 from .check.spatial_check import SpatialCheck
 from .check.exclusion_check import ExclusionCheck
+from .check.base_check import scan_request
 from .report_generator import ReportGenerator # type: ignore
+from .audit_task import AuditTask
+from .diagnostics import diagnostics_rows, timed_features
+from .error_export import ErrorLayerExporter, error_layer_path
+from .audit_history import AuditHistory, config_hash
 
 
 
@@ -20,7 +30,7 @@ class AuditRunner(QObject):
     finished = pyqtSignal()
     report_generated = pyqtSignal(str) 
 
-    def __init__(self, all_configs: list, progress_bar: QProgressBar, report_path: str,report_config: dict, parent=None):
+    def __init__(self, all_configs: list, progress_bar: QProgressBar, report_path: str,report_config: dict, parent=None, max_workers: int = None, memory_limit_mb: float = None, history_path: str = None):
         super().__init__(parent)
         self.all_configs = all_configs
         self.progress_bar = progress_bar
@@ -28,6 +38,23 @@ class AuditRunner(QObject):
         self.total_checks = len(all_configs)
         self.current_check_count = 0
         self.report_config = report_config 
+        self.checks = []
+        self.task = None
+        # Number of checks allowed to run at the same time in the background task
+        self.max_workers = max_workers or QThread.idealThreadCount()
+        # Memory ceiling of the duplicate counts of this audit, None for no limit
+        self.memory_limit_mb = memory_limit_mb
+        # GeoPackage of the failing features, set when the report config asks for it
+        self.error_layer_path = None
+        self.error_exporter = None
+        # SQLite audit history every run is recorded in, None to keep no history
+        self.history_path = history_path
+        self.history_run_id = None
+        # Project and configuration hash the run is recorded under, taken with the checks
+        self.history_project = None
+        self.history_config_hash = None
+        # Exception raised while writing the report of the last run, None if it was written
+        self.report_failure = None
         
    
         self.results = {
@@ -38,51 +65,268 @@ class AuditRunner(QObject):
 
         
     def run_checks(self):
-        """Initiates the execution of all configured checks sequentially."""
+        """Initiates the execution of all configured checks on the calling thread."""
         
         if not self.all_configs:
             self.finished.emit()
             return
 
-        self.progress_bar.setMaximum(self.total_checks)
-        self.progress_bar.setValue(0)
-        
-        for config in self.all_configs:
-            self.current_check_count += 1
-            self._execute_single_check(config)
-            
-            # Update the progress bar to show task completion
-            self.progress_bar.setValue(self.current_check_count)
+        self._create_checks()
+
+        self._set_progress(0)
+
+        feedback = QgsFeedback()
+        feedback.progressChanged.connect(self._set_progress)
+
+        # With a progress bar a single worker keeps everything on this thread, widgets must not be
+        # touched from others. Without one (batch mode) the checks can run in parallel
+        self.execute_checks(feedback, max_workers=1 if self.progress_bar is not None else None)
+        self._set_progress(100)
             
         # All checks completed
         self._generate_report()
+        if self.history_path:
+            self.record_history()
+        self._load_outputs()
+
+        # In batch mode (no progress bar) nobody reads the console, the caller has to see the failure
+        if self.report_failure is not None and self.progress_bar is None:
+            raise RuntimeError(f"Report could not be written to {self.report_path}: {self.report_failure}")
+
         self.report_generated.emit(self.report_path) 
+        self.finished.emit()
+
+    def run_checks_in_background(self):
+        """
+        Initiates the execution of all configured checks in a QgsTask,
+        so the QGIS window stays responsive while the audit runs.
+        report_generated is emitted once the task has finished successfully.
+        """
+        if not self.all_configs:
+            self.finished.emit()
+            return
+
+        # Layers must be looked up on the main thread, so create the checks before handing over
+        self._create_checks()
+
+        self._set_progress(0)
+
+        # Keep a reference to the task, otherwise Python garbage collects it while running
+        self.task = AuditTask(self, f"GIS Audit: {self.report_config.get('site_code', '')}")
+        self.task.progressChanged.connect(self._set_progress)
+        QgsApplication.taskManager().addTask(self.task)
+
+    def cancel(self):
+        """Cancels the background audit, if one is running."""
+        if self.task:
+            self.task.cancel()
+
+    def execute_checks(self, feedback, max_workers: int = None) -> bool:
+        """
+        Runs all the prepared checks, reporting into feedback. Called from the worker
+        thread of AuditTask. Checks streaming the same layer share a single scan, and
+        up to max_workers scans run at the same time, each one reading from its own
+        feature source snapshots. The error layer, if asked for, is written afterwards
+        from the same snapshots. Returns False if cancelled.
+        """
+        check_count = len(self.checks)
+        if check_count == 0:
+            return True
+
+        scan_groups = self._plan_scans()
+        group_count = len(scan_groups)
+        check_results = [None] * check_count
+        group_progress = [0.0] * group_count
+
+        def report_progress(group_index, progress):
+            # Overall progress is the average of all scans
+            group_progress[group_index] = progress
+            feedback.setProgress(sum(group_progress) / group_count)
+
+        def run_group(group_index):
+            if feedback.isCanceled():
+                return
+            # Every scan gets its own feedback, cancelling the task cancels all of them
+            group_feedback = QgsFeedback()
+            group_feedback.progressChanged.connect(lambda progress: report_progress(group_index, progress))
+            feedback.canceled.connect(group_feedback.cancel, Qt.DirectConnection)
+
+            check_indexes = scan_groups[group_index]
+            if len(check_indexes) == 1:
+                group_results = [self._execute_single_check(self.checks[check_indexes[0]], group_feedback)]
+            else:
+                group_results = self._execute_fused_scan([self.checks[i] for i in check_indexes], group_feedback)
+
+            for check_index, check_result in zip(check_indexes, group_results):
+                check_results[check_index] = check_result
+            report_progress(group_index, 100.0)
+
+        workers = min(max_workers or self.max_workers, group_count)
+        if workers > 1:
+            print(f"[DEBUG] Running {group_count} scans with {workers} workers")
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # list() re-raises the first exception of a scan, if any
+                list(executor.map(run_group, range(group_count)))
+        else:
+            for group_index in range(group_count):
+                run_group(group_index)
+
+        if feedback.isCanceled():
+            return False
+
+        # Merge in configuration order, so the report doesn't depend on which check finished first
+        for check_result in check_results:
+            self._store_result(check_result)
+            self.current_check_count += 1
+
+        # With {'error_layer': True} the failing features are written to <report>_errors.gpkg,
+        # still in the worker thread: the exporter reads the snapshots of the checks
+        if self.error_exporter:
+            self.export_error_layer(feedback)
+
+        return not feedback.isCanceled()
+
+    def _plan_scans(self) -> list:
+        """
+        Planning stage: groups the checks by the layer they stream, so every layer
+        is read with a single getFeatures() pass however many checks use it.
+        Returns lists of check indexes, in order of first appearance.
+        """
+        groups = {}
+        for index, checker in enumerate(self.checks):
+            layer_id = checker.scan_layer_id()
+            # Checks with an invalid layer can't share anything, they run alone and report it
+            key = layer_id if layer_id else f"invalid_{index}"
+            groups.setdefault(key, []).append(index)
+
+        for key, check_indexes in groups.items():
+            if len(check_indexes) > 1:
+                print(f"[DEBUG] Layer {key} is scanned once for {len(check_indexes)} checks")
+        return list(groups.values())
+
+    def _on_task_finished(self, result: bool, exception=None):
+        """Called on the main thread when the background task is done."""
+        self.task = None
+
+        if exception:
+            print(f"[ERROR] Audit task failed: {exception}")
+        elif not result:
+            print("[DEBUG] Audit task was cancelled, no report generated")
+        else:
+            # The report and the audit history were written by the task already
+            self._set_progress(100)
+            self._load_outputs()
+            self.report_generated.emit(self.report_path)
 
-    def _execute_single_check(self, config: dict):
-        """Dispatches a single check configuration to the appropriate check class."""
+        self.finished.emit()
+
+    def _create_check(self, config: dict):
+        """Creates the check class matching a single check configuration."""
         
         check_type = config.get('check_type') # Changed from 'type' to 'check_type' to match dialog
         
         if check_type == 'duplicate':
-            checker = DuplicateCheck(config)
-            check_result = checker.run()
-            # Append the result dictionary to the correct list
-            self.results['duplicate'].append(check_result)
+            if self.memory_limit_mb and not config.get('memory_limit_mb'):
+                # The audit wide limit applies unless the check sets its own
+                config = dict(config, memory_limit_mb=self.memory_limit_mb)
+            return DuplicateCheck(config)
             
         elif check_type == 'spatial':
-            checker = SpatialCheck(config)
-            check_result = checker.run()
-            self.results['spatial'].append(check_result)
-
+            return SpatialCheck(config)
 
         elif check_type == 'exclusion':
-            checker = ExclusionCheck(config)
-            check_result = checker.run()
-            self.results['exclusion'].append(check_result)
+            return ExclusionCheck(config)
+
+        print(f"[WARNING] Unknown check type: {check_type}")
+        return None
+
+    def _set_progress(self, progress: float):
+        """Shows the overall progress in percent, if the runner has a progress bar (not in batch mode)."""
+        if self.progress_bar is None:
+            return
+        self.progress_bar.setMaximum(100)
+        self.progress_bar.setValue(int(progress))
+
+    def _create_checks(self):
+        """Creates the check objects of all configurations, must be called on the main thread."""
+        self.checks = [c for c in (self._create_check(config) for config in self.all_configs) if c]
+
+        # The exporter takes the names and CRS of the failing layers here, on the main thread
+        self.error_exporter = None
+        if self.report_config.get('error_layer'):
+            self.error_layer_path = error_layer_path(self.report_path)
+            self.error_exporter = ErrorLayerExporter(self.error_layer_path)
+            self.error_exporter.add_checks(self.checks)
+
+        # The history groups runs by project and configuration. Layers are hashed by their
+        # data source, the batch mode loads them with new IDs every run
+        if self.history_path:
+            project = QgsProject.instance()
+            layer_sources = {layer_id: layer.source() for layer_id, layer in project.mapLayers().items()}
+            self.history_project = project.fileName() or self.report_config.get('site_code', '')
+            self.history_config_hash = config_hash(self.all_configs, layer_sources)
+
+    def _execute_single_check(self, checker, feedback=None) -> dict:
+        """Runs a single check and returns its result dictionary."""
+        return checker.run(feedback)
+
+    def _execute_fused_scan(self, checkers: list, feedback=None) -> list:
+        """
+        Runs several checks that stream the same layer with one pass over its features.
+        Every feature is handed to each check in turn. Returns the result dictionaries
+        in the order of checkers.
+        """
+        # 1. Prepare every check, the ones that can't run keep their empty results
+        active_checkers = [checker for checker in checkers if checker.timed_prepare(feedback)]
+        # Some checks answer in prepare() already (e.g. database side duplicate counts)
+        scanning_checkers = [checker for checker in active_checkers if checker.needs_scan]
+
+        if scanning_checkers:
+            # 2. One scan for all of them, the snapshots all point to the same layer
+            scan_count = scanning_checkers[0].scan_count
+            progress_step = max(1, scan_count // 100)
+            # Only read the attributes (and geometry) that at least one of the checks uses
+            request = scan_request(scanning_checkers)
+            # The fetch time is shared: every check of the scan waits for the same features
+            features = timed_features(scanning_checkers[0].scan_source.getFeatures(request),
+                                      [checker.stats for checker in scanning_checkers])
+            for current, feature in enumerate(features):
+                if feedback and feedback.isCanceled():
+                    print("[DEBUG] Fused scan cancelled")
+                    return [checker.results for checker in checkers]
+                if feedback and current % progress_step == 0:
+                    feedback.setProgress(current * 100.0 / scan_count)
+                for checker in scanning_checkers:
+                    checker.timed_consume(feature)
+
+        # 3. Only finish the checks when the scan wasn't interrupted
+        for checker in active_checkers:
+            checker.timed_finish()
+
+        return [checker.results for checker in checkers]
+
+    def diagnostics(self) -> list:
+        """
+        Timings and counters of every check of the last run, as plain dictionaries:
+        fetch / index build / predicate time, features scanned, candidates per feature,
+        exact predicate calls, features per second and peak memory.
+        """
+        return diagnostics_rows(self.results)
+
+    def write_diagnostics(self, json_path: str):
+        """Writes diagnostics() to a JSON file."""
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump({'report_path': self.report_path, 'checks': self.diagnostics()}, f, indent=2)
+        print(f"[DEBUG] Run diagnostics written to: {json_path}")
+
+    def _store_result(self, check_result: dict):
+        """Appends a check result dictionary to the list of its check type."""
+        self.results[check_result['check_type']].append(check_result)
 
     def _generate_report(self):
         """
         Calls the ReportGenerator to compile the collected results into the final HTML report.
+        Only reads the results, so it runs in the worker thread of AuditTask too.
         """
         print("All checks completed. Generating report...")
         
@@ -90,9 +334,60 @@ class AuditRunner(QObject):
         generator = ReportGenerator(self.report_path, self.results, self.report_config)
         
         # Call the method to build and save the report file
+        self.report_failure = None
         try:
             generator.generate_report()
         except Exception as e:
             # Handle potential file writing errors
             print(f"Error generating report: {e}")
-            pass
\ No newline at end of file
+            self.report_failure = e
+
+        # With {'diagnostics': True} in the report config the numbers are also written as JSON
+        if self.report_config.get('diagnostics'):
+            try:
+                self.write_diagnostics(os.path.splitext(self.report_path)[0] + '_diagnostics.json')
+            except Exception as e:
+                print(f"[ERROR] Failed to write run diagnostics: {e}")
+
+
+    def _load_outputs(self):
+        """What is left for the main thread once the report is written: adding the error layer to the project."""
+        # The error layer was written with the checks, only adding it to the project is left
+        if self.error_exporter and self.report_config.get('load_error_layer'):
+            self.load_error_layer()
+
+    def record_history(self):
+        """
+        Stores all errors of the run in the audit history, in one transaction.
+        Runs are grouped by project (the project file, else the site code) and by
+        the hash of the check configurations, both taken in _create_checks().
+        Only reads the results, so it runs in the worker thread of AuditTask too.
+        """
+        try:
+            with AuditHistory(self.history_path) as history:
+                self.history_run_id = history.record_run(
+                    self.history_project, self.history_config_hash, self.results, self.report_path)
+        except Exception as e:
+            print(f"[ERROR] Failed to record the run in the audit history: {e}")
+
+    def export_error_layer(self, feedback=None):
+        """
+        Writes the failing features of all checks, with their geometry, next to the report.
+        Only reads the feature source snapshots of the checks, so it runs in the worker thread.
+        """
+        try:
+            self.error_exporter.export(feedback)
+        except Exception as e:
+            print(f"[ERROR] Failed to export the error layer: {e}")
+
+    def load_error_layer(self):
+        """
+        Adds the written error layer to the project, with {'load_error_layer': True} in the report config.
+        Must be called on the main thread.
+        """
+        if not self.error_exporter.tables:
+            return
+        try:
+            self.error_exporter.load_into_project(f"{self.report_config.get('site_code', 'Audit')} errors")
+        except Exception as e:
+            print(f"[ERROR] Failed to load the error layer: {e}")
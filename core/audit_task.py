@@ -0,0 +1,45 @@
+# gis_auditor_report/core/audit_task.py
+
+from qgis.core import QgsTask, QgsFeedback
+
+
+class AuditTask(QgsTask):
+    """
+    Background task that executes the checks of an AuditRunner off the GUI thread.
+    It is registered with QgsApplication.taskManager() by the runner, reports
+    per-feature progress and can be cancelled from the QGIS task manager.
+    """
+
+    def __init__(self, runner, description: str = "GIS Audit"):
+        super().__init__(description, QgsTask.CanCancel)
+        self.runner = runner
+        self.exception = None
+
+        # The feedback object is shared with every check so they can report progress
+        # and stop their feature loops as soon as the user cancels the task
+        self.feedback = QgsFeedback()
+        self.feedback.progressChanged.connect(self.setProgress)
+
+    def run(self) -> bool:
+        """Runs in the worker thread. Must not touch any widgets."""
+        try:
+            if not self.runner.execute_checks(self.feedback):
+                return False
+            # The report and the audit history are written here as well, finished() only has to announce them
+            self.runner._generate_report()
+            if self.runner.history_path:
+                self.runner.record_history()
+            return True
+        except Exception as e:
+            # Exceptions can't cross the thread boundary, keep it for finished()
+            self.exception = e
+            return False
+
+    def cancel(self):
+        """Cancels the task and interrupts the check currently running."""
+        self.feedback.cancel()
+        super().cancel()
+
+    def finished(self, result: bool):
+        """Called back on the main thread once run() has returned."""
+        self.runner._on_task_finished(result, self.exception)
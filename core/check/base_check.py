@@ -0,0 +1,146 @@
+# gis_auditor_report/core/check/base_check.py
+
+import time
+
+from qgis.core import QgsFeatureRequest, QgsProject, QgsRectangle
+from ..diagnostics import CheckStats, timed_features
+from ..result_store import ErrorStore
+
+
+class BaseCheck:
+    """
+    Common streaming interface shared by all checks.
+
+    Every check reads one 'scan' layer feature by feature (the duplicate layer,
+    the spatial child layer or the exclusion target layer). Everything else it
+    needs, e.g. a spatial index of the parent layer, is built in prepare().
+    Splitting run() into prepare / consume / finish lets the AuditRunner feed
+    several checks from a single pass over the same layer.
+    """
+
+    def __init__(self, config: dict, layer_store=None):
+        self.config = config
+        # Anything with a mapLayer(layer_id) method, e.g. a QgsMapLayerStore for Processing
+        self.layer_store = layer_store or QgsProject.instance()
+        # Set by the subclasses: the layer read feature by feature and its snapshot
+        self.scan_layer = None
+        self.scan_source = None
+        self.scan_count = 0
+        # A check may find out in prepare() that it can answer without reading features
+        self.needs_scan = True
+        # What the scan has to return: field indexes read in consume() and whether the geometry is used
+        self.needs_geometry = True
+        # Optional QgsRectangle, the scan only needs the features in it
+        self.scan_rect = None
+        # Timers and counters of the run, reported in results['diagnostics']
+        self.stats = CheckStats()
+        self.results = {}
+
+    def error_store(self, columns) -> ErrorStore:
+        """
+        Empty store for the errors of the check, spilling to disk above
+        config['error_spill_rows'] rows.
+        """
+        return ErrorStore(columns, self.config.get('error_spill_rows', ErrorStore.DEFAULT_SPILL_ROWS))
+
+    def scan_layer_id(self):
+        """ID of the layer this check streams, None if the layer is invalid."""
+        return self.scan_layer.id() if self.scan_layer else None
+
+    def prepare(self, feedback=None) -> bool:
+        """
+        Validates the configuration and builds everything needed before the scan.
+        Returns False if the check can't run, results then stay empty.
+        """
+        return True
+
+    def required_attributes(self) -> list:
+        """Indexes of the scan layer fields read in consume(). Valid after prepare()."""
+        return []
+
+    def feature_request(self) -> QgsFeatureRequest:
+        """Request for the scan: only the needed attributes, no geometry unless it is used."""
+        return scan_request([self])
+
+    def consume(self, feature):
+        """Processes one feature of the scan layer."""
+        raise NotImplementedError
+
+    def finish(self) -> dict:
+        """Called once the scan is complete, returns the results dictionary."""
+        return self.results
+
+    def collect_stats(self):
+        """Copies the counters of the engines used by the check into self.stats, before finishing."""
+
+    def timed_prepare(self, feedback=None) -> bool:
+        """prepare(), timed as the index build of the run."""
+        self.stats.start()
+        with self.stats.timer('index_build_time'):
+            prepared = self.prepare(feedback)
+        if not prepared:
+            self.stats.stop()
+        return prepared
+
+    def timed_consume(self, feature):
+        """consume(), timed as predicate time and counted as a scanned feature."""
+        start = time.perf_counter()
+        self.consume(feature)
+        self.stats.timers['predicate_time'] += time.perf_counter() - start
+        self.stats.counters['features_scanned'] += 1
+
+    def timed_finish(self) -> dict:
+        """finish(), then stores the diagnostics of the run in the results."""
+        self.collect_stats()
+        with self.stats.timer('predicate_time'):
+            results = self.finish()
+        self.stats.stop()
+        results['diagnostics'] = self.stats.as_dict()
+        return results
+
+    def run(self, feedback=None) -> dict:
+        """
+        Executes the check on its own: prepare, scan the layer, finish.
+
+        Args:
+            feedback (QgsFeedback): Optional, receives per-feature progress and is
+                                    polled for cancellation.
+        """
+        if not self.timed_prepare(feedback):
+            return self.results
+        if not self.needs_scan:
+            return self.timed_finish()
+
+        progress_step = max(1, self.scan_count // 100)
+        features = timed_features(self.scan_source.getFeatures(self.feature_request()), [self.stats])
+        for current, feature in enumerate(features):
+            if feedback and feedback.isCanceled():
+                print(f"[DEBUG] {type(self).__name__} cancelled")
+                return self.results
+            if feedback and current % progress_step == 0:
+                feedback.setProgress(current * 100.0 / self.scan_count)
+            self.timed_consume(feature)
+
+        return self.timed_finish()
+
+
+def scan_request(checkers: list) -> QgsFeatureRequest:
+    """
+    Builds one feature request serving all the given checks of the same scan layer:
+    the union of their attributes, and the geometry only if one of them needs it.
+    The scan is limited to a rectangle when every check has one.
+    """
+    request = QgsFeatureRequest()
+
+    attribute_indexes = sorted({index for checker in checkers for index in checker.required_attributes()})
+    request.setSubsetOfAttributes(attribute_indexes)
+
+    if not any(checker.needs_geometry for checker in checkers):
+        request.setFlags(QgsFeatureRequest.NoGeometry)
+
+    if checkers and all(checker.scan_rect is not None for checker in checkers):
+        rect = QgsRectangle(checkers[0].scan_rect)
+        for checker in checkers[1:]:
+            rect.combineExtentWith(checker.scan_rect)
+        request.setFilterRect(rect)
+    return request
@@ -1,23 +1,43 @@
 # gis_auditor_report/core/check/duplicate_check.py
 
-from qgis.core import QgsProject, QgsProcessingFeedback, QgsVectorLayer
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import QgsProcessingFeedback, QgsVectorLayer, QgsVectorLayerFeatureSource
+from ..result_store import iter_errors
+from .base_check import BaseCheck
+from .duplicate_pushdown import DuplicatePushdown
+from .numpy_duplicates import NumpyDuplicateCounter
+from .spilling_counter import SpillingCounter
 
-class DuplicateCheck:
+class DuplicateCheck(BaseCheck):
     """
     Performs a check for duplicate attribute values in a specified layer and field.
+    With 'field_names' the uniqueness key is made of several fields, e.g.
+    (site_code, asset_no, phase), and is checked in a single scan.
     """
 
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, layer_store=None):
         """
         Initializes the check with a specific configuration.
         
         Args:
             config (dict): A dictionary containing the check parameters.
                            e.g., {'check_type': 'duplicate', 'layer_id': '...', 'field_name': '...'}
+                           or {'check_type': 'duplicate', 'layer_id': '...', 'field_names': ['...', '...'],
+                               'normalise': True}
+            layer_store: Where the layer IDs are looked up, defaults to the current project.
         """
-        self.config = config
-        self.layer = QgsProject.instance().mapLayer(config.get('layer_id'))
-        self.field_name = config.get('field_name')
+        super().__init__(config, layer_store)
+        self.layer = self.layer_store.mapLayer(config.get('layer_id'))
+        # Ordered fields of the uniqueness key, a single field_name is a key of one field
+        self.field_names = list(config.get('field_names') or [config.get('field_name')])
+        self.field_name = ' + '.join(str(name) for name in self.field_names)
+        # Compare the values ignoring case and extra whitespace
+        self.normalise = bool(config.get('normalise', False))
+        # Optional memory ceiling of the count, the values spill to disk above it
+        self.memory_limit_mb = config.get('memory_limit_mb')
+        # {'count_engine': 'numpy'} counts numeric and date fields in NumPy arrays. The dictionary
+        # stays the default, bench_duplicate_engine.py doesn't show the arrays winning yet
+        self.count_engine = config.get('count_engine', 'dict')
 
         print(f"[DEBUG] DuplicateCheck initialized")
         print(f"[DEBUG] Layer ID: {config.get('layer_id')}")
@@ -26,54 +46,165 @@ class DuplicateCheck:
         if self.layer:
             print(f"[DEBUG] Layer name: {self.layer.name()}")
             print(f"[DEBUG] Available fields: {self.layer.fields().names()}")
+
+        # Take a thread-safe snapshot of the layer while we are still on the main thread,
+        # run() only reads from it so the check can be executed in a worker thread
+        self.source = QgsVectorLayerFeatureSource(self.layer) if self.layer else None
+        self.fields = self.layer.fields() if self.layer else None
+        self.feature_count = self.layer.featureCount() if self.layer else 0
+
+        # The duplicate layer is the one streamed during the scan
+        self.scan_layer = self.layer
+        self.scan_source = self.source
+        self.scan_count = self.feature_count
+        self.value_counts = {}
+        # Duplicated composite keys (tuples) -> their value in the errors, e.g. "A12 | 0042 | 2"
+        self.composite_keys = {}
+        # Vectorised counter, used instead of value_counts when NumPy supports the field type
+        self.counter = None
+        # Bounded memory counter, used instead of value_counts when a memory limit is set
+        self.spilling_counter = None
+        # Counting values never looks at the geometry
+        self.needs_geometry = False
+        self.field_index = -1
+        self.field_indexes = []
+
+        # Database backed layers can count the duplicates themselves with a GROUP BY query,
+        # as long as the key is a single field compared as it is
+        self.pushdown = None
+        if self.layer and len(self.field_names) == 1 and not self.normalise:
+            self.pushdown = DuplicatePushdown.from_layer(self.layer, self.field_name)
         
 
         self.results = {
             'check_type': 'duplicate',
             'layer_name': self.layer.name() if self.layer else 'Invalid Layer',
             'field_name':self.field_name,
-            'errors': [] # To store the found duplicate values
+            # To store the found duplicate values, iterates as {'value', 'count'}
+            'errors': self.error_store((('value', 'value'), ('count', 'int')))
         }
         
-    def run(self) -> dict: # Define return type as dict.
+    def prepare(self, feedback=None) -> bool:
         """
-        Executes the duplicate check and returns a dictionary of results.
+        Validates the layer and field before the scan.
         """
-        if not self.layer:
+        if not self.source:
             print("[ERROR] Layer is None")
-            return self.results
+            return False
             
-        if self.field_name not in self.layer.fields().names():
-            print(f"[ERROR] Field '{self.field_name}' not found in layer")
-            print(f"[ERROR] Available fields: {self.layer.fields().names()}")
-            return self.results
+        # Resolve the fields once, the scan reads them by index
+        self.field_indexes = [self.fields.indexOf(name) for name in self.field_names]
+        for name, index in zip(self.field_names, self.field_indexes):
+            if index < 0:
+                print(f"[ERROR] Field '{name}' not found in layer")
+                print(f"[ERROR] Available fields: {self.fields.names()}")
+                return False
+        self.field_index = self.field_indexes[0] if len(self.field_indexes) == 1 else -1
             
-        # Placeholder for the actual logic
-        print(f"Running duplicate check on layer '{self.layer.name()}' for field '{self.field_name}'")
-        
+        print(f"Running duplicate check on layer '{self.results['layer_name']}' for field '{self.field_name}'")
         
-        # 1. Create a dictionary to count occurrences of each value.
-        value_counts = {}
-        # 2. Iterate through all features in the layer.
-        for feature in self.layer.getFeatures():
-        # 3. For each feature, get the value of self.field_name.
-            value = feature[self.field_name]
-        # 4. Count how many times each value appears.
-            if value is None or value == '':
-                value_str = 'NULL'
-            else:
-                value_str = str(value)
-
-            value_counts[value_str] = value_counts.get(value_str, 0) + 1
-
-        # 5. Identify values with a count > 1.
-        duplicated_values = {k: v for k, v in value_counts.items() if v > 1}
-        # 6. Store the results in self.results['errors'].
+        # 1. Let the database count if it can, no features need to be read then
+        if self.pushdown:
+            pushdown_errors = self.pushdown.run()
+            if pushdown_errors is not None:
+                print(f"[DEBUG] Duplicates counted by the {self.pushdown.provider} provider")
+                self.results['errors'].extend(pushdown_errors)
+                self.needs_scan = False
+                return True
+
+        # 2. With a memory limit, count in a dictionary that spills to disk when it gets too big
+        if self.memory_limit_mb:
+            print(f"[DEBUG] Duplicates counted within {self.memory_limit_mb} MB of memory")
+            self.spilling_counter = SpillingCounter(self.memory_limit_mb)
+            self.value_counts = {}
+            return True
+
+        # 3. Otherwise count in NumPy arrays when asked for and the field type allows it,
+        #    or create a dictionary to count occurrences of each value.
+        if self.count_engine == 'numpy' and self.field_index >= 0 and not self.normalise:
+            self.counter = NumpyDuplicateCounter.for_field(self.fields.at(self.field_index))
+        if self.counter:
+            print(f"[DEBUG] Duplicates counted with NumPy ({self.counter.kind} values)")
+        self.value_counts = {}
+        return True
+
+    def required_attributes(self) -> list:
+        """Only the checked fields are read."""
+        return list(self.field_indexes)
+
+    def consume(self, feature):
+        """Counts the value of one feature."""
+        # 4. For each feature, get the value of the key field(s).
+        if self.field_index < 0:
+            # Composite key: a tuple of the values of all key fields
+            value_str = tuple(self._key_part(feature[index]) for index in self.field_indexes)
+        else:
+            value = feature[self.field_index]
+            if self.counter:
+                self.counter.add(value)
+                return
+            value_str = self._key_part(value)
+
+        # 5. Count how many times each value appears.
+        if self.spilling_counter:
+            self.spilling_counter.add(value_str)
+        else:
+            self.value_counts[value_str] = self.value_counts.get(value_str, 0) + 1
+
+    def error_key(self, feature):
+        """The key of a feature as it is counted, a tuple for a composite key. See duplicated_keys()."""
+        if self.field_index < 0:
+            return tuple(self._key_part(feature[index]) for index in self.field_indexes)
+        return self._key_part(feature[self.field_index])
+
+    def duplicated_keys(self) -> dict:
+        """
+        The duplicated keys mapped to their value in the errors, once the check is finished.
+        Composite keys stay tuples, so a ' | ' within a field value can't make two keys match.
+        """
+        if self.field_index < 0:
+            return self.composite_keys
+        return {value: value for value, in iter_errors(self.results['errors'], 'value')}
+
+    def _key_part(self, value):
+        """The text a field value is compared by, None for NULL and empty values."""
+        if value is None or isinstance(value, QVariant) or value == '':
+            return None
+        value_str = str(value)
+        if self.normalise:
+            # Case and runs of whitespace don't make a value unique
+            value_str = ' '.join(value_str.split()).lower()
+            if not value_str:
+                return None
+        return value_str
+
+    @staticmethod
+    def _display_key(key: tuple) -> str:
+        """A composite key as shown in the errors, its values joined, e.g. "A12 | 0042 | NULL"."""
+        return ' | '.join('NULL' if part is None else part for part in key)
+
+    def finish(self) -> dict:
+        """
+        Collects the duplicated values once all features were counted.
+        """
+        if not self.needs_scan:
+            # Errors were already collected by the database query
+            return self.results
+
+        # 6. Identify values with a count > 1.
+        if self.counter:
+            duplicated_values = dict(self.counter.duplicates())
+        elif self.spilling_counter:
+            duplicated_values = dict(self.spilling_counter.duplicates())
+        else:
+            duplicated_values = {k: v for k, v in self.value_counts.items() if v > 1}
+        # 7. Store the results in self.results['errors'].
         for value, count in duplicated_values.items():
-            self.results['errors'].append({
-                'value': value, 
-                'count': count
-            })
+            if isinstance(value, tuple):
+                # A composite key is shown as its values joined, e.g. "A12 | 0042 | 2"
+                self.composite_keys[value] = self._display_key(value)
+                value = self.composite_keys[value]
+            self.results['errors'].add(value, count)
         
 
-        return self.results
\ No newline at end of file
+        return self.results
@@ -0,0 +1,159 @@
+# gis_auditor_report/core/check/duplicate_pushdown.py
+
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import QgsDataSourceUri, QgsFields, QgsProviderRegistry
+
+
+def _quote_identifier(name: str) -> str:
+    """Quotes a table or column name for SQL."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DuplicatePushdown:
+    """
+    Counts duplicated values with a GROUP BY query run by the database itself,
+    instead of pulling every feature into Python.
+
+    Supported are PostGIS, SpatiaLite and every OGR source (GeoPackage natively,
+    other formats through the OGR SQLite dialect). from_layer() returns None when
+    the layer can't be pushed down, the DuplicateCheck then counts in Python.
+
+    The values come back in order of their first feature ID, the order in which
+    the Python count first sees them, and NULL (or empty) is reported as None,
+    apart from a 'NULL' text.
+    """
+
+    # Only these types are pushed down, their str() in Python matches what the database returns
+    SUPPORTED_FIELD_TYPES = (QVariant.String, QVariant.Int, QVariant.UInt, QVariant.LongLong, QVariant.ULongLong)
+
+    def __init__(self, provider: str, source: str, table: str, subset: str, field_name: str, is_string: bool,
+                 fid_column: str = 'rowid'):
+        self.provider = provider
+        self.source = source
+        self.table = table
+        self.subset = subset
+        self.field_name = field_name
+        self.is_string = is_string
+        # Column the feature IDs come from, the first one of each value gives the order
+        self.fid_column = fid_column
+
+    @classmethod
+    def from_layer(cls, layer, field_name: str):
+        """
+        Collects what is needed to run the query, or returns None if the layer can't be pushed down.
+        Must be called on the main thread.
+        """
+        provider = layer.dataProvider()
+        if not provider or provider.name() not in ('postgres', 'spatialite', 'ogr'):
+            return None
+
+        # Uncommitted edits only exist in QGIS, the database would count the old values
+        edit_buffer = layer.editBuffer()
+        if edit_buffer and edit_buffer.isModified():
+            return None
+
+        fields = layer.fields()
+        field_index = fields.indexOf(field_name)
+        if field_index < 0 or fields.fieldOrigin(field_index) != QgsFields.OriginProvider:
+            # Joined and virtual fields are not columns of the table
+            return None
+        if fields.at(field_index).type() not in cls.SUPPORTED_FIELD_TYPES:
+            return None
+
+        subset = layer.subsetString()
+        if subset.strip().upper().startswith('SELECT'):
+            # OGR allows a whole SQL statement as subset, it can't be used as a WHERE clause
+            return None
+
+        source = layer.source()
+        # OGR and SQLite tables number their rows like QGIS numbers the features
+        fid_column = 'rowid'
+        if provider.name() == 'ogr':
+            parts = QgsProviderRegistry.instance().decodeUri('ogr', source)
+            source = parts.get('path')
+            table = parts.get('layerName')
+        else:
+            uri = QgsDataSourceUri(source)
+            table = _quote_identifier(uri.table())
+            if uri.schema():
+                table = _quote_identifier(uri.schema()) + '.' + table
+            key_column = uri.keyColumn().strip('"')
+            if key_column:
+                fid_column = _quote_identifier(key_column)
+            if provider.name() == 'postgres' and (not key_column or ',' in key_column):
+                # Without a single key column the order of the features can't be matched
+                return None
+
+        if not source:
+            return None
+
+        is_string = fields.at(field_index).type() == QVariant.String
+        return cls(provider.name(), source, table, subset, field_name, is_string, fid_column)
+
+    def _queries(self, table: str) -> tuple:
+        """Builds the duplicate query and the NULL / empty string count query."""
+        column = _quote_identifier(self.field_name)
+        where = f"({self.subset}) AND " if self.subset else ""
+
+        # NULL and '' are counted together as NULL, like the Python count does
+        empty_test = f"{column} IS NULL OR {column} = ''" if self.is_string else f"{column} IS NULL"
+
+        duplicate_sql = (
+            f"SELECT {column}, COUNT(*), MIN({self.fid_column}) FROM {table} "
+            f"WHERE {where}NOT ({empty_test}) "
+            f"GROUP BY {column} HAVING COUNT(*) > 1"
+        )
+        null_sql = f"SELECT COUNT(*), MIN({self.fid_column}) FROM {table} WHERE {where}({empty_test})"
+        return duplicate_sql, null_sql
+
+    def _execute_connection(self, sql_list: list) -> list:
+        """Runs the queries through the QGIS database connection API (QGIS 3.16+)."""
+        metadata = QgsProviderRegistry.instance().providerMetadata(self.provider)
+        connection = metadata.createConnection(self.source, {})
+        return [connection.executeSql(sql) for sql in sql_list]
+
+    def _execute_ogr(self, sql_list: list) -> list:
+        """Runs the queries through GDAL/OGR, with its SQLite dialect for non-SQLite formats."""
+        from osgeo import ogr
+
+        data_source = ogr.Open(self.source)
+        if data_source is None:
+            raise RuntimeError(f"OGR could not open {self.source}")
+
+        driver_name = data_source.GetDriver().GetName()
+        dialect = '' if driver_name in ('GPKG', 'SQLite') else 'SQLITE'
+        table = self.table or data_source.GetLayer(0).GetName()
+
+        rows_per_query = []
+        for sql in sql_list:
+            result_layer = data_source.ExecuteSQL(sql.replace('{table}', _quote_identifier(table)), dialect=dialect)
+            if result_layer is None:
+                raise RuntimeError(f"OGR could not run: {sql}")
+            rows = [[feature.GetField(i) for i in range(feature.GetFieldCount())] for feature in result_layer]
+            data_source.ReleaseResultSet(result_layer)
+            rows_per_query.append(rows)
+        return rows_per_query
+
+    def run(self):
+        """
+        Runs the queries. Returns the duplicate errors as a list of {'value', 'count'}
+        dictionaries, or None if the database could not answer.
+        """
+        try:
+            if self.provider == 'ogr':
+                duplicate_rows, null_rows = self._execute_ogr(list(self._queries('{table}')))
+            else:
+                duplicate_rows, null_rows = self._execute_connection(list(self._queries(self.table)))
+        except Exception as e:
+            print(f"[WARNING] Duplicate pushdown failed, counting in Python instead: {e}")
+            return None
+
+        # (first feature ID, value, count), NULL is None and not the text 'NULL'
+        found = [(int(first_fid), str(value), int(count)) for value, count, first_fid in duplicate_rows]
+        null_count = int(null_rows[0][0]) if null_rows and null_rows[0] else 0
+        if null_count > 1:
+            found.append((int(null_rows[0][1]), None, null_count))
+
+        # In order of first appearance, like the Python count reports them
+        found.sort(key=lambda item: item[0])
+        return [{'value': value, 'count': count} for _, value, count in found]
@@ -1,26 +1,37 @@
 # gis_auditor_report/core/check/exclusion_check.py
 
 from qgis.core import (
-    QgsProject, 
-    QgsSpatialIndex
+    QgsRectangle,
+    QgsVectorLayerFeatureSource,
+    QgsWkbTypes,
 )
+from .base_check import BaseCheck
+from ..index_cache import SpatialIndexCache, build_geometry_index
+from ..predicate_engine import PointInPolygonEngine, PreparedPredicateEngine
+from ..strtree_engine import StrTreeJoinEngine
+from ..join_planner import ReverseJoin, plan_join
+from ..subdivision import DEFAULT_MAX_NODES, build_piece_index, subdivide_source, watch_layer
 
-class ExclusionCheck:
+class ExclusionCheck(BaseCheck):
     """
     Checks if features in a target layer violate a predefined exclusion zone.
     It identifies target features that intersect or touch any feature in the exclusion layer.
     """
 
-    def __init__(self, config: dict):
+    # Targets collected for one STRtree query, keeps the memory bounded on large layers
+    STRTREE_BATCH_SIZE = 100000
+
+    def __init__(self, config: dict, layer_store=None):
         """
         Initializes the check with a specific configuration.
         
         Args:
             config (dict): A dictionary containing the check parameters.
+            layer_store: Where the layer IDs are looked up, defaults to the current project.
         """
-        self.config = config
-        self.target_layer = QgsProject.instance().mapLayer(config.get('target_id'))
-        self.exclusion_layer = QgsProject.instance().mapLayer(config.get('exclusion_id'))
+        super().__init__(config, layer_store)
+        self.target_layer = self.layer_store.mapLayer(config.get('target_id'))
+        self.exclusion_layer = self.layer_store.mapLayer(config.get('exclusion_id'))
         self.target_unique_field = config.get('target_unique_field')
 
         print(f"[DEBUG] ExclusionCheck initialized")
@@ -35,57 +46,226 @@ class ExclusionCheck:
             print(f"[DEBUG] Target layer name: {self.target_layer.name()}")
             print(f"[DEBUG] Target layer fields: {self.target_layer.fields().names()}")
 
+        # Thread-safe snapshots of both layers, created here on the main thread
+        # so that run() can be executed from a worker thread
+        self.target_source = QgsVectorLayerFeatureSource(self.target_layer) if self.target_layer else None
+        self.exclusion_source = QgsVectorLayerFeatureSource(self.exclusion_layer) if self.exclusion_layer else None
+        self.target_fields = self.target_layer.fields() if self.target_layer else None
+        self.target_count = self.target_layer.featureCount() if self.target_layer else 0
+
+        # The exclusion index is shared through the cache, remember which version of the data we see
+        if self.exclusion_layer:
+            self.exclusion_fingerprint = SpatialIndexCache.fingerprint(self.exclusion_layer)
+            self.exclusion_count = self.exclusion_layer.featureCount()
+            SpatialIndexCache.instance().watch(self.exclusion_layer)
+
+        # Planning: index the exclusion zones and stream the targets, or the other way round when
+        # that is much cheaper (e.g. 50 turbine sites against 2M protected areas).
+        # {'plan': 'forward' | 'reverse'} forces it
+        self.plan = None
+        if self.target_layer and self.exclusion_layer:
+            self.plan = plan_join(self.target_layer, self.exclusion_layer, config.get('plan', 'auto'))
+        self.reverse = bool(self.plan) and self.plan['mode'] == 'reverse'
+        self.reverse_join = None  # indexed targets of the reverse plan
+
+        # Exclusion polygons are cut into pieces of at most subdivide_max_nodes vertices before
+        # indexing, so a huge zone is no longer a candidate (and a full GEOS test) for every target.
+        # {'subdivide_max_nodes': 0} indexes the polygons as they are
+        is_polygon_layer = bool(self.exclusion_layer) and self.exclusion_layer.geometryType() == QgsWkbTypes.PolygonGeometry
+        self.subdivide_max_nodes = config.get('subdivide_max_nodes', DEFAULT_MAX_NODES) if is_polygon_layer else 0
+        if self.subdivide_max_nodes:
+            # The pieces are stored on disk between runs, drop them when the zones are edited
+            watch_layer(self.exclusion_layer, self.subdivide_max_nodes)
+
+        # With Shapely 2 the targets are collected and joined with the exclusion zones in one
+        # vectorised STRtree query, {'engine': 'qgis'} keeps the QgsSpatialIndex loop
+        self.use_strtree = config.get('engine', 'auto') != 'qgis' and StrTreeJoinEngine.is_available()
+        self.strtree = None
+        self.bulk_targets = []  # (target id value, fid, wkb) waiting for the STRtree query
+
+        # The target layer is streamed, the exclusion layer is indexed in prepare()
+        self.scan_layer = self.target_layer
+        self.scan_source = self.target_source
+        self.scan_count = self.target_count
+        if self.reverse:
+            # Reversed: the exclusion zones near the targets are streamed, the targets are indexed
+            self.scan_layer = self.exclusion_layer
+            self.scan_source = self.exclusion_source
+            self.scan_count = self.exclusion_count
+            self.scan_rect = QgsRectangle(self.target_layer.extent())
+        self.exclusion_index = None
+        self.exclusion_predicates = None
+        # Point targets are tested with the point-in-polygon engine when the STRtree isn't used
+        self.points_only = bool(self.target_layer) and PointInPolygonEngine.is_point_layer(self.target_layer)
+        self.point_engine = None
+        self.errors_found = 0
+        self.target_field_index = -1
+
         
         self.results = {
             'check_type': 'exclusion',
             'target_layer_name': self.target_layer.name() if self.target_layer else 'Invalid Layer',
             'exclusion_layer_name': self.exclusion_layer.name() if self.exclusion_layer else 'Invalid Layer',
-            'errors': []
+            # Compact columns instead of one dictionary per error, iterates as {'target_id', 'fid'}
+            'errors': self.error_store((('target_id', 'value'), ('fid', 'int')))
         }
+        if self.plan:
+            # Which side was indexed, for the run metadata. The errors don't depend on it
+            self.results['plan'] = self.plan
 
-    def run(self) -> dict:
+    def prepare(self, feedback=None) -> bool:
         """
-        Executes the exclusion check and returns a dictionary of results.
+        Validates both layers and builds the exclusion spatial index.
         """
-        if not self.target_layer or not self.exclusion_layer:
+        if not self.target_source or not self.exclusion_source:
             print("[ERROR] Invalid target or exclusion layer")
-            return self.results
-            
-        print(f"Running exclusion zone check on layer: {self.target_layer.name()} against {self.exclusion_layer.name()}")
-        
-        # Build a spatial index for the exclusion layer for efficient lookups
-        exclusion_index = QgsSpatialIndex(self.exclusion_layer.getFeatures())
-        errors_found = 0
-        
-        for target_feature in self.target_layer.getFeatures():
-            target_geom = target_feature.geometry()
+            return False
             
-            # Get target ID - use feature ID if field not specified or invalid
-            if self.target_unique_field and self.target_unique_field in self.target_layer.fields().names():
-                target_id_value = target_feature[self.target_unique_field]
+        print(f"Running exclusion zone check on layer: {self.results['target_layer_name']} against {self.results['exclusion_layer_name']}")
+
+        self.errors_found = 0
+
+        # Resolve the target ID field once - use feature ID if field not specified or invalid
+        self.target_field_index = self.target_fields.indexOf(self.target_unique_field) if self.target_unique_field else -1
+        if self.target_unique_field and self.target_field_index < 0:
+            print(f"[WARNING] Target unique field '{self.target_unique_field}' not found, using feature IDs")
+
+        if self.reverse:
+            # Index the targets, each streamed exclusion zone marks the ones it intersects
+            self.reverse_join = ReverseJoin(self.target_source, self.target_field_index)
+            return True
+
+        # A target intersects a zone exactly when it intersects one of its pieces,
+        # so the index (or STRtree) can be built over the pieces instead of the zones
+        max_nodes = self.subdivide_max_nodes
+        pieces = lambda: subdivide_source(self.exclusion_source, self.exclusion_fingerprint, max_nodes)
+
+        if self.use_strtree:
+            # Get the STRtree of the exclusion layer from the cache, or export the zones and build it
+            if max_nodes:
+                kind, builder = f'strtree:subdivided:{max_nodes}', lambda: StrTreeJoinEngine.from_wkbs([wkb for _, wkb in pieces()])
             else:
-                target_id_value = target_feature.id()
-            
+                kind, builder = 'strtree', lambda: StrTreeJoinEngine.build(self.exclusion_source, self.exclusion_count)
+            self.strtree = SpatialIndexCache.instance().get_or_build(
+                self.exclusion_layer.id(), self.exclusion_fingerprint, kind, builder
+            )
+            self.bulk_targets = []
+        else:
+            # Get the spatial index of the exclusion layer from the cache, or build it for efficient lookups.
+            # It stores the exclusion geometries too, so the candidates never go back to the provider
+            if max_nodes:
+                self.exclusion_index = SpatialIndexCache.instance().get_or_build(
+                    self.exclusion_layer.id(),
+                    self.exclusion_fingerprint,
+                    f'geometry_index:subdivided:{max_nodes}',
+                    lambda: build_piece_index(pieces())
+                )
+            else:
+                self.exclusion_index = SpatialIndexCache.instance().get_or_build(
+                    self.exclusion_layer.id(),
+                    self.exclusion_fingerprint,
+                    'geometry_index',
+                    lambda: build_geometry_index(self.exclusion_source, self.exclusion_count)
+                )
+            # Exclusion geometries are prepared for GEOS once, the first time they are a candidate
+            self.exclusion_predicates = PreparedPredicateEngine(self.exclusion_index.geometry)
+            if self.points_only:
+                self.point_engine = PointInPolygonEngine(self.exclusion_index, self.exclusion_predicates)
+        return True
+
+    def required_attributes(self) -> list:
+        """
+        Only the target ID field is read from the targets, nothing from streamed exclusion zones.
+        """
+        if self.reverse:
+            return []
+        return [self.target_field_index] if self.target_field_index >= 0 else []
+
+    def consume(self, target_feature):
+        """
+        Checks one target feature against the exclusion zones.
+        """
+        if self.reverse:
+            # The feature is an exclusion zone: mark the targets it intersects
+            self.reverse_join.mark(target_feature.geometry(), 'intersects')
+            return
+
+        # Get target ID - use feature ID if field not specified or invalid
+        if self.target_field_index >= 0:
+            target_id_value = target_feature[self.target_field_index]
+        else:
+            target_id_value = target_feature.id()
+
+        if self.strtree:
+            # Tested in batches, one vectorised query per STRTREE_BATCH_SIZE targets
+            self.bulk_targets.append((target_id_value, target_feature.id(), StrTreeJoinEngine.to_wkb(target_feature)))
+            if len(self.bulk_targets) >= self.STRTREE_BATCH_SIZE:
+                self._flush_bulk_targets()
+            return
+
+        target_geom = target_feature.geometry()
+
+        if self.point_engine:
+            # Point targets: point lookup and interior rectangle shortcut
+            has_intersection = self.point_engine.intersects_any(target_geom)
+        else:
             # Find exclusion features that intersect the target's bounding box
-            intersecting_exclusion_ids = exclusion_index.intersects(target_geom.boundingBox())
-            
+            # (pieces when subdivided)
+            intersecting_exclusion_ids = self.exclusion_index.intersects(target_geom.boundingBox())
+            self.stats.counters['index_candidates'] += len(intersecting_exclusion_ids)
+
             # Check for actual geometric intersection (not just bounding box)
             has_intersection = False
             for exclusion_id in intersecting_exclusion_ids:
-                exclusion_feature = self.exclusion_layer.getFeature(exclusion_id)
-                exclusion_geom = exclusion_feature.geometry()
-                
-                if target_geom.intersects(exclusion_geom):
+                if self.exclusion_predicates.intersects(exclusion_id, target_geom):
                     has_intersection = True
                     break
-            
-            # If intersection found, it's an error
-            if has_intersection:
-                errors_found += 1
-                self.results['errors'].append({
-                    'target_id': target_id_value  # FIXED: was 'target_uid'
-                })
         
-        print(f"[DEBUG] Exclusion check complete: {errors_found} errors found")
+        # If intersection found, it's an error
+        if has_intersection:
+            self.errors_found += 1
+            self.results['errors'].add(target_id_value, target_feature.id())
+
+    def collect_stats(self):
+        """
+        Counters of whichever engine ran, for results['diagnostics'].
+        """
+        if self.exclusion_predicates:
+            self.stats.count('predicate_calls', self.exclusion_predicates.call_count)
+        if self.point_engine:
+            self.stats.count('index_candidates', self.point_engine.candidate_count)
+        if self.reverse_join:
+            self.stats.count('index_candidates', self.reverse_join.candidate_count)
+            self.stats.count('predicate_calls', self.reverse_join.predicate_calls)
+
+    def _flush_bulk_targets(self):
+        """
+        Tests the collected targets with one vectorised query: which intersect at least one exclusion zone.
+        """
+        if not self.bulk_targets:
+            return
+        intersects = self.strtree.matches([target[2] for target in self.bulk_targets], 'intersects')
+        for (target_id_value, fid, _), has_intersection in zip(self.bulk_targets, intersects):
+            if has_intersection:
+                self.errors_found += 1
+                self.results['errors'].add(target_id_value, fid)
+        self.bulk_targets = []
+
+    def finish(self) -> dict:
+        """
+        Returns the dictionary of results once all targets were checked.
+        """
+        if self.strtree:
+            # The last, partial batch
+            self._flush_bulk_targets()
+
+        if self.reverse_join:
+            # Targets some zone marked, in target order like the forward plan reports them
+            for fid, target_id_value in self.reverse_join.features(marked=True):
+                self.errors_found += 1
+                self.results['errors'].add(target_id_value, fid)
+            self.reverse_join = None
+
+        print(f"[DEBUG] Exclusion check complete: {self.errors_found} errors found")
         
-        return self.results
\ No newline at end of file
+        return self.results
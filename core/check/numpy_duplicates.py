@@ -0,0 +1,138 @@
+# gis_auditor_report/core/check/numpy_duplicates.py
+
+from qgis.PyQt.QtCore import QDate, QVariant
+
+try:
+    import numpy as np
+except ImportError:  # NumPy ships with QGIS, but stay usable without it
+    np = None
+
+
+class NumpyDuplicateCounter:
+    """
+    Vectorised duplicate counting for the DuplicateCheck.
+
+    Values are buffered into large batches, each batch is turned into a typed NumPy
+    array and counted with np.unique(return_counts=True). Integer, float and date
+    fields use numeric arrays, so their values are never converted to strings while
+    counting. NULL and empty strings are counted apart and reported as None, like
+    the dictionary count does. The duplicates come out in order of first appearance,
+    exactly as the dictionary count returns them.
+
+    Values that don't fit the typed array (e.g. invalid dates) are counted by their
+    string, like the dictionary count does. String fields stay on the dictionary
+    count: a fixed width string array is as wide as the longest value of the batch.
+
+    Only used with {'count_engine': 'numpy'}: with one add() call per value it is not
+    faster than the dictionary count (see test/benchmarks/bench_duplicate_engine.py).
+    """
+
+    BATCH_SIZE = 1000000
+
+    # QVariant field type -> kind of array the values are counted in
+    FIELD_KINDS = {
+        QVariant.Int: 'int',
+        QVariant.UInt: 'int',
+        QVariant.LongLong: 'int',
+        QVariant.Double: 'float',
+        QVariant.Date: 'date',
+    }
+
+    @staticmethod
+    def is_available() -> bool:
+        return np is not None
+
+    @classmethod
+    def for_field(cls, field):
+        """Returns a counter for the field, or None if its type has no typed array equivalent."""
+        kind = cls.FIELD_KINDS.get(field.type())
+        return cls(kind) if kind and cls.is_available() else None
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._buffer = []
+        self._positions = []  # position of every buffered value in the whole stream
+        self._position = 0
+        # Per batch: unique values, their counts and the position of their first appearance
+        self._batches = []
+        self.null_count = 0
+        self.null_first_position = None
+        # str(value) -> [count, first position], for the values kept out of the arrays
+        self._other_counts = {}
+
+    def add(self, value):
+        """Counts one value."""
+        position = self._position
+        self._position += 1
+
+        if value is None or isinstance(value, QVariant) or value == '':
+            self.null_count += 1
+            if self.null_first_position is None:
+                self.null_first_position = position
+            return
+
+        if self.kind == 'date':
+            if not (isinstance(value, QDate) and value.isValid()):
+                self._count_other(value, position)
+                return
+            value = value.toJulianDay()
+        self._buffer.append(value)
+        self._positions.append(position)
+        if len(self._buffer) >= self.BATCH_SIZE:
+            self._flush()
+
+    def _count_other(self, value, position):
+        """Counts a value by its string, outside of the arrays."""
+        entry = self._other_counts.setdefault(str(value), [0, position])
+        entry[0] += 1
+
+    def _flush(self):
+        """Counts the buffered batch with np.unique and keeps only its unique values."""
+        if not self._buffer:
+            return
+        dtype = {'int': np.int64, 'float': np.float64, 'date': np.int64}[self.kind]
+        values = np.asarray(self._buffer, dtype=dtype)
+        positions = np.asarray(self._positions, dtype=np.int64)
+        self._buffer = []
+        self._positions = []
+
+        uniques, first_index, counts = np.unique(values, return_index=True, return_counts=True)
+        self._batches.append((uniques, counts, positions[first_index]))
+
+    def duplicates(self) -> list:
+        """
+        Returns the duplicated values as (value string, count) tuples, in order of first appearance.
+        """
+        self._flush()
+        found = []
+
+        if self._batches:
+            # Merge the batches: unique again over the per-batch uniques, summing their counts
+            all_uniques = np.concatenate([batch[0] for batch in self._batches])
+            all_counts = np.concatenate([batch[1] for batch in self._batches])
+            all_positions = np.concatenate([batch[2] for batch in self._batches])
+
+            uniques, inverse = np.unique(all_uniques, return_inverse=True)
+            counts = np.bincount(inverse, weights=all_counts).astype(np.int64)
+            first_positions = np.full(len(uniques), np.iinfo(np.int64).max, dtype=np.int64)
+            np.minimum.at(first_positions, inverse, all_positions)
+
+            duplicated = np.nonzero(counts > 1)[0]
+            for i in duplicated:
+                found.append((int(first_positions[i]), self._to_string(uniques[i]), int(counts[i])))
+
+        if self.null_count > 1:
+            found.append((self.null_first_position, None, self.null_count))
+
+        for value, (count, first_position) in self._other_counts.items():
+            if count > 1:
+                found.append((first_position, value, count))
+
+        found.sort(key=lambda item: item[0])
+        return [(value, count) for _, value, count in found]
+
+    def _to_string(self, value) -> str:
+        """Formats a counted value the same way str() formats the original field value."""
+        if self.kind == 'date':
+            return str(QDate.fromJulianDay(int(value)))
+        return str(value.item())
@@ -1,20 +1,31 @@
 # gis_auditor_report/core/check/spatial_check.py
 
 from qgis.core import (
-    QgsProject, 
-    QgsSpatialIndex, 
+    QgsRectangle,
+    QgsVectorLayerFeatureSource,
+    QgsWkbTypes,
 )
+from .base_check import BaseCheck
+from .tiled_spatial import TiledSpatialCheck
+from ..index_cache import SpatialIndexCache, build_geometry_index
+from ..predicate_engine import PointInPolygonEngine, PreparedPredicateEngine
+from ..strtree_engine import StrTreeJoinEngine
+from ..containment_engine import ContainmentCells, ContainmentEngine
+from ..join_planner import ReverseJoin, plan_join
 
-class SpatialCheck:
+class SpatialCheck(BaseCheck):
     """
     Performs a hardcoded spatial relationship check between a parent and child layer.
     It checks if child features are within or contained by the parent features.
     """
 
-    def __init__(self, config: dict):
-        self.config = config
-        self.parent_layer = QgsProject.instance().mapLayer(config.get('parent_id'))
-        self.child_layer = QgsProject.instance().mapLayer(config.get('child_id'))
+    # Children collected for one STRtree query, keeps the memory bounded on large layers
+    STRTREE_BATCH_SIZE = 100000
+
+    def __init__(self, config: dict, layer_store=None):
+        super().__init__(config, layer_store)
+        self.parent_layer = self.layer_store.mapLayer(config.get('parent_id'))
+        self.child_layer = self.layer_store.mapLayer(config.get('child_id'))
         self.child_unique_field = config.get('child_unique_field')
 
 
@@ -29,63 +40,241 @@ class SpatialCheck:
         if self.child_layer:
             print(f"[DEBUG] Child layer name: {self.child_layer.name()}")
             print(f"[DEBUG] Child layer fields: {self.child_layer.fields().names()}")
+
+        # Thread-safe snapshots of both layers, created here on the main thread
+        # so that run() can be executed from a worker thread
+        self.parent_source = QgsVectorLayerFeatureSource(self.parent_layer) if self.parent_layer else None
+        self.child_source = QgsVectorLayerFeatureSource(self.child_layer) if self.child_layer else None
+        self.child_fields = self.child_layer.fields() if self.child_layer else None
+        self.child_count = self.child_layer.featureCount() if self.child_layer else 0
+
+        # The parent index is shared through the cache, remember which version of the data we see
+        if self.parent_layer:
+            self.parent_fingerprint = SpatialIndexCache.fingerprint(self.parent_layer)
+            self.parent_count = self.parent_layer.featureCount()
+            SpatialIndexCache.instance().watch(self.parent_layer)
+
+        # Very large child layers can be split into tiles checked by several processes,
+        # e.g. {'tiled': True, 'tile_count': 64, 'tile_workers': 8} in the config
+        self.tiled_check = None
+        if config.get('tiled') and self.parent_layer and self.child_layer:
+            if TiledSpatialCheck.is_supported(self.child_layer, self.parent_layer):
+                self.tiled_check = TiledSpatialCheck(
+                    self.child_layer, self.parent_layer, self.child_unique_field,
+                    config.get('tile_count'), config.get('tile_workers')
+                )
+            else:
+                print("[WARNING] Tiled spatial check needs file or database layers without unsaved edits and a Python interpreter for the workers, running in one thread")
+
+        # Planning: index the parents and stream the children, or the other way round when that
+        # is much cheaper (e.g. few children, many parents). {'plan': 'forward' | 'reverse'} forces it
+        self.plan = None
+        if self.parent_layer and self.child_layer and not self.tiled_check:
+            self.plan = plan_join(self.child_layer, self.parent_layer, config.get('plan', 'auto'))
+        self.reverse = bool(self.plan) and self.plan['mode'] == 'reverse'
+        self.reverse_join = None  # indexed children of the reverse plan
+
+        # With Shapely 2 the children are collected and joined with the parents in one
+        # vectorised STRtree query, {'engine': 'qgis'} keeps the QgsSpatialIndex loop
+        self.use_strtree = config.get('engine', 'auto') != 'qgis' and StrTreeJoinEngine.is_available()
+        self.strtree = None
+        self.bulk_children = []  # (child id value, fid, wkb) waiting for the STRtree query
+
+        # The child layer is streamed, the parent layer is indexed in prepare()
+        self.scan_layer = self.child_layer
+        self.scan_source = self.child_source
+        self.scan_count = self.child_count
+        if self.reverse:
+            # Reversed: the parents near the children are streamed, the children are indexed
+            self.scan_layer = self.parent_layer
+            self.scan_source = self.parent_source
+            self.scan_count = self.parent_count
+            self.scan_rect = QgsRectangle(self.child_layer.extent())
+        self.parent_index = None
+        self.parent_predicates = None
+        # Point children are tested with the point-in-polygon engine when the STRtree isn't used
+        self.points_only = bool(self.child_layer) and PointInPolygonEngine.is_point_layer(self.child_layer)
+        self.point_engine = None
+        # Other children of polygon parents go through the containment engine (interior / boundary
+        # cells of every parent), {'containment_max_depth': 0} keeps the plain parent index
+        is_polygon_parent = bool(self.parent_layer) and self.parent_layer.geometryType() == QgsWkbTypes.PolygonGeometry
+        self.containment_max_depth = config.get('containment_max_depth', ContainmentCells.DEFAULT_MAX_DEPTH) if is_polygon_parent else 0
+        self.containment = None
+        self.errors_found = 0
+        self.total_children = 0
+        self.child_field_index = -1
         
         
         self.results = {
             'check_type': 'spatial',
             'parent_layer_name': self.parent_layer.name() if self.parent_layer else 'Invalid Layer',
             'child_layer_name': self.child_layer.name() if self.child_layer else 'Invalid Layer',
-            'errors': []
+            # Compact columns instead of one dictionary per error, iterates as {'child_id', 'fid'}
+            'errors': self.error_store((('child_id', 'value'), ('fid', 'int')))
         }
+        if self.plan:
+            # Which side was indexed, for the run metadata. The errors don't depend on it
+            self.results['plan'] = self.plan
 
-    def run(self) -> dict:
-        if not self.parent_layer or not self.child_layer:
+    def prepare(self, feedback=None) -> bool:
+        """Validates both layers and builds the parent spatial index."""
+        if not self.parent_source or not self.child_source:
             print("[ERROR] Invalid parent or child layer")
-            return self.results
+            return False
             
-        print(f"Running spatial check on layers: {self.parent_layer.name()} and {self.child_layer.name()}")
-        
-        # Build a spatial index for the parent layer for efficient lookup
-        parent_index = QgsSpatialIndex(self.parent_layer.getFeatures())
-        
-        errors_found = 0
-        total_children = 0
+        print(f"Running spatial check on layers: {self.results['parent_layer_name']} and {self.results['child_layer_name']}")
 
-        # 1. Iterate through all child features
-        for child_feature in self.child_layer.getFeatures():
-            child_geom = child_feature.geometry()
-            child_id_value = child_feature[self.child_unique_field]
-            
-            # Get child ID - use feature ID if field not specified or invalid
-            if self.child_unique_field and self.child_unique_field in self.child_layer.fields().names():
-                child_id_value = child_feature[self.child_unique_field]
-            else:
-                child_id_value = child_feature.id()
+        # Partitioned mode: the worker processes do the whole check, no scan needed here
+        if self.tiled_check:
+            tiled_errors = self.tiled_check.run(feedback)
+            if tiled_errors is not None:
+                self.results['errors'].extend(tiled_errors)
+                self.errors_found = len(tiled_errors)
+                self.total_children = self.child_count
+            self.needs_scan = False
+            return True
+
+        self.errors_found = 0
+        self.total_children = 0
+
+        # Resolve the child ID field once - use feature ID if field not specified or invalid
+        self.child_field_index = self.child_fields.indexOf(self.child_unique_field) if self.child_unique_field else -1
+        if self.child_unique_field and self.child_field_index < 0:
+            print(f"[WARNING] Child unique field '{self.child_unique_field}' not found, using feature IDs")
+
+        if self.reverse:
+            # Index the children, each streamed parent marks the ones it contains
+            self.reverse_join = ReverseJoin(self.child_source, self.child_field_index)
+            return True
+
+        if self.use_strtree:
+            # Get the STRtree of the parent layer from the cache, or export the parents and build it
+            self.strtree = SpatialIndexCache.instance().get_or_build(
+                self.parent_layer.id(),
+                self.parent_fingerprint,
+                'strtree',
+                lambda: StrTreeJoinEngine.build(self.parent_source, self.parent_count)
+            )
+            self.bulk_children = []
+        elif self.containment_max_depth and not self.points_only:
+            # Get the cells of the parents from the cache, or build them
+            depth = self.containment_max_depth
+            cells = SpatialIndexCache.instance().get_or_build(
+                self.parent_layer.id(),
+                self.parent_fingerprint,
+                f'containment:{depth}',
+                lambda: ContainmentCells.build(self.parent_source, depth)
+            )
+            # Only the cells are shared, this check prepares its own parents for GEOS
+            self.parent_predicates = PreparedPredicateEngine(cells.geometries.get)
+            self.containment = ContainmentEngine(cells, self.parent_predicates)
+        else:
+            # Get the spatial index of the parent layer from the cache, or build it for efficient lookup.
+            # It stores the parent geometries too, so the candidates never go back to the provider
+            self.parent_index = SpatialIndexCache.instance().get_or_build(
+                self.parent_layer.id(),
+                self.parent_fingerprint,
+                'geometry_index',
+                lambda: build_geometry_index(self.parent_source, self.parent_count)
+            )
+            # Parent geometries are prepared for GEOS once, the first time they are a candidate
+            self.parent_predicates = PreparedPredicateEngine(self.parent_index.geometry)
+            if self.points_only:
+                self.point_engine = PointInPolygonEngine(self.parent_index, self.parent_predicates)
+        return True
+
+    def required_attributes(self) -> list:
+        """Only the child ID field is read from the children, nothing from streamed parents."""
+        if self.reverse:
+            return []
+        return [self.child_field_index] if self.child_field_index >= 0 else []
+
+    def consume(self, child_feature):
+        """Checks that one child feature lies within a parent feature."""
+        if self.reverse:
+            # The feature is a parent: mark the children it contains
+            self.reverse_join.mark(child_feature.geometry(), 'contains')
+            return
+
+        self.total_children += 1
+
+        # Get child ID - use feature ID if field not specified or invalid
+        if self.child_field_index >= 0:
+            child_id_value = child_feature[self.child_field_index]
+        else:
+            child_id_value = child_feature.id()
+
+        if self.strtree:
+            # Tested in batches, one vectorised query per STRTREE_BATCH_SIZE children
+            self.bulk_children.append((child_id_value, child_feature.id(), StrTreeJoinEngine.to_wkb(child_feature)))
+            if len(self.bulk_children) >= self.STRTREE_BATCH_SIZE:
+                self._flush_bulk_children()
+            return
+
+        child_geom = child_feature.geometry()
+
+        if self.point_engine:
+            # Point children: point lookup and interior rectangle shortcut
+            is_within_any_parent = self.point_engine.within_any(child_geom)
+        elif self.containment:
+            # Interior cells answer most children, the others get the exact test
+            is_within_any_parent = self.containment.within_any(child_geom)
+        else:
+            candidate_parent_ids = self.parent_index.intersects(child_geom.boundingBox())
+            self.stats.counters['index_candidates'] += len(candidate_parent_ids)
 
-            
-            
-            candidate_parent_ids = parent_index.intersects(child_geom.boundingBox())
-            
             # Check if child is within ANY parent feature
             is_within_any_parent = False
-            
+
             for parent_id in candidate_parent_ids:
-                parent_feature = self.parent_layer.getFeature(parent_id)
-                parent_geom = parent_feature.geometry()
-                
-                # Child is valid if it's within OR contained by the parent
+                # Child is valid if it's within the parent, which is the same as the parent containing it,
+                # so a single test against the prepared parent answers both
                 # We don't care which parent, just that there is one
-                if child_geom.within(parent_geom) or parent_geom.contains(child_geom):
+                if self.parent_predicates.contains(parent_id, child_geom):
                     is_within_any_parent = True
                     break  # Found a valid parent, no need to check others
-            
-            # If child is NOT within any parent, it's an error
-            if not is_within_any_parent:
-                errors_found += 1
-                self.results['errors'].append({
-                    'child_id': child_id_value
-                })
         
-        print(f"[DEBUG] Spatial check complete: checked {total_children} children, {errors_found} are outside all parents")
+        # If child is NOT within any parent, it's an error
+        if not is_within_any_parent:
+            self.errors_found += 1
+            self.results['errors'].add(child_id_value, child_feature.id())
+
+    def collect_stats(self):
+        """Counters of whichever engine ran, for results['diagnostics']."""
+        if self.parent_predicates:
+            self.stats.count('predicate_calls', self.parent_predicates.call_count)
+        if self.point_engine:
+            self.stats.count('index_candidates', self.point_engine.candidate_count)
+        if self.containment:
+            self.stats.count('index_candidates', self.containment.candidate_count)
+        if self.reverse_join:
+            self.stats.count('index_candidates', self.reverse_join.candidate_count)
+            self.stats.count('predicate_calls', self.reverse_join.predicate_calls)
+
+    def _flush_bulk_children(self):
+        """Tests the collected children with one vectorised query: which are within at least one parent."""
+        if not self.bulk_children:
+            return
+        is_within = self.strtree.matches([child[2] for child in self.bulk_children], 'within')
+        for (child_id_value, fid, _), within in zip(self.bulk_children, is_within):
+            if not within:
+                self.errors_found += 1
+                self.results['errors'].add(child_id_value, fid)
+        self.bulk_children = []
+
+    def finish(self) -> dict:
+        if self.strtree:
+            # The last, partial batch
+            self._flush_bulk_children()
+
+        if self.reverse_join:
+            # Children no parent marked, in child order like the forward plan reports them
+            for fid, child_id_value in self.reverse_join.features(marked=False):
+                self.errors_found += 1
+                self.results['errors'].add(child_id_value, fid)
+            self.total_children = len(self.reverse_join.order)
+            self.reverse_join = None
+
+        print(f"[DEBUG] Spatial check complete: checked {self.total_children} children, {self.errors_found} are outside all parents")
         
-        return self.results
\ No newline at end of file
+        return self.results
@@ -0,0 +1,183 @@
+# gis_auditor_report/core/check/spilling_counter.py
+
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import zlib
+
+
+class SpillingCounter:
+    """
+    Counts values with a bounded amount of memory.
+
+    Values are counted in a dictionary until its estimated size reaches the memory
+    limit. The dictionary is then written out to temporary spill files, each value
+    going to the partition picked by the CRC32 of its text, and counting starts over.
+    At the end every partition is counted on its own (a value always lands in the
+    same partition) and only the values seen more than once are kept. They are
+    returned in order of first appearance, like a single dictionary would.
+    A partition with more distinct values than the limit allows is split again
+    while merging, so the limit also holds for the merge.
+    """
+
+    # Rough cost of one dictionary entry on top of the key: hash slot, count list, ints
+    ENTRY_OVERHEAD = 150
+    DEFAULT_PARTITIONS = 64
+    # A partition over the memory limit while merging is split again into this many parts,
+    # up to MAX_SPLIT_LEVEL times
+    SPLIT_FANOUT = 16
+    MAX_SPLIT_LEVEL = 4
+    # Items buffered while splitting a partition before they are written to the parts
+    SPLIT_WRITE_ITEMS = 10000
+
+    def __init__(self, memory_limit_mb: float, partitions: int = DEFAULT_PARTITIONS, spill_dir: str = None):
+        self.memory_limit = int(memory_limit_mb * 1024 * 1024)
+        self.partitions = partitions
+        self.spill_dir = spill_dir
+        self.spill_count = 0
+        # Number of partitions split again while merging
+        self.split_count = 0
+        self._counts = {}  # value -> [count, first position]
+        self._memory = 0
+        self._position = 0
+        self._temp_dir = None
+
+    def add(self, value):
+        """Counts one value, spilling to disk when the memory limit is reached."""
+        entry = self._counts.get(value)
+        if entry is None:
+            self._counts[value] = [1, self._position]
+            self._memory += sys.getsizeof(value) + self.ENTRY_OVERHEAD
+            if self._memory >= self.memory_limit:
+                self._spill()
+        else:
+            entry[0] += 1
+        self._position += 1
+
+    def _partition(self, value) -> int:
+        return zlib.crc32(repr(value).encode('utf-8')) % self.partitions
+
+    def _partition_path(self, partition: int) -> str:
+        return os.path.join(self._temp_dir, f"partition_{partition}.pickle")
+
+    def _spill(self):
+        """Appends the counted values to their partition files and empties the dictionary."""
+        if self._temp_dir is None:
+            self._temp_dir = tempfile.mkdtemp(prefix='gis_auditor_spill_', dir=self.spill_dir)
+
+        buckets = [[] for _ in range(self.partitions)]
+        for value, (count, first_position) in self._counts.items():
+            buckets[self._partition(value)].append((value, count, first_position))
+
+        for partition, bucket in enumerate(buckets):
+            if bucket:
+                with open(self._partition_path(partition), 'ab') as f:
+                    pickle.dump(bucket, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.spill_count += 1
+        print(f"[DEBUG] Spilled {len(self._counts)} values to disk (spill {self.spill_count})")
+        self._counts = {}
+        self._memory = 0
+
+    def duplicates(self) -> list:
+        """
+        Returns the values counted more than once as (value, count) tuples,
+        in order of first appearance. Removes the spill files.
+        """
+        if self._temp_dir is None:
+            # Everything fitted in memory
+            found = [(first, value, count) for value, (count, first) in self._counts.items() if count > 1]
+        else:
+            self._spill()
+            found = []
+            try:
+                for partition in range(self.partitions):
+                    found.extend(self._partition_duplicates(partition))
+            finally:
+                self.close()
+
+        self._counts = {}
+        found.sort(key=lambda item: item[0])
+        return [(value, count) for _, value, count in found]
+
+    def _partition_duplicates(self, partition: int) -> list:
+        """Merges the spilled counts of one partition, returns (first position, value, count) of the duplicates."""
+        path = self._partition_path(partition)
+        if not os.path.exists(path):
+            return []
+        return self._merge_file(path, 0)
+
+    @staticmethod
+    def _read_buckets(path: str):
+        """Yields the buckets pickled one after the other into a spill file."""
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def _merge_file(self, path: str, level: int) -> list:
+        """
+        Merges the counts of one spill file. When its distinct values don't fit
+        the memory limit the file is split again and every part is merged on its own.
+        """
+        counts = {}
+        memory = 0
+        for bucket in self._read_buckets(path):
+            for value, count, first_position in bucket:
+                entry = counts.get(value)
+                if entry is None:
+                    counts[value] = [count, first_position]
+                    memory += sys.getsizeof(value) + self.ENTRY_OVERHEAD
+                    if memory >= self.memory_limit and level < self.MAX_SPLIT_LEVEL:
+                        counts = None
+                        return self._split_and_merge(path, level + 1)
+                else:
+                    # Spills happen in stream order, the first one holds the first position
+                    entry[0] += count
+
+        return [(first, value, count) for value, (count, first) in counts.items() if count > 1]
+
+    def _split_and_merge(self, path: str, level: int) -> list:
+        """Spreads a spill file over SPLIT_FANOUT smaller files and merges each of them."""
+        print(f"[DEBUG] Spill file {os.path.basename(path)} is over the memory limit, splitting it (level {level})")
+        self.split_count += 1
+        part_paths = [f"{path}.{part}" for part in range(self.SPLIT_FANOUT)]
+        parts = [[] for _ in part_paths]
+        pending = 0
+
+        def write_parts():
+            for part_path, part in zip(part_paths, parts):
+                if part:
+                    with open(part_path, 'ab') as f:
+                        pickle.dump(part, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    part.clear()
+
+        for bucket in self._read_buckets(path):
+            for item in bucket:
+                # Another hash than the partition one, or the values would all land in the same part
+                parts[hash((level, item[0])) % self.SPLIT_FANOUT].append(item)
+                pending += 1
+                if pending >= self.SPLIT_WRITE_ITEMS:
+                    write_parts()
+                    pending = 0
+        write_parts()
+        os.remove(path)
+
+        found = []
+        for part_path in part_paths:
+            if os.path.exists(part_path):
+                found.extend(self._merge_file(part_path, level))
+                # A part split again was already removed
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+        return found
+
+    def close(self):
+        """Removes the spill files, if any."""
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
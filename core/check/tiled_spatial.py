@@ -0,0 +1,206 @@
+# gis_auditor_report/core/check/tiled_spatial.py
+
+import math
+import os
+import sys
+from multiprocessing import get_context
+
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import (
+    NULL,
+    QgsFeatureRequest,
+    QgsRectangle,
+    QgsSpatialIndex,
+    QgsVectorLayer,
+)
+from ..predicate_engine import PreparedPredicateEngine
+
+QGIS_APP = None  # Headless QGIS application of a worker process
+
+
+def _start_worker_qgis():
+    """Pool initializer: every worker process opens the data sources with its own QGIS application."""
+    global QGIS_APP  # pylint: disable=W0603
+    if QGIS_APP is None:
+        from qgis.core import QgsApplication
+        QGIS_APP = QgsApplication([], False)
+        QGIS_APP.initQgis()
+
+
+def _python_executable():
+    """
+    Inside QGIS desktop sys.executable can be the QGIS binary itself, which must not
+    be spawned as a worker. Look for the Python interpreter shipped next to it.
+    Returns None when there is none, the check can't be partitioned then.
+    """
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    for name in ('python3', 'python', 'python3.exe', 'python.exe'):
+        for folder in (sys.exec_prefix, os.path.join(sys.exec_prefix, 'bin')):
+            candidate = os.path.join(folder, name)
+            if os.path.exists(candidate):
+                return candidate
+    return None
+
+
+def _check_tile(job: tuple) -> tuple:
+    """
+    Worker: checks the children whose bounding box centre falls in one tile.
+    Only the parents overlapping those children are loaded, with setFilterRect.
+    Returns the number of children checked and the (fid, id value) of the failing ones.
+    """
+    (child_uri, child_provider, parent_uri, parent_provider,
+     child_field_name, tile, is_last_column, is_last_row) = job
+    tile_rect = QgsRectangle(*tile)
+
+    child_layer = QgsVectorLayer(child_uri, 'child', child_provider)
+    field_index = child_layer.fields().indexOf(child_field_name) if child_field_name else -1
+    request = QgsFeatureRequest().setFilterRect(tile_rect)
+    request.setSubsetOfAttributes([field_index] if field_index >= 0 else [])
+
+    # 1. Collect the children of this tile. A child crossing tile borders is returned for
+    #    several tiles, it only belongs to the one containing its centre (half-open tiles)
+    children = []
+    children_extent = QgsRectangle()
+    children_extent.setMinimal()
+    for feature in child_layer.getFeatures(request):
+        geometry = feature.geometry()
+        box = geometry.boundingBox()
+        center = box.center()
+        in_x = tile_rect.xMinimum() <= center.x() < tile_rect.xMaximum() or (is_last_column and center.x() == tile_rect.xMaximum())
+        in_y = tile_rect.yMinimum() <= center.y() < tile_rect.yMaximum() or (is_last_row and center.y() == tile_rect.yMaximum())
+        if not (in_x and in_y):
+            continue
+
+        value = feature[field_index] if field_index >= 0 else feature.id()
+        if isinstance(value, QVariant):
+            # NULL (a QVariant) can't be sent back to the main process
+            value = None
+        children.append((feature.id(), value, geometry))
+        children_extent.combineExtentWith(box)
+
+    if not children:
+        return 0, []
+
+    # 2. Load only the parents that can contain one of these children
+    parent_layer = QgsVectorLayer(parent_uri, 'parent', parent_provider)
+    parent_request = QgsFeatureRequest().setFilterRect(children_extent).setNoAttributes()
+    parent_index = QgsSpatialIndex(parent_layer.getFeatures(parent_request), None,
+                                   QgsSpatialIndex.FlagStoreFeatureGeometries)
+
+    parent_predicates = PreparedPredicateEngine(parent_index.geometry)
+
+    # 3. Same test as SpatialCheck.consume()
+    errors = []
+    for fid, value, geometry in children:
+        candidates = parent_index.intersects(geometry.boundingBox())
+        if not any(parent_predicates.contains(parent_id, geometry) for parent_id in candidates):
+            errors.append((fid, value))
+    return len(children), errors
+
+
+class TiledSpatialCheck:
+    """
+    Partitioned execution mode of the SpatialCheck for very large child layers.
+
+    The extent of the child layer is split into a grid of tiles, and the tiles are
+    checked by a pool of worker processes. Every worker opens both data sources
+    itself from their URI (no QgsProject involved) and only loads the parents that
+    overlap its tile. The failing children are merged back in feature id order.
+    """
+
+    def __init__(self, child_layer, parent_layer, child_field_name: str, tile_count: int = None, workers: int = None):
+        # Everything the workers need is captured here, on the main thread
+        self.child_uri = child_layer.source()
+        self.child_provider = child_layer.providerType()
+        self.parent_uri = parent_layer.source()
+        self.parent_provider = parent_layer.providerType()
+        self.child_field_name = child_field_name
+        self.child_count = child_layer.featureCount()
+        self.extent = child_layer.extent()
+        self.workers = workers or os.cpu_count() or 1
+        # A few tiles per worker keeps them all busy when the data is unevenly spread
+        self.tile_count = tile_count or self.workers * 4
+
+    @staticmethod
+    def is_supported(child_layer, parent_layer) -> bool:
+        """
+        Workers open the layers from their URI, so memory layers and unsaved edits can't be partitioned.
+        Neither can anything without a Python interpreter to start the workers with.
+        """
+        if _python_executable() is None:
+            print("[WARNING] No Python interpreter found for the worker processes, the check runs on one thread")
+            return False
+        for layer in (child_layer, parent_layer):
+            if layer.providerType() == 'memory':
+                return False
+            edit_buffer = layer.editBuffer()
+            if edit_buffer and edit_buffer.isModified():
+                return False
+        return True
+
+    def _tiles(self) -> list:
+        """Splits the child extent into a grid of about tile_count tiles."""
+        columns = max(1, int(math.ceil(math.sqrt(self.tile_count))))
+        rows = max(1, int(math.ceil(self.tile_count / columns)))
+        width = self.extent.width() / columns
+        height = self.extent.height() / rows
+
+        tiles = []
+        for row in range(rows):
+            for column in range(columns):
+                x_min = self.extent.xMinimum() + column * width
+                y_min = self.extent.yMinimum() + row * height
+                # The last row / column ends exactly on the extent, no rounding gap
+                x_max = self.extent.xMaximum() if column == columns - 1 else x_min + width
+                y_max = self.extent.yMaximum() if row == rows - 1 else y_min + height
+                tiles.append(((x_min, y_min, x_max, y_max), column == columns - 1, row == rows - 1))
+        return tiles
+
+    def run(self, feedback=None):
+        """
+        Checks all tiles in the process pool. Returns the errors as SpatialCheck
+        dictionaries in child feature id order, or None if cancelled.
+        """
+        jobs = [
+            (self.child_uri, self.child_provider, self.parent_uri, self.parent_provider,
+             self.child_field_name, tile, is_last_column, is_last_row)
+            for tile, is_last_column, is_last_row in self._tiles()
+        ]
+        print(f"[DEBUG] Tiled spatial check: {len(jobs)} tiles on {self.workers} processes")
+
+        context = get_context('spawn')
+        context.set_executable(_python_executable())
+
+        checked_count = 0
+        tile_errors = []
+        with context.Pool(processes=min(self.workers, len(jobs)), initializer=_start_worker_qgis) as pool:
+            for done, (tile_checked, errors) in enumerate(pool.imap_unordered(_check_tile, jobs), start=1):
+                if feedback and feedback.isCanceled():
+                    pool.terminate()
+                    return None
+                if feedback:
+                    feedback.setProgress(done * 100.0 / len(jobs))
+                checked_count += tile_checked
+                tile_errors.extend(errors)
+
+        # Children without geometry have no centre and are in no tile, they are errors too
+        if checked_count < self.child_count:
+            tile_errors.extend(self._children_without_geometry())
+
+        # Merge back in child order, a feature id is only reported once
+        errors_by_fid = dict(tile_errors)
+        return [
+            {'child_id': NULL if errors_by_fid[fid] is None else errors_by_fid[fid], 'fid': fid}
+            for fid in sorted(errors_by_fid)
+        ]
+
+    def _children_without_geometry(self) -> list:
+        """Finds the children that no tile could see."""
+        child_layer = QgsVectorLayer(self.child_uri, 'child', self.child_provider)
+        field_index = child_layer.fields().indexOf(self.child_field_name) if self.child_field_name else -1
+        request = QgsFeatureRequest().setFilterExpression('is_empty_or_null($geometry)')
+        return [
+            (feature.id(), feature[field_index] if field_index >= 0 else feature.id())
+            for feature in child_layer.getFeatures(request)
+        ]
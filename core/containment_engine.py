@@ -0,0 +1,143 @@
+# gis_auditor_report/core/containment_engine.py
+
+from qgis.core import QgsFeatureRequest, QgsFeature, QgsGeometry, QgsRectangle, QgsSpatialIndex
+
+from .index_cache import SpatialIndexCache
+from .predicate_engine import PreparedPredicateEngine
+
+
+class ContainmentCells:
+    """
+    Cells covering large parent polygons, for the ContainmentEngine.
+
+    Every parent is covered by a quadtree of cells, each classified as
+    - interior: the cell lies completely inside the parent,
+    - boundary: the cell crosses the parent boundary,
+    and cells outside the parent are dropped. Both kinds of cells are indexed.
+    Once built the cells are only read, so they can be cached and shared by
+    several checks; the prepared parents and counters belong to each engine.
+    """
+
+    DEFAULT_MAX_DEPTH = 5
+    # Parents with fewer vertices are cheap to test exactly, they get a single boundary cell
+    MIN_VERTICES = 64
+
+    def __init__(self, max_depth: int = DEFAULT_MAX_DEPTH):
+        self.max_depth = max_depth
+        self.geometries = {}  # parent fid -> QgsGeometry
+        self.interior_index = QgsSpatialIndex()
+        self.boundary_index = QgsSpatialIndex()
+        self.interior_cells = []  # cell id -> (QgsRectangle, parent fid)
+        self.boundary_cells = []  # cell id -> parent fid
+
+    @classmethod
+    def build(cls, source, max_depth: int = DEFAULT_MAX_DEPTH) -> tuple:
+        """
+        Builds the cells of all parents of a feature source.
+        Returns the cells and their approximate memory use, to be used as a cache builder.
+        """
+        cells = cls(max_depth)
+        geometry_size = 0
+        for feature in source.getFeatures(QgsFeatureRequest().setNoAttributes()):
+            if not feature.hasGeometry() or feature.geometry().isEmpty():
+                continue
+            geometry = feature.geometry()
+            cells.geometries[feature.id()] = geometry
+            geometry_size += len(geometry.asWkb())
+            cells._add_parent(feature.id(), geometry)
+
+        cell_count = len(cells.interior_cells) + len(cells.boundary_cells)
+        print(f"[DEBUG] Containment engine: {len(cells.interior_cells)} interior and "
+              f"{len(cells.boundary_cells)} boundary cells for {len(cells.geometries)} parents")
+        estimated_size = geometry_size + cell_count * SpatialIndexCache.BYTES_PER_INDEX_ENTRY * 2
+        return cells, estimated_size
+
+    def _add_parent(self, fid, geometry: QgsGeometry):
+        """Splits one parent into interior and boundary cells."""
+        box = geometry.boundingBox()
+        if geometry.constGet().nCoordinates() < self.MIN_VERTICES or self.max_depth <= 0:
+            self._add_boundary_cell(fid, box)
+            return
+
+        # The cells are classified with the prepared parent, like the children are tested later
+        parent_engine = QgsGeometry.createGeometryEngine(geometry.constGet())
+        parent_engine.prepareGeometry()
+
+        # Quadtree: cells crossing the boundary are split until max_depth
+        pending = [(box, 0)]
+        while pending:
+            rect, depth = pending.pop()
+            cell = QgsGeometry.fromRect(rect)
+            if parent_engine.contains(cell.constGet()):
+                self._add_interior_cell(fid, rect)
+            elif not parent_engine.intersects(cell.constGet()):
+                continue
+            elif depth >= self.max_depth:
+                self._add_boundary_cell(fid, rect)
+            else:
+                center = rect.center()
+                pending.extend([
+                    (QgsRectangle(rect.xMinimum(), rect.yMinimum(), center.x(), center.y()), depth + 1),
+                    (QgsRectangle(center.x(), rect.yMinimum(), rect.xMaximum(), center.y()), depth + 1),
+                    (QgsRectangle(rect.xMinimum(), center.y(), center.x(), rect.yMaximum()), depth + 1),
+                    (QgsRectangle(center.x(), center.y(), rect.xMaximum(), rect.yMaximum()), depth + 1),
+                ])
+
+    def _add_interior_cell(self, fid, rect: QgsRectangle):
+        self._add_cell(self.interior_index, len(self.interior_cells), rect)
+        self.interior_cells.append((rect, fid))
+
+    def _add_boundary_cell(self, fid, rect: QgsRectangle):
+        self._add_cell(self.boundary_index, len(self.boundary_cells), rect)
+        self.boundary_cells.append(fid)
+
+    @staticmethod
+    def _add_cell(index, cell_id: int, rect: QgsRectangle):
+        feature = QgsFeature(cell_id)
+        feature.setGeometry(QgsGeometry.fromRect(rect))
+        index.addFeature(feature)
+
+
+class ContainmentEngine:
+    """
+    Answers "is this child within one of the parents" for large parent polygons,
+    with as few exact GEOS tests as possible.
+
+    A child whose bounding box lies strictly inside an interior cell is within
+    that parent without any exact test. Otherwise only the parents owning a cell
+    touched by the child's bounding box get the exact (prepared) test.
+    Each check creates its own engine over the shared cells: prepared GEOS
+    geometries must not be used from several threads.
+    """
+
+    def __init__(self, cells: ContainmentCells, predicates: PreparedPredicateEngine):
+        self.cells = cells
+        self.predicates = predicates
+        self.shortcut_count = 0
+        self.candidate_count = 0
+
+    def within_any(self, geometry: QgsGeometry) -> bool:
+        """True if the geometry is within at least one parent."""
+        if geometry.isNull() or geometry.isEmpty():
+            return False
+        box = geometry.boundingBox()
+
+        # 1. Strictly inside an interior cell: its open rectangle lies in the parent's interior
+        candidate_fids = []
+        for cell_id in self.cells.interior_index.intersects(box):
+            self.candidate_count += 1
+            rect, fid = self.cells.interior_cells[cell_id]
+            if (rect.xMinimum() < box.xMinimum() and box.xMaximum() < rect.xMaximum()
+                    and rect.yMinimum() < box.yMinimum() and box.yMaximum() < rect.yMaximum()):
+                self.shortcut_count += 1
+                return True
+            candidate_fids.append(fid)
+
+        # 2. Exact test against every parent having a cell under the child, each one once
+        boundary_ids = self.cells.boundary_index.intersects(box)
+        self.candidate_count += len(boundary_ids)
+        candidate_fids.extend(self.cells.boundary_cells[cell_id] for cell_id in boundary_ids)
+        for fid in dict.fromkeys(candidate_fids):
+            if self.predicates.contains(fid, geometry):
+                return True
+        return False
@@ -0,0 +1,134 @@
+# gis_auditor_report/core/diagnostics.py
+
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident memory of the QGIS process in MB, None when it can't be measured."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+class CheckStats:
+    """
+    Timers and counters of one check run, stored in results['diagnostics'].
+
+    Timers (seconds):
+        index_build_time: prepare(), i.e. building or fetching the index (or the database count)
+        fetch_time: waiting for the provider to return the scanned features
+        predicate_time: consume() and finish(), the tests themselves (the counting for duplicates)
+    Counters:
+        features_scanned, index_candidates, predicate_calls
+    """
+
+    __slots__ = ('timers', 'counters', '_start', '_elapsed')
+
+    def __init__(self):
+        self.timers = defaultdict(float)
+        self.counters = defaultdict(int)
+        self._start = None
+        self._elapsed = 0.0
+
+    def start(self):
+        self._start = time.perf_counter()
+
+    def stop(self):
+        if self._start is not None:
+            self._elapsed += time.perf_counter() - self._start
+            self._start = None
+
+    @contextmanager
+    def timer(self, name: str):
+        """Adds the time spent in the with block to the timer name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] += time.perf_counter() - start
+
+    def add_time(self, name: str, seconds: float):
+        self.timers[name] += seconds
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def as_dict(self) -> dict:
+        """Plain dictionary of the numbers, ready for JSON."""
+        scanned = self.counters['features_scanned']
+        return {
+            'total_time': round(self._elapsed, 4),
+            'index_build_time': round(self.timers['index_build_time'], 4),
+            'fetch_time': round(self.timers['fetch_time'], 4),
+            'predicate_time': round(self.timers['predicate_time'], 4),
+            'features_scanned': scanned,
+            'index_candidates': self.counters['index_candidates'],
+            'candidates_per_feature': round(self.counters['index_candidates'] / scanned, 2) if scanned else 0,
+            'predicate_calls': self.counters['predicate_calls'],
+            'features_per_second': round(scanned / self._elapsed) if self._elapsed > 0 else 0,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+
+def timed_features(features, stats_list: list):
+    """
+    Yields the features of a getFeatures() iterator, adding the time spent waiting
+    for each of them to the fetch_time of every CheckStats in stats_list (a fused
+    scan fetches once for all its checks).
+    """
+    iterator = iter(features)
+    perf_counter = time.perf_counter
+    while True:
+        start = perf_counter()
+        try:
+            feature = next(iterator)
+        except StopIteration:
+            return
+        elapsed = perf_counter() - start
+        for stats in stats_list:
+            stats.timers['fetch_time'] += elapsed
+        yield feature
+
+
+def check_label(check_result: dict) -> str:
+    """Short description of a check result, e.g. 'assets (asset_no)' or 'poles in sites'."""
+    check_type = check_result.get('check_type')
+    if check_type == 'duplicate':
+        return f"{check_result.get('layer_name')} ({check_result.get('field_name')})"
+    if check_type == 'spatial':
+        return f"{check_result.get('child_layer_name')} in {check_result.get('parent_layer_name')}"
+    if check_type == 'exclusion':
+        return f"{check_result.get('target_layer_name')} vs {check_result.get('exclusion_layer_name')}"
+    return str(check_type)
+
+
+def diagnostics_rows(results: dict) -> list:
+    """One flat dictionary per check result that has diagnostics, in report order."""
+    rows = []
+    for check_type in ('duplicate', 'spatial', 'exclusion'):
+        for check_result in results.get(check_type, []):
+            if 'diagnostics' not in check_result:
+                continue
+            row = {
+                'check_type': check_type,
+                'check': check_label(check_result),
+                'plan': check_result.get('plan', {}).get('mode'),
+                'error_count': len(check_result.get('errors', [])),
+            }
+            row.update(check_result['diagnostics'])
+            rows.append(row)
+    return rows
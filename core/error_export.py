@@ -0,0 +1,224 @@
+# gis_auditor_report/core/error_export.py
+
+import os
+
+from qgis.core import (
+    QgsCoordinateTransform,
+    QgsFeature,
+    QgsFeatureRequest,
+    QgsField,
+    QgsFields,
+    QgsGeometry,
+    QgsProject,
+    QgsVectorFileWriter,
+    QgsVectorLayer,
+    QgsWkbTypes,
+)
+from qgis.PyQt.QtCore import QVariant
+
+from .check.duplicate_check import DuplicateCheck
+from .check.exclusion_check import ExclusionCheck
+from .check.spatial_check import SpatialCheck
+from .diagnostics import check_label
+from .result_store import iter_errors
+
+# All failing features go to one table. Its geometry column is the generic GEOMETRY type of
+# GeoPackage, so points, lines and polygons sit side by side and table checks have no geometry
+TABLE = 'errors'
+TABLE_WKB_TYPE = QgsWkbTypes.Unknown
+
+
+class FailingLayer:
+    """
+    The layer holding the failing features of a check, as the exporter reads it:
+    the feature source snapshot of the check, with the name, CRS and geometry type
+    of the layer taken on the main thread.
+    """
+
+    def __init__(self, layer, source):
+        self.source = source
+        self.name = layer.name()
+        self.crs = layer.crs()
+        self.geometry_type = layer.geometryType()
+
+    @classmethod
+    def of_check(cls, checker):
+        """The failing layer of a check, None if the check has no valid layer."""
+        if isinstance(checker, DuplicateCheck):
+            layer, source = checker.layer, checker.source
+        elif isinstance(checker, SpatialCheck):
+            layer, source = checker.child_layer, checker.child_source
+        elif isinstance(checker, ExclusionCheck):
+            layer, source = checker.target_layer, checker.target_source
+        else:
+            return None
+        return cls(layer, source) if layer is not None and source is not None else None
+
+
+class ErrorLayerExporter:
+    """
+    Writes the failing features of all checks, with their geometry, to a single
+    'errors' table of a GeoPackage so reviewers can see them on the map.
+
+    Every feature gets the check type, the check (e.g. 'poles in sites'), its
+    layer, its feature ID and the offending value. The writer adds the features
+    in batches within a single transaction, which is committed when the table
+    is closed, instead of one commit per feature.
+
+    The exporter is created and given the checks on the main thread, export()
+    only reads the feature source snapshots of the checks and can run in the
+    worker thread of the audit.
+    """
+
+    # Features fetched from the checked layer and handed to the writer at once
+    BATCH_SIZE = 50000
+
+    def __init__(self, gpkg_path: str, crs=None, transform_context=None):
+        self.gpkg_path = gpkg_path
+        project = QgsProject.instance()
+        # Everything is written in the project CRS, or the CRS of the first layer without one
+        self.crs = crs if crs is not None else project.crs()
+        self.transform_context = transform_context or project.transformContext()
+        self.fields = QgsFields()
+        self.fields.append(QgsField('check_type', QVariant.String))
+        self.fields.append(QgsField('config', QVariant.String))
+        self.fields.append(QgsField('layer', QVariant.String))
+        self.fields.append(QgsField('fid', QVariant.LongLong))
+        self.fields.append(QgsField('value', QVariant.String))
+        self.tables = {}  # table name -> number of features written, {TABLE: count} once exported
+        self.failing_layers = []  # (check, FailingLayer) of every check added
+
+    def add_checks(self, checkers: list):
+        """
+        Remembers where the failing features of each check are read from.
+        Must be called on the main thread, before the checks run.
+        """
+        for checker in checkers:
+            failing_layer = FailingLayer.of_check(checker)
+            if failing_layer is not None:
+                self.failing_layers.append((checker, failing_layer))
+
+    def export(self, feedback=None) -> dict:
+        """
+        Writes the failing features of the added checks, once they are finished.
+        Returns the number of features written to the table.
+        """
+        # 1. Only the checks that found errors are written
+        failing = [(checker, failing_layer) for checker, failing_layer in self.failing_layers
+                   if checker.results.get('errors')]
+        if not failing:
+            print("[DEBUG] No failing features to export")
+            return self.tables
+        if not self.crs.isValid():
+            self.crs = next((layer.crs for _, layer in failing if layer.crs.isValid()), self.crs)
+
+        # 2. A single table replacing an earlier export
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = 'GPKG'
+        options.layerName = TABLE
+        options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteFile
+        writer = QgsVectorFileWriter.create(self.gpkg_path, self.fields, TABLE_WKB_TYPE, self.crs,
+                                            self.transform_context, options)
+        if writer.hasError() != QgsVectorFileWriter.NoError:
+            print(f"[ERROR] Could not create {TABLE} in {self.gpkg_path}: {writer.errorMessage()}")
+            return self.tables
+
+        # 3. The failing features of every check, in batches
+        count = 0
+        for checker, layer in failing:
+            for batch in self._error_features(checker, layer):
+                if feedback and feedback.isCanceled():
+                    break
+                if not writer.addFeatures(batch):
+                    print(f"[ERROR] Failed to write error features: {writer.errorMessage()}")
+                count += len(batch)
+        # Deleting the writer commits the transaction and closes the table
+        del writer
+        self.tables[TABLE] = count
+        print(f"[DEBUG] {count} failing features written to {TABLE}")
+
+        return self.tables
+
+    def _error_features(self, checker, layer):
+        """Yields batches of output features for the errors of one check."""
+        results = checker.results
+        attributes = [results['check_type'], check_label(results), layer.name]
+        has_geometry = layer.geometry_type in (QgsWkbTypes.PointGeometry, QgsWkbTypes.LineGeometry,
+                                               QgsWkbTypes.PolygonGeometry)
+        transform = None
+        if has_geometry and layer.crs != self.crs:
+            transform = QgsCoordinateTransform(layer.crs, self.crs, self.transform_context)
+
+        def output_feature(feature, value):
+            output = QgsFeature(self.fields)
+            output.setAttributes(attributes + [feature.id(), None if value is None else str(value)])
+            if has_geometry and feature.hasGeometry():
+                output.setGeometry(self._output_geometry(feature.geometry(), transform))
+            return output
+
+        request = QgsFeatureRequest()
+        if not has_geometry:
+            request.setFlags(QgsFeatureRequest.NoGeometry)
+
+        if isinstance(checker, DuplicateCheck):
+            # Every feature holding a duplicated key is written, with the key as listed in the errors
+            duplicated_keys = checker.duplicated_keys()
+            request.setSubsetOfAttributes(checker.field_indexes)
+            batch = []
+            for feature in layer.source.getFeatures(request):
+                key = checker.error_key(feature)
+                if key in duplicated_keys:
+                    batch.append(output_feature(feature, duplicated_keys[key]))
+                    if len(batch) >= self.BATCH_SIZE:
+                        yield batch
+                        batch = []
+            if batch:
+                yield batch
+            return
+
+        # Spatial / exclusion errors list feature IDs, fetched in batches
+        value_column = 'child_id' if isinstance(checker, SpatialCheck) else 'target_id'
+        request.setNoAttributes()
+        pending = {}
+        for fid, value in iter_errors(results['errors'], 'fid', value_column):
+            pending[fid] = value
+            if len(pending) >= self.BATCH_SIZE:
+                yield self._fetch(layer, request, pending, output_feature)
+                pending = {}
+        if pending:
+            yield self._fetch(layer, request, pending, output_feature)
+
+    @staticmethod
+    def _fetch(layer, request, values_by_fid: dict, output_feature) -> list:
+        request.setFilterFids(list(values_by_fid))
+        return [output_feature(feature, values_by_fid[feature.id()]) for feature in layer.source.getFeatures(request)]
+
+    @staticmethod
+    def _output_geometry(geometry: QgsGeometry, transform) -> QgsGeometry:
+        """Copy of a geometry for the table: 2D, multi part like most layers, in the output CRS."""
+        geometry = QgsGeometry(geometry)
+        if transform is not None:
+            geometry.transform(transform)
+        geometry.get().dropZValue()
+        geometry.get().dropMValue()
+        geometry.convertToMultiType()
+        return geometry
+
+    def load_into_project(self, name: str, project=None):
+        """
+        Adds the written table to the project. Returns the added layer, None if nothing was written.
+        """
+        if TABLE not in self.tables:
+            return None
+        project = project or QgsProject.instance()
+        layer = QgsVectorLayer(f"{self.gpkg_path}|layername={TABLE}", name, 'ogr')
+        if not layer.isValid():
+            print(f"[ERROR] Could not load {TABLE} from {self.gpkg_path}")
+            return None
+        project.addMapLayer(layer)
+        return layer
+
+
+def error_layer_path(report_path: str) -> str:
+    """GeoPackage written next to a report, e.g. audit_errors.gpkg for audit.html."""
+    return os.path.splitext(report_path)[0] + '_errors.gpkg'
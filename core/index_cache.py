@@ -0,0 +1,178 @@
+# gis_auditor_report/core/index_cache.py
+
+import os
+import threading
+from collections import OrderedDict
+
+from qgis.core import QgsFeatureRequest, QgsProviderRegistry, QgsSpatialIndex
+
+
+class SpatialIndexCache:
+    """
+    Process-wide cache of spatial indexes (and similar per-layer lookup structures),
+    shared by all checks and kept between runs of the dialog.
+
+    Entries are keyed by layer ID, a 'kind' describing what was built, and a
+    fingerprint of the layer data. Least recently used entries are evicted once
+    the estimated memory use goes over the budget. Entries of a layer are dropped
+    as soon as the layer reports a change of its data.
+    """
+
+    DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024  # bytes
+    # Rough memory use of one entry of a QgsSpatialIndex (R-tree node + bounding box + id)
+    BYTES_PER_INDEX_ENTRY = 120
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        """Returns the cache shared by the whole QGIS session."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        self._entries = OrderedDict()  # key -> (value, estimated size in bytes)
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._watched_layer_ids = set()
+
+    @staticmethod
+    def fingerprint(layer) -> tuple:
+        """
+        Describes the current version of a layer's data: provider URI, subset filter,
+        feature count, file modification time, state of the edit buffer and size and
+        modification time of the SQLite write-ahead log.
+        Must be called on the main thread.
+        """
+        provider = layer.dataProvider()
+        source = layer.source()
+
+        # Modification time only exists for file based sources (GeoPackage, Shapefile...)
+        modified_time = None
+        wal_state = None
+        if provider:
+            path = QgsProviderRegistry.instance().decodeUri(provider.name(), source).get('path')
+            if path and os.path.exists(path):
+                modified_time = os.path.getmtime(path)
+                # GeoPackages in WAL mode write to the -wal file until it is checkpointed,
+                # the main file keeps its modification time meanwhile
+                wal_path = f"{path}-wal"
+                if os.path.exists(wal_path):
+                    wal_stat = os.stat(wal_path)
+                    wal_state = (wal_stat.st_size, wal_stat.st_mtime)
+
+        # Uncommitted edits change what the layer returns without touching the file
+        edit_state = None
+        edit_buffer = layer.editBuffer()
+        if edit_buffer and edit_buffer.isModified():
+            edit_state = (
+                len(edit_buffer.addedFeatures()),
+                len(edit_buffer.changedGeometries()),
+                len(edit_buffer.deletedFeatureIds()),
+            )
+
+        return (source, layer.subsetString(), layer.featureCount(), modified_time, edit_state, wal_state)
+
+    def watch(self, layer):
+        """
+        Drops the cached entries of a layer whenever its data changes.
+        Must be called on the main thread, once per layer is enough.
+        """
+        layer_id = layer.id()
+        with self._lock:
+            if layer_id in self._watched_layer_ids:
+                return
+            self._watched_layer_ids.add(layer_id)
+
+        layer.dataChanged.connect(lambda: self.invalidate(layer_id))
+        layer.committedFeaturesAdded.connect(lambda *args: self.invalidate(layer_id))
+        layer.willBeDeleted.connect(lambda: self._forget_layer(layer_id))
+
+    def get_or_build(self, layer_id: str, fingerprint: tuple, kind: str, builder):
+        """
+        Returns the cached value for the layer, or calls builder() to create it.
+        Safe to call from worker threads; the same entry is only built once even if
+        several checks ask for it at the same time.
+
+        Args:
+            layer_id (str): ID of the layer the value was built from.
+            fingerprint (tuple): Result of fingerprint() for that layer.
+            kind (str): What was built, e.g. 'index' or 'geometry_index'.
+            builder (callable): Creates the value when it is not cached and returns
+                                a (value, approximate memory use in bytes) tuple.
+        """
+        key = (layer_id, kind, fingerprint)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                print(f"[DEBUG] Spatial index cache hit: {layer_id} ({kind})")
+                return self._entries[key][0]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            # Another thread may have built it while we were waiting
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key][0]
+
+            print(f"[DEBUG] Spatial index cache miss: {layer_id} ({kind}), building")
+            value, estimated_size = builder()
+
+            with self._lock:
+                self._build_locks.pop(key, None)
+                if estimated_size <= self.memory_budget:
+                    self._entries[key] = (value, estimated_size)
+                    self.memory_used += estimated_size
+                    self._evict()
+            return value
+
+    def invalidate(self, layer_id: str):
+        """Drops every cached entry built from the given layer."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == layer_id]:
+                self.memory_used -= self._entries.pop(key)[1]
+
+    def clear(self):
+        """Drops all cached entries."""
+        with self._lock:
+            self._entries.clear()
+            self.memory_used = 0
+
+    def _forget_layer(self, layer_id: str):
+        self.invalidate(layer_id)
+        with self._lock:
+            self._watched_layer_ids.discard(layer_id)
+
+    def _evict(self):
+        """Removes least recently used entries until the budget is respected. Lock must be held."""
+        while self.memory_used > self.memory_budget and self._entries:
+            key, (value, size) = self._entries.popitem(last=False)
+            self.memory_used -= size
+            print(f"[DEBUG] Spatial index cache evicted: {key[0]} ({key[1]})")
+
+
+def build_geometry_index(source, feature_count: int) -> tuple:
+    """
+    Builds a spatial index that also keeps the feature geometries in memory, so the
+    candidates found by a lookup can be read with index.geometry(fid) instead of a
+    provider request per candidate.
+    Returns the index and its approximate memory use, to be used as a cache builder.
+    """
+    # The index only needs ids and geometries, don't fetch any attribute
+    request = QgsFeatureRequest().setNoAttributes()
+    index = QgsSpatialIndex(source.getFeatures(request), None, QgsSpatialIndex.FlagStoreFeatureGeometries)
+
+    # Estimate the memory of the stored geometries from a sample of features
+    sample_request = QgsFeatureRequest().setNoAttributes().setLimit(100)
+    sample_sizes = [len(f.geometry().asWkb()) for f in source.getFeatures(sample_request) if f.hasGeometry()]
+    average_size = sum(sample_sizes) / len(sample_sizes) if sample_sizes else 0
+
+    estimated_size = int(feature_count * (SpatialIndexCache.BYTES_PER_INDEX_ENTRY + average_size))
+    return index, estimated_size
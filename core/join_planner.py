@@ -0,0 +1,105 @@
+# gis_auditor_report/core/join_planner.py
+
+from qgis.core import QgsFeatureRequest, QgsGeometry, QgsSpatialIndex, QgsWkbTypes
+
+# Relative cost of indexing one feature, geometries are kept in the index so polygons cost most
+GEOMETRY_WEIGHTS = {
+    QgsWkbTypes.PointGeometry: 1.0,
+    QgsWkbTypes.LineGeometry: 2.0,
+    QgsWkbTypes.PolygonGeometry: 4.0,
+}
+# The reverse plan has to be clearly cheaper, the forward plan has the specialised engines
+REVERSE_MARGIN = 0.5
+
+
+def plan_join(stream_layer, index_layer, mode: str = 'auto') -> dict:
+    """
+    Chooses which side of a spatial / exclusion check is indexed and which one is
+    streamed, from the feature counts, extents and geometry types of both layers.
+
+    'forward' keeps the usual plan: index_layer (parents / exclusion zones) is
+    indexed and stream_layer (children / targets) is streamed. 'reverse' indexes
+    stream_layer and streams index_layer, only reading its features within the
+    extent of the indexed side. Must be called on the main thread.
+
+    Returns the decision as a dictionary, stored with the check results.
+    """
+    stream_count = max(stream_layer.featureCount(), 0)
+    index_count = max(index_layer.featureCount(), 0)
+
+    # Reversed, only the features of index_layer overlapping the extent of stream_layer are read
+    stream_extent = stream_layer.extent()
+    index_extent = index_layer.extent()
+    overlap = stream_extent.intersect(index_extent)
+    if index_extent.area() > 0:
+        overlap_ratio = min(1.0, overlap.area() / index_extent.area()) if not overlap.isEmpty() else 0.0
+    else:
+        overlap_ratio = 1.0
+
+    stream_weight = GEOMETRY_WEIGHTS.get(stream_layer.geometryType(), 1.0)
+    index_weight = GEOMETRY_WEIGHTS.get(index_layer.geometryType(), 1.0)
+
+    # Cost = building the index + one lookup per streamed feature
+    forward_cost = index_count * index_weight + stream_count
+    reverse_cost = stream_count * stream_weight + index_count * overlap_ratio
+
+    if mode == 'auto':
+        mode = 'reverse' if reverse_cost < forward_cost * REVERSE_MARGIN else 'forward'
+
+    plan = {
+        'mode': mode,
+        'indexed_layer': (stream_layer if mode == 'reverse' else index_layer).name(),
+        'streamed_layer': (index_layer if mode == 'reverse' else stream_layer).name(),
+        'forward_cost': round(forward_cost),
+        'reverse_cost': round(reverse_cost),
+    }
+    print(f"[DEBUG] Join plan: index {plan['indexed_layer']}, stream {plan['streamed_layer']} ({mode})")
+    return plan
+
+
+class ReverseJoin:
+    """
+    Indexed side of a reversed check: the children / targets are indexed with their
+    ID values, each streamed parent / exclusion zone marks the ones it matches.
+    The marked (or unmarked) features come back in their own feature order, so the
+    errors are listed exactly as when the children / targets are streamed.
+    """
+
+    def __init__(self, source, field_index: int):
+        request = QgsFeatureRequest().setSubsetOfAttributes([field_index] if field_index >= 0 else [])
+        self.order = []  # (fid, ID value) in feature order
+        self.marked = set()
+        self.candidate_count = 0
+        self.predicate_calls = 0
+        self.index = QgsSpatialIndex(QgsSpatialIndex.FlagStoreFeatureGeometries)
+        for feature in source.getFeatures(request):
+            value = feature[field_index] if field_index >= 0 else feature.id()
+            self.order.append((feature.id(), value))
+            if feature.hasGeometry():
+                self.index.addFeature(feature)
+
+    def mark(self, geometry: QgsGeometry, predicate: str):
+        """
+        Marks the indexed features for which predicate(geometry, feature) holds,
+        'contains' or 'intersects', tested with geometry prepared once.
+        """
+        if geometry.isNull() or geometry.isEmpty():
+            return
+        engine = None
+        for fid in self.index.intersects(geometry.boundingBox()):
+            self.candidate_count += 1
+            if fid in self.marked:
+                continue
+            if engine is None:
+                engine = QgsGeometry.createGeometryEngine(geometry.constGet())
+                engine.prepareGeometry()
+            candidate = self.index.geometry(fid)
+            if candidate.isNull() or candidate.isEmpty():
+                continue
+            self.predicate_calls += 1
+            if getattr(engine, predicate)(candidate.constGet()):
+                self.marked.add(fid)
+
+    def features(self, marked: bool) -> list:
+        """(fid, ID value) of the marked or of the unmarked features, in feature order."""
+        return [(fid, value) for fid, value in self.order if (fid in self.marked) == marked]
@@ -0,0 +1,131 @@
+# gis_auditor_report/core/predicate_engine.py
+
+import math
+
+from qgis.core import QgsGeometry, QgsRectangle, QgsWkbTypes
+
+
+class PreparedPredicateEngine:
+    """
+    Evaluates spatial predicates against parent / exclusion geometries that are
+    prepared once with a GEOS engine and kept for the whole run.
+
+    A prepared geometry carries its own spatial structures, so testing thousands
+    of children against the same complex polygon doesn't rebuild them on every call.
+    """
+
+    def __init__(self, geometry_lookup):
+        """
+        Args:
+            geometry_lookup (callable): Returns the QgsGeometry of a feature id,
+                                        e.g. QgsSpatialIndex.geometry.
+        """
+        self.geometry_lookup = geometry_lookup
+        self._engines = {}  # fid -> (engine, geometry)
+        self.prepared_count = 0
+        self.call_count = 0  # exact predicate tests, for the run diagnostics
+
+    def _engine(self, fid):
+        """Returns the prepared engine of a feature, creating it on first use."""
+        entry = self._engines.get(fid)
+        if entry is None:
+            geometry = self.geometry_lookup(fid)
+            if geometry is None or geometry.isNull() or geometry.isEmpty():
+                engine = None
+            else:
+                engine = QgsGeometry.createGeometryEngine(geometry.constGet())
+                engine.prepareGeometry()
+                self.prepared_count += 1
+            # The engine only points to the geometry, so the geometry has to stay alive with it
+            entry = (engine, geometry)
+            self._engines[fid] = entry
+        return entry[0]
+
+    def contains(self, fid, geometry: QgsGeometry) -> bool:
+        """True if the feature fid contains geometry, i.e. geometry is within it."""
+        self.call_count += 1
+        engine = self._engine(fid)
+        if engine is None or geometry.isNull():
+            return False
+        return engine.contains(geometry.constGet())
+
+    def intersects(self, fid, geometry: QgsGeometry) -> bool:
+        """True if the feature fid intersects geometry."""
+        self.call_count += 1
+        engine = self._engine(fid)
+        if engine is None or geometry.isNull():
+            return False
+        return engine.intersects(geometry.constGet())
+
+
+class PointInPolygonEngine:
+    """
+    Point-in-polygon tests for layers of single points, on top of a spatial index
+    that stores the polygons and their PreparedPredicateEngine.
+
+    The point coordinates are read straight from the geometry and looked up in the
+    index as a point rectangle. Before any GEOS call, the point is compared with the
+    interior rectangle of each candidate polygon: a square centred on the pole of
+    inaccessibility, small enough to fit in the largest circle inside the polygon.
+    A point strictly inside that square is inside the polygon.
+    """
+
+    # Precision of the pole of inaccessibility, relative to the polygon size
+    POLE_PRECISION = 0.01
+
+    def __init__(self, index, predicates: PreparedPredicateEngine):
+        self.index = index
+        self.predicates = predicates
+        self._interiors = {}  # fid -> (x_min, y_min, x_max, y_max), or None without a usable interior
+        self.shortcut_count = 0
+        self.candidate_count = 0
+
+    @staticmethod
+    def is_point_layer(layer) -> bool:
+        """True for layers of single points, the only ones the engine handles."""
+        return layer.geometryType() == QgsWkbTypes.PointGeometry and QgsWkbTypes.isSingleType(layer.wkbType())
+
+    def _interior(self, fid):
+        """Returns the interior rectangle of a polygon, computing it on first use."""
+        if fid in self._interiors:
+            return self._interiors[fid]
+
+        interior = None
+        geometry = self.index.geometry(fid)
+        if geometry is not None and not geometry.isEmpty() and geometry.type() == QgsWkbTypes.PolygonGeometry:
+            box = geometry.boundingBox()
+            precision = max(box.width(), box.height()) * self.POLE_PRECISION
+            pole, radius = geometry.poleOfInaccessibility(precision)
+            if not pole.isNull() and radius > 0:
+                # Half side of the square inscribed in the circle of that radius
+                half_side = radius / math.sqrt(2)
+                center = pole.asPoint()
+                interior = (center.x() - half_side, center.y() - half_side,
+                            center.x() + half_side, center.y() + half_side)
+        self._interiors[fid] = interior
+        return interior
+
+    def _matches(self, point_geometry: QgsGeometry, predicate) -> bool:
+        if point_geometry.isNull() or point_geometry.isEmpty():
+            return False
+        point = point_geometry.constGet()
+        x, y = point.x(), point.y()
+
+        for fid in self.index.intersects(QgsRectangle(x, y, x, y)):
+            self.candidate_count += 1
+            interior = self._interior(fid)
+            # Strictly inside the square means strictly inside the polygon, no GEOS call needed
+            if interior and interior[0] < x < interior[2] and interior[1] < y < interior[3]:
+                self.shortcut_count += 1
+                return True
+            if predicate(fid, point_geometry):
+                return True
+        return False
+
+    def within_any(self, point_geometry: QgsGeometry) -> bool:
+        """True if the point is within at least one polygon."""
+        return self._matches(point_geometry, self.predicates.contains)
+
+    def intersects_any(self, point_geometry: QgsGeometry) -> bool:
+        """True if the point intersects at least one polygon."""
+        return self._matches(point_geometry, self.predicates.intersects)
@@ -0,0 +1,256 @@
+# gis_auditor_report/core/processing/algorithms.py
+
+import os
+
+from qgis.PyQt.QtCore import QCoreApplication, QVariant
+from qgis.PyQt.QtGui import QIcon
+from qgis.core import (
+    QgsFeature,
+    QgsFeatureRequest,
+    QgsFeatureSink,
+    QgsField,
+    QgsFields,
+    QgsProcessing,
+    QgsProcessingAlgorithm,
+    QgsProcessingException,
+    QgsProcessingOutputNumber,
+    QgsProcessingParameterBoolean,
+    QgsProcessingParameterFeatureSink,
+    QgsProcessingParameterField,
+    QgsProcessingParameterVectorLayer,
+    QgsWkbTypes,
+)
+from ..check.duplicate_check import DuplicateCheck
+from ..check.spatial_check import SpatialCheck
+from ..check.exclusion_check import ExclusionCheck
+from ..result_store import iter_errors
+
+
+class _LayerLookup:
+    """
+    Gives the checks access to the layers of a Processing run, which are not
+    always part of the project (e.g. files opened by qgis_process).
+    """
+
+    def __init__(self, *layers):
+        self._layers = {layer.id(): layer for layer in layers if layer}
+
+    def mapLayer(self, layer_id):
+        return self._layers.get(layer_id)
+
+
+class BaseCheckAlgorithm(QgsProcessingAlgorithm):
+    """Shared plumbing of the check algorithms."""
+
+    ERROR_COUNT = 'ERROR_COUNT'
+    OUTPUT = 'OUTPUT'
+
+    def tr(self, string):
+        return QCoreApplication.translate('Processing', string)
+
+    def __init__(self):
+        super().__init__()
+        # Created in prepareAlgorithm() on the main thread, run in processAlgorithm()
+        self.checker = None
+
+    def createInstance(self):
+        return type(self)()
+
+    def group(self):
+        return self.tr('Data checks')
+
+    def groupId(self):
+        return 'datachecks'
+
+    def icon(self):
+        return QIcon(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, 'icon.png'))
+
+    def _vector_layer(self, parameters, name, context):
+        layer = self.parameterAsVectorLayer(parameters, name, context)
+        if layer is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, name))
+        return layer
+
+    def _feature_source(self, parameters, name, context):
+        """Thread safe source of a layer parameter, for reading it in processAlgorithm()."""
+        source = self.parameterAsSource(parameters, name, context)
+        if source is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, name))
+        return source
+
+    def _write_failing_features(self, source, errors, sink, feedback):
+        """Copies the features listed in the errors of a check into the sink, in one request."""
+        fids = [fid for fid, in iter_errors(errors, 'fid')]
+        request = QgsFeatureRequest().setFilterFids(fids)
+        for feature in source.getFeatures(request):
+            if feedback.isCanceled():
+                break
+            sink.addFeature(feature, QgsFeatureSink.FastInsert)
+
+
+class DuplicateCheckAlgorithm(BaseCheckAlgorithm):
+    """Processing wrapper around DuplicateCheck."""
+
+    INPUT = 'INPUT'
+    FIELD = 'FIELD'
+    NORMALISE = 'NORMALISE'
+
+    def name(self):
+        return 'duplicatecheck'
+
+    def displayName(self):
+        return self.tr('Duplicate value check')
+
+    def shortHelpString(self):
+        return self.tr('Lists the values of a field that appear more than once, with how often they appear. '
+                       'With several fields, their combination must be unique.')
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterVectorLayer(
+            self.INPUT, self.tr('Input layer'), [QgsProcessing.TypeVector]))
+        self.addParameter(QgsProcessingParameterField(
+            self.FIELD, self.tr('Field(s) that should be unique'), parentLayerParameterName=self.INPUT,
+            allowMultiple=True))
+        self.addParameter(QgsProcessingParameterBoolean(
+            self.NORMALISE, self.tr('Ignore case and extra whitespace'), defaultValue=False))
+        self.addParameter(QgsProcessingParameterFeatureSink(
+            self.OUTPUT, self.tr('Duplicated values'), QgsProcessing.TypeVector))
+        self.addOutput(QgsProcessingOutputNumber(self.ERROR_COUNT, self.tr('Number of duplicated values')))
+
+    def prepareAlgorithm(self, parameters, context, feedback):
+        # The check looks at the live layer when it is created, which must happen on the main thread
+        layer = self._vector_layer(parameters, self.INPUT, context)
+        field_names = self.parameterAsFields(parameters, self.FIELD, context)
+        normalise = self.parameterAsBoolean(parameters, self.NORMALISE, context)
+
+        self.checker = DuplicateCheck(
+            {'check_type': 'duplicate', 'layer_id': layer.id(), 'field_names': field_names, 'normalise': normalise},
+            _LayerLookup(layer)
+        )
+        return True
+
+    def processAlgorithm(self, parameters, context, feedback):
+        # Worker thread: the check only reads its feature source snapshots
+        results = self.checker.run(feedback)
+
+        fields = QgsFields()
+        fields.append(QgsField('value', QVariant.String))
+        fields.append(QgsField('count', QVariant.Int))
+        (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context, fields, QgsWkbTypes.NoGeometry)
+        if sink is None:
+            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
+
+        for value, count in iter_errors(results['errors'], 'value', 'count'):
+            feature = QgsFeature(fields)
+            feature.setAttributes([value, count])
+            sink.addFeature(feature, QgsFeatureSink.FastInsert)
+
+        return {self.OUTPUT: dest_id, self.ERROR_COUNT: len(results['errors'])}
+
+
+class SpatialCheckAlgorithm(BaseCheckAlgorithm):
+    """Processing wrapper around SpatialCheck."""
+
+    PARENT = 'PARENT'
+    CHILD = 'CHILD'
+    CHILD_FIELD = 'CHILD_FIELD'
+
+    def name(self):
+        return 'spatialcheck'
+
+    def displayName(self):
+        return self.tr('Spatial relationship check')
+
+    def shortHelpString(self):
+        return self.tr('Outputs the child features that are not within any feature of the parent polygon layer.')
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterVectorLayer(
+            self.PARENT, self.tr('Parent layer'), [QgsProcessing.TypeVectorPolygon]))
+        self.addParameter(QgsProcessingParameterVectorLayer(
+            self.CHILD, self.tr('Child layer'), [QgsProcessing.TypeVectorAnyGeometry]))
+        self.addParameter(QgsProcessingParameterField(
+            self.CHILD_FIELD, self.tr('Child unique field'), parentLayerParameterName=self.CHILD, optional=True))
+        self.addParameter(QgsProcessingParameterFeatureSink(
+            self.OUTPUT, self.tr('Children outside all parents'), QgsProcessing.TypeVectorAnyGeometry))
+        self.addOutput(QgsProcessingOutputNumber(self.ERROR_COUNT, self.tr('Number of children outside all parents')))
+
+    def prepareAlgorithm(self, parameters, context, feedback):
+        # The check looks at the live layers when it is created, which must happen on the main thread
+        parent_layer = self._vector_layer(parameters, self.PARENT, context)
+        child_layer = self._vector_layer(parameters, self.CHILD, context)
+        child_field = self.parameterAsString(parameters, self.CHILD_FIELD, context)
+
+        self.checker = SpatialCheck(
+            {'check_type': 'spatial', 'parent_id': parent_layer.id(), 'child_id': child_layer.id(),
+             'child_unique_field': child_field},
+            _LayerLookup(parent_layer, child_layer)
+        )
+        return True
+
+    def processAlgorithm(self, parameters, context, feedback):
+        # Worker thread: the check only reads its feature source snapshots
+        results = self.checker.run(feedback)
+
+        child_source = self._feature_source(parameters, self.CHILD, context)
+        (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context, child_source.fields(),
+                                               child_source.wkbType(), child_source.sourceCrs())
+        if sink is None:
+            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
+        self._write_failing_features(child_source, results['errors'], sink, feedback)
+
+        return {self.OUTPUT: dest_id, self.ERROR_COUNT: len(results['errors'])}
+
+
+class ExclusionCheckAlgorithm(BaseCheckAlgorithm):
+    """Processing wrapper around ExclusionCheck."""
+
+    TARGET = 'TARGET'
+    EXCLUSION = 'EXCLUSION'
+    TARGET_FIELD = 'TARGET_FIELD'
+
+    def name(self):
+        return 'exclusioncheck'
+
+    def displayName(self):
+        return self.tr('Exclusion zone check')
+
+    def shortHelpString(self):
+        return self.tr('Outputs the target features that intersect any feature of the exclusion zone layer.')
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterVectorLayer(
+            self.TARGET, self.tr('Target layer'), [QgsProcessing.TypeVectorAnyGeometry]))
+        self.addParameter(QgsProcessingParameterVectorLayer(
+            self.EXCLUSION, self.tr('Exclusion zone layer'), [QgsProcessing.TypeVectorAnyGeometry]))
+        self.addParameter(QgsProcessingParameterField(
+            self.TARGET_FIELD, self.tr('Target unique field'), parentLayerParameterName=self.TARGET, optional=True))
+        self.addParameter(QgsProcessingParameterFeatureSink(
+            self.OUTPUT, self.tr('Targets in exclusion zones'), QgsProcessing.TypeVectorAnyGeometry))
+        self.addOutput(QgsProcessingOutputNumber(self.ERROR_COUNT, self.tr('Number of targets in exclusion zones')))
+
+    def prepareAlgorithm(self, parameters, context, feedback):
+        # The check looks at the live layers when it is created, which must happen on the main thread
+        target_layer = self._vector_layer(parameters, self.TARGET, context)
+        exclusion_layer = self._vector_layer(parameters, self.EXCLUSION, context)
+        target_field = self.parameterAsString(parameters, self.TARGET_FIELD, context)
+
+        self.checker = ExclusionCheck(
+            {'check_type': 'exclusion', 'target_id': target_layer.id(), 'exclusion_id': exclusion_layer.id(),
+             'target_unique_field': target_field},
+            _LayerLookup(target_layer, exclusion_layer)
+        )
+        return True
+
+    def processAlgorithm(self, parameters, context, feedback):
+        # Worker thread: the check only reads its feature source snapshots
+        results = self.checker.run(feedback)
+
+        target_source = self._feature_source(parameters, self.TARGET, context)
+        (sink, dest_id) = self.parameterAsSink(parameters, self.OUTPUT, context, target_source.fields(),
+                                               target_source.wkbType(), target_source.sourceCrs())
+        if sink is None:
+            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
+        self._write_failing_features(target_source, results['errors'], sink, feedback)
+
+        return {self.OUTPUT: dest_id, self.ERROR_COUNT: len(results['errors'])}
@@ -0,0 +1,28 @@
+# gis_auditor_report/core/processing/provider.py
+
+import os
+
+from qgis.PyQt.QtGui import QIcon
+from qgis.core import QgsProcessingProvider
+from .algorithms import DuplicateCheckAlgorithm, SpatialCheckAlgorithm, ExclusionCheckAlgorithm
+
+
+class GISAuditorReportProvider(QgsProcessingProvider):
+    """
+    Processing provider exposing the audit checks as algorithms, so they can be
+    used from the toolbox, in batch mode, in the Graphical Modeler and with qgis_process.
+    """
+
+    def id(self):
+        return 'gisauditorreport'
+
+    def name(self):
+        return 'GIS Auditor Report'
+
+    def icon(self):
+        return QIcon(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, 'icon.png'))
+
+    def loadAlgorithms(self):
+        self.addAlgorithm(DuplicateCheckAlgorithm())
+        self.addAlgorithm(SpatialCheckAlgorithm())
+        self.addAlgorithm(ExclusionCheckAlgorithm())
@@ -4,11 +4,17 @@ import os
 from datetime import datetime
 import getpass
 
+from .diagnostics import diagnostics_rows
+from .result_store import iter_errors
+
 class ReportGenerator:
     """
     Generates a comprehensive HTML report from the audit results.
     """
 
+    # Size of the file buffer the HTML chunks are collected in before being written
+    WRITE_BUFFER_SIZE = 1024 * 1024
+
     def __init__(self, report_path: str, results: dict, report_config: dict):
         self.report_path = report_path
         self.results = results
@@ -81,20 +87,17 @@ class ReportGenerator:
     
 
     def _generate_duplicate_check_html(self):
-        """Generates the HTML table for duplicate check results."""
-        html_content = ""
+        """Yields the HTML table for duplicate check results, one row at a time."""
         
         print(f"[DEBUG] Generating duplicate check HTML")
-        print(f"[DEBUG] Duplicate results: {self.results.get('duplicate', [])}")
+        print(f"[DEBUG] Duplicate results: {len(self.results.get('duplicate', []))} checks")
         
         if self.results.get('duplicate'):
-            has_errors = any(r.get('errors', []) for r in self.results['duplicate'])
-            
-            html_content += "<h3>Duplicate Values Check</h3>"
-            html_content += '<p class="section-description">This check identifies values that appear more than once in fields that should contain unique values.</p>'
+            yield "<h3>Duplicate Values Check</h3>"
+            yield '<p class="section-description">This check identifies values that appear more than once in fields that should contain unique values.</p>'
             errors_exist = any(r.get('errors', []) for r in self.results['duplicate'])
             if errors_exist:
-                html_content += """
+                yield """
                 <table>
                     <tr>
                         <th>Layer Name</th>
@@ -108,38 +111,38 @@ class ReportGenerator:
                         layer_name = check_result.get('layer_name', 'Unknown Layer')
                         field_name = check_result.get('field_name', 'Unknown Field')
                         
-                        for error in check_result['errors']:
-                            value = error.get('value', 'N/A')
-                            count = error.get('count', 0)
-                            html_content += f"<tr><td>{layer_name}</td><td>{field_name}</td><td>{value}</td><td>{count}</td></tr>"
+                        # Read straight from the error columns, no dictionary per row
+                        for value, count in iter_errors(check_result['errors'], 'value', 'count'):
+                            # NULL / empty values are None, set apart from a 'NULL' text
+                            if value is None:
+                                value = '<em>NULL</em>'
+                            yield f"<tr><td>{layer_name}</td><td>{field_name}</td><td>{value}</td><td>{count}</td></tr>"
                 
-                html_content += "</table>"
+                yield "</table>"
 
             # Layer passed check: 
             for check_result in self.results['duplicate']:
                 if not check_result.get('errors'):
                     layer_name = check_result.get('layer_name', 'Unknown Layer')
                     field_name = check_result.get('field_name', 'Unknown Field')
-                    html_content += f'<p class="no-errors">✓ {layer_name} ({field_name}): No duplicate values found.</p>'
-        return html_content
+                    yield f'<p class="no-errors">✓ {layer_name} ({field_name}): No duplicate values found.</p>'
     
 
 
     def _generate_spatial_check_html(self):
-        """Generates the HTML table for spatial check results."""
-        html_content = ""
+        """Yields the HTML table for spatial check results, one row at a time."""
         
         print(f"[DEBUG] Generating spatial check HTML")
-        print(f"[DEBUG] Spatial results: {self.results.get('spatial', [])}")
+        print(f"[DEBUG] Spatial results: {len(self.results.get('spatial', []))} checks")
         
         if self.results.get('spatial'):
             has_errors = any(r.get('errors', []) for r in self.results['spatial'])
             
-            html_content += "<h3>Spatial Relationship Check</h3>"
-            html_content += '<p class="section-description">This check identifies child features that are not contained within their parent features.</p>'
+            yield "<h3>Spatial Relationship Check</h3>"
+            yield '<p class="section-description">This check identifies child features that are not contained within their parent features.</p>'
             
             if has_errors:
-                html_content += """
+                yield """
                 <table>
                     <tr>
                         <th>Parent Layer Name</th>
@@ -152,34 +155,31 @@ class ReportGenerator:
                         parent_name = check_result.get('parent_layer_name', 'Unknown Parent')
                         child_name = check_result.get('child_layer_name', 'Unknown Child')
                         
-                        for error in check_result['errors']:
-                            child_id = error.get('child_id', 'N/A')
-                            html_content += f"<tr><td>{parent_name}</td><td>{child_name}</td><td>{child_id}</td></tr>"
+                        for child_id, in iter_errors(check_result['errors'], 'child_id'):
+                            yield f"<tr><td>{parent_name}</td><td>{child_name}</td><td>{child_id}</td></tr>"
                 
-                html_content += "</table>"
+                yield "</table>"
             # Layers passed check
             for check_result in self.results['spatial']:
                 if not check_result.get('errors'):
                     parent_name = check_result.get('parent_layer_name', 'Unknown Parent')
                     child_name = check_result.get('child_layer_name', 'Unknown Child')
-                    html_content += f'<p class="no-errors">✓ {child_name} vs {parent_name}: All child-features are properly contained within parent polygon.</p>'
-        return html_content
+                    yield f'<p class="no-errors">✓ {child_name} vs {parent_name}: All child-features are properly contained within parent polygon.</p>'
 
     def _generate_exclusion_check_html(self):
-        """Generates the HTML table for exclusion check results."""
-        html_content = ""
+        """Yields the HTML table for exclusion check results, one row at a time."""
         
         print(f"[DEBUG] Generating exclusion check HTML")
-        print(f"[DEBUG] Exclusion results: {self.results.get('exclusion', [])}")
+        print(f"[DEBUG] Exclusion results: {len(self.results.get('exclusion', []))} checks")
         
         if self.results.get('exclusion'):
             has_errors = any(r.get('errors', []) for r in self.results['exclusion'])
             
-            html_content += "<h3>Exclusion Zone Check</h3>"
-            html_content += '<p class="section-description">This check identifies target features that intersect with exclusion zones.</p>'
+            yield "<h3>Exclusion Zone Check</h3>"
+            yield '<p class="section-description">This check identifies target features that intersect with exclusion zones.</p>'
             
             if has_errors:
-                html_content += """
+                yield """
                 <table>
                     <tr>
                         <th>Exclusion Zone Layer Name</th>
@@ -192,45 +192,70 @@ class ReportGenerator:
                         exclusion_name = check_result.get('exclusion_layer_name', 'Unknown Exclusion')
                         target_name = check_result.get('target_layer_name', 'Unknown Target')
                         
-                        for error in check_result['errors']:
-                            target_id = error.get('target_id', 'N/A')
-                            html_content += f"<tr><td>{exclusion_name}</td><td>{target_name}</td><td>{target_id}</td></tr>"
+                        for target_id, in iter_errors(check_result['errors'], 'target_id'):
+                            yield f"<tr><td>{exclusion_name}</td><td>{target_name}</td><td>{target_id}</td></tr>"
                 
-                html_content += "</table>"
+                yield "</table>"
 
             #Layer passed check
             for check_result in self.results['exclusion']:
                 if not check_result.get('errors'):
                     exclusion_name = check_result.get('exclusion_layer_name', 'Unknown Exclusion')
                     target_name = check_result.get('target_layer_name', 'Unknown Target')
-                    html_content += f'<p class="no-errors">✓ {target_name} vs {exclusion_name}: No features intersect with exclusion zones.</p>'
-        return html_content
+                    yield f'<p class="no-errors">✓ {target_name} vs {exclusion_name}: No features intersect with exclusion zones.</p>'
     
 
 
-    def generate_report(self):
-        """Main method to build the complete report and save to file."""
-        print("[DEBUG] Starting report generation...")
-        
-        try:
-            html_content = self._get_base_html()
-            
-            # Add summary section
-            # 1. Count checks
-            duplicate_count = len(self.results.get('duplicate', []))
-            spatial_count = len(self.results.get('spatial', []))
-            exclusion_count = len(self.results.get('exclusion', []))
+    def _generate_diagnostics_html(self):
+        """Yields the optional 'Run diagnostics' table: where the time of every check went."""
+        rows = diagnostics_rows(self.results)
+        if not rows:
+            return
 
-            # 2. Count errors...
-            duplicate_errors = sum(len(r.get('errors', [])) for r in self.results.get('duplicate', []))
-            spatial_errors = sum(len(r.get('errors', [])) for r in self.results.get('spatial', []))
-            exclusion_errors = sum(len(r.get('errors', [])) for r in self.results.get('exclusion', []))
-            total_errors = duplicate_errors + spatial_errors + exclusion_errors
+        yield "<h3>Run diagnostics</h3>"
+        yield '<p class="section-description">Time spent by each check reading features, building indexes and testing predicates.</p>'
+        yield """
+        <table class="table-small">
+            <tr>
+                <th>Check</th>
+                <th>Plan</th>
+                <th>Total (s)</th>
+                <th>Index Build (s)</th>
+                <th>Fetch (s)</th>
+                <th>Predicates (s)</th>
+                <th>Features Scanned</th>
+                <th>Candidates / Feature</th>
+                <th>Predicate Calls</th>
+                <th>Features / s</th>
+                <th>Peak Memory (MB)</th>
+            </tr>
+        """
+        for row in rows:
+            yield (
+                f"<tr><td>{row['check_type']}: {row['check']}</td><td>{row['plan'] or ''}</td>"
+                f"<td>{row['total_time']}</td><td>{row['index_build_time']}</td><td>{row['fetch_time']}</td>"
+                f"<td>{row['predicate_time']}</td><td>{row['features_scanned']}</td><td>{row['candidates_per_feature']}</td>"
+                f"<td>{row['predicate_calls']}</td><td>{row['features_per_second']}</td><td>{row['peak_rss_mb'] or 'N/A'}</td></tr>"
+            )
+        yield "</table>"
+
+    def _generate_summary_html(self):
+        """Returns the HTML of the summary box. Only counts are needed, no error is kept."""
+        # 1. Count checks
+        duplicate_count = len(self.results.get('duplicate', []))
+        spatial_count = len(self.results.get('spatial', []))
+        exclusion_count = len(self.results.get('exclusion', []))
+
+        # 2. Count errors...
+        duplicate_errors = sum(len(r.get('errors', [])) for r in self.results.get('duplicate', []))
+        spatial_errors = sum(len(r.get('errors', [])) for r in self.results.get('spatial', []))
+        exclusion_errors = sum(len(r.get('errors', [])) for r in self.results.get('exclusion', []))
+        total_errors = duplicate_errors + spatial_errors + exclusion_errors
 
-            # 3. Count check type
-            checks_performed = sum(1 for count in [duplicate_count, spatial_count, exclusion_count] if count > 0)
+        # 3. Count check type
+        checks_performed = sum(1 for count in [duplicate_count, spatial_count, exclusion_count] if count > 0)
 
-            html_content += '''
+        return '''
             <div class="summary-box">
             <h2>Summary</h2>
             <div class="summary-flex">
@@ -258,25 +283,43 @@ class ReportGenerator:
                 exclusion_errors=exclusion_errors, eclass="has-errors" if exclusion_errors > 0 else "no-errors",
                 total_errors=total_errors
             )
-                        
-            
-            # Generate check sections - only if they were configured
-            if self.results.get('duplicate'):
-                html_content += self._generate_duplicate_check_html()
-                
-            if self.results.get('spatial'):
-                html_content += self._generate_spatial_check_html()
-                
-            if self.results.get('exclusion'):
-                html_content += self._generate_exclusion_check_html()
+
+    def _generate_html(self):
+        """Yields the whole report as a stream of HTML chunks, in document order."""
+        yield self._get_base_html()
+        
+        # Add summary section
+        yield self._generate_summary_html()
+        
+        # Generate check sections - only if they were configured
+        if self.results.get('duplicate'):
+            yield from self._generate_duplicate_check_html()
             
-            html_content += "</body></html>"
+        if self.results.get('spatial'):
+            yield from self._generate_spatial_check_html()
             
+        if self.results.get('exclusion'):
+            yield from self._generate_exclusion_check_html()
+
+        # Optional timings section, e.g. {'diagnostics': True} in the report config
+        if self.report_config.get('diagnostics'):
+            yield from self._generate_diagnostics_html()
+        
+        yield "</body></html>"
+
+    def generate_report(self):
+        """
+        Main method to build the complete report and save to file.
+        The HTML is streamed straight into the file, so memory use doesn't grow with the number of errors.
+        """
+        print("[DEBUG] Starting report generation...")
+        
+        try:
             print(f"[DEBUG] Writing report to: {self.report_path}")
-            print(f"[DEBUG] HTML content length: {len(html_content)} characters")
             
-            with open(self.report_path, "w", encoding="utf-8") as f:
-                f.write(html_content)
+            # A large write buffer turns the many small row chunks into a few big writes
+            with open(self.report_path, "w", encoding="utf-8", buffering=self.WRITE_BUFFER_SIZE) as f:
+                f.writelines(self._generate_html())
             
             # Verify file was created
             if os.path.exists(self.report_path):
@@ -290,4 +333,4 @@ class ReportGenerator:
             print(f"[ERROR] Failed to write report to file: {e}")
             import traceback
             traceback.print_exc()
-            raise e
\ No newline at end of file
+            raise e
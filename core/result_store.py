@@ -0,0 +1,194 @@
+# gis_auditor_report/core/result_store.py
+
+import pickle
+import tempfile
+from array import array
+
+# Range of the 'q' (signed 64 bit) arrays
+MIN_INT64 = -2 ** 63
+MAX_INT64 = 2 ** 63 - 1
+
+# How a row is stored in a value column
+_INLINE_INT = 0  # the column holds the integer itself
+_TABLE = 1  # the column holds the position in the value table
+_NULL = 2  # the column holds the position in the NULL objects
+
+
+class ErrorStore:
+    """
+    Compact, column oriented list of the errors of one check.
+
+    Each column is a typed array instead of one dictionary per error:
+    - 'int' columns (feature IDs, counts) are array('q'),
+    - 'value' columns (ID values, duplicated values) hold integers inline and
+      everything else as a position in a table of interned values, so a value
+      repeated over many errors is stored once.
+
+    Above spill_rows rows the arrays and their value table are pickled to an
+    anonymous temporary file as one chunk, and a new chunk is started. Memory
+    use then stays bounded however many errors a check finds.
+
+    Iterating yields one dictionary per error, like the list of dictionaries it
+    replaces, e.g. {'child_id': 12, 'fid': 3}. iter_rows() yields plain tuples,
+    without building the dictionaries.
+    """
+
+    DEFAULT_SPILL_ROWS = 1000000
+
+    __slots__ = ('names', 'kinds', 'spill_rows', 'spill_count', '_columns', '_tags',
+                 '_values', '_interned', '_nulls', '_row_count', '_spill_file')
+
+    def __init__(self, columns, spill_rows: int = DEFAULT_SPILL_ROWS):
+        """
+        Args:
+            columns: (name, kind) pairs, kind 'int' or 'value',
+                     e.g. (('child_id', 'value'), ('fid', 'int'))
+            spill_rows: rows kept in memory before they are written to disk, 0 never spills
+        """
+        self.names = tuple(name for name, _ in columns)
+        self.kinds = tuple(kind for _, kind in columns)
+        self.spill_rows = spill_rows
+        self.spill_count = 0
+        self._nulls = []  # NULL objects (None, QGIS NULL...), kept apart as they may not pickle
+        self._row_count = 0
+        self._spill_file = None
+        self._new_chunk()
+
+    def _new_chunk(self):
+        self._columns = [array('q') for _ in self.kinds]
+        self._tags = [array('b') if kind == 'value' else None for kind in self.kinds]
+        self._values = []
+        self._interned = {}
+
+    def add(self, *row):
+        """Appends one error, its values in column order."""
+        for column, tags, kind, value in zip(self._columns, self._tags, self.kinds, row):
+            if kind == 'int':
+                column.append(value)
+            else:
+                self._add_value(column, tags, value)
+        self._row_count += 1
+        if self.spill_rows and len(self._columns[0]) >= self.spill_rows:
+            self._spill()
+
+    def _add_value(self, column, tags, value):
+        # 1. Integers (most ID fields) are stored in the array itself
+        if type(value) is int and MIN_INT64 <= value <= MAX_INT64:
+            tags.append(_INLINE_INT)
+            column.append(value)
+            return
+
+        # 2. NULL values, e.g. a NULL ID, stay in memory as the objects they are
+        if value is None or getattr(value, 'isNull', None) is not None and value.isNull():
+            for index, null in enumerate(self._nulls):
+                if type(null) is type(value):
+                    break
+            else:
+                index = len(self._nulls)
+                self._nulls.append(value)
+            tags.append(_NULL)
+            column.append(index)
+            return
+
+        # 3. Anything else is interned in the value table of the chunk
+        key = (type(value), value)
+        try:
+            index = self._interned.get(key)
+        except TypeError:  # unhashable, stored as it is
+            key = None
+            index = None
+        if index is None:
+            index = len(self._values)
+            self._values.append(value)
+            if key is not None:
+                self._interned[key] = index
+        tags.append(_TABLE)
+        column.append(index)
+
+    def append(self, error: dict):
+        """Appends one error given as a dictionary, like list.append()."""
+        self.add(*(error.get(name) for name in self.names))
+
+    def extend(self, errors):
+        """Appends errors given as dictionaries, like list.extend()."""
+        for error in errors:
+            self.append(error)
+
+    def _spill(self):
+        """Writes the current chunk to the spill file and starts a new one."""
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(prefix='gis_auditor_errors_')
+        self._spill_file.seek(0, 2)
+        pickle.dump((
+            [column.tobytes() for column in self._columns],
+            [tags.tobytes() if tags is not None else None for tags in self._tags],
+            self._values,
+        ), self._spill_file, pickle.HIGHEST_PROTOCOL)
+        self.spill_count += 1
+        print(f"[DEBUG] Error store spilled {len(self._columns[0])} rows to disk")
+        self._new_chunk()
+
+    def _chunks(self):
+        """Yields (columns, tags, values) of every chunk, the spilled ones first."""
+        if self._spill_file is not None:
+            self._spill_file.seek(0)
+            for _ in range(self.spill_count):
+                column_bytes, tag_bytes, values = pickle.load(self._spill_file)
+                columns = [array('q', data) for data in column_bytes]
+                tags = [array('b', data) if data is not None else None for data in tag_bytes]
+                yield columns, tags, values
+        yield self._columns, self._tags, self._values
+
+    def iter_rows(self, *names):
+        """
+        Yields one tuple per error, of the given columns in that order (all
+        columns when no name is given).
+        """
+        positions = [self.names.index(name) for name in names] if names else range(len(self.names))
+        nulls = self._nulls
+        for columns, tags, values in self._chunks():
+            decoded = []
+            for position in positions:
+                column, column_tags = columns[position], tags[position]
+                if column_tags is None:
+                    decoded.append(column)
+                else:
+                    decoded.append([
+                        stored if tag == _INLINE_INT else values[stored] if tag == _TABLE else nulls[stored]
+                        for stored, tag in zip(column, column_tags)
+                    ])
+            yield from zip(*decoded)
+
+    def __iter__(self):
+        names = self.names
+        for row in self.iter_rows():
+            yield dict(zip(names, row))
+
+    def __len__(self):
+        return self._row_count
+
+    def __bool__(self):
+        return self._row_count > 0
+
+    def __repr__(self):
+        return f"ErrorStore({', '.join(self.names)}: {self._row_count} rows, {self.spill_count} spilled chunks)"
+
+    def close(self):
+        """Removes the spill file, if any. The spilled rows are lost."""
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+            self.spill_count = 0
+            self._row_count = len(self._columns[0])
+
+
+def iter_errors(errors, *names):
+    """
+    Yields tuples of the given columns of the errors of a check, straight from
+    the arrays of an ErrorStore, or from a plain list of error dictionaries.
+    """
+    if isinstance(errors, ErrorStore):
+        yield from errors.iter_rows(*names)
+    else:
+        for error in errors:
+            yield tuple(error.get(name) for name in names)
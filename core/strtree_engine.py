@@ -0,0 +1,81 @@
+# gis_auditor_report/core/strtree_engine.py
+
+from qgis.core import QgsFeatureRequest, QgsGeometry, QgsWkbTypes
+
+try:
+    import numpy as np
+    import shapely
+    # The vectorised query with a predicate came with Shapely 2
+    SHAPELY_AVAILABLE = int(shapely.__version__.split('.')[0]) >= 2
+except ImportError:
+    SHAPELY_AVAILABLE = False
+
+
+class StrTreeJoinEngine:
+    """
+    Bulk spatial join with a Shapely 2 STRtree, as an alternative to the
+    QgsSpatialIndex loop of the spatial and exclusion checks.
+
+    The indexed layer (parents / exclusion zones) is exported once as WKB and put
+    in an STRtree. The streamed features are collected as WKB too, and all of them
+    are answered with a single vectorised tree.query(geometries, predicate), which
+    runs the GEOS predicates without going back to Python for every feature.
+
+    Shapely only reads linear geometries: curves (CurvePolygon, CompoundCurve,
+    MultiSurface...) are segmentized on export, as GEOS does behind QgsGeometry.
+    """
+
+    # Approximate memory of a Shapely geometry next to its WKB, for the index cache budget
+    BYTES_PER_GEOMETRY = 200
+
+    def __init__(self, tree):
+        self.tree = tree
+
+    @staticmethod
+    def is_available() -> bool:
+        return SHAPELY_AVAILABLE
+
+    @classmethod
+    def build(cls, source, feature_count: int) -> tuple:
+        """
+        Exports the geometries of a feature source and builds the STRtree over them.
+        Returns the engine and its approximate memory use, to be used as a cache builder.
+        """
+        request = QgsFeatureRequest().setNoAttributes()
+        wkbs = [cls.to_wkb(feature) for feature in source.getFeatures(request)]
+        return cls.from_wkbs(wkbs)
+
+    @classmethod
+    def from_wkbs(cls, wkbs: list) -> tuple:
+        """Builds the STRtree over WKB geometries. Returns the engine and its approximate memory use."""
+        # Missing geometries become None, which the tree leaves out
+        geometries = shapely.from_wkb(np.array(wkbs, dtype=object))
+        tree = shapely.STRtree(geometries)
+
+        estimated_size = sum(len(wkb) for wkb in wkbs if wkb) + len(wkbs) * cls.BYTES_PER_GEOMETRY
+        return cls(tree), estimated_size
+
+    @staticmethod
+    def to_wkb(feature):
+        """The WKB of a feature to index or query with, None when it has no geometry."""
+        if not feature.hasGeometry():
+            return None
+        geometry = feature.geometry()
+        if QgsWkbTypes.isCurvedType(geometry.wkbType()):
+            # Nonlinear types make shapely.from_wkb() raise, segmentize them like GEOS would
+            geometry = QgsGeometry(geometry.constGet().segmentize())
+        return bytes(geometry.asWkb())
+
+    def matches(self, wkbs: list, predicate: str):
+        """
+        Returns a boolean array telling for every geometry whether at least one
+        indexed geometry satisfies the predicate, e.g. 'within' or 'intersects'.
+        Missing or empty geometries never match.
+        """
+        geometries = shapely.from_wkb(np.array(wkbs, dtype=object))
+        matched = np.zeros(len(wkbs), dtype=bool)
+        if len(wkbs):
+            # Pairs of (input index, tree index), only the input side is needed
+            input_indexes, _ = self.tree.query(geometries, predicate=predicate)
+            matched[input_indexes] = True
+        return matched
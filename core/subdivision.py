@@ -0,0 +1,171 @@
+# gis_auditor_report/core/subdivision.py
+
+import hashlib
+import os
+import pickle
+
+from qgis.core import QgsApplication, QgsFeature, QgsFeatureRequest, QgsGeometry, QgsSpatialIndex, QgsWkbTypes
+
+from .index_cache import SpatialIndexCache
+
+# Most vertices a piece may keep, like the max_vertices of PostGIS ST_Subdivide
+DEFAULT_MAX_NODES = 256
+
+# Disk space the stored pieces may take, the least recently used files are removed above it
+MAX_STORE_SIZE = 1024 * 1024 * 1024  # bytes
+
+# Folder of the stored pieces, None for <QGIS settings>/gis_auditor_report/subdivided
+store_dir = None
+
+# (layer id, max_nodes) whose stored pieces are removed when the layer data changes
+_watched = set()
+
+
+def _store_dir() -> str:
+    if store_dir:
+        return store_dir
+    return os.path.join(QgsApplication.qgisSettingsDirPath(), 'gis_auditor_report', 'subdivided')
+
+
+def clear_store():
+    """Removes all stored pieces, e.g. so the next run subdivides again."""
+    directory = _store_dir()
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.endswith('.pickle'):
+            os.remove(os.path.join(directory, name))
+
+
+def _store_path(fingerprint: tuple, max_nodes: int) -> str:
+    """File the pieces of a layer are kept in, one per data source, filter and vertex cap."""
+    source, subset = fingerprint[0], fingerprint[1]
+    name = hashlib.sha1(f"{source}|{subset}|{max_nodes}".encode('utf-8')).hexdigest()
+    return os.path.join(_store_dir(), f"{name}.pickle")
+
+
+def _is_storable(fingerprint: tuple) -> bool:
+    """Only file sources without unsaved edits can tell from their fingerprint whether the pieces are still valid."""
+    modified_time, edit_state = fingerprint[3], fingerprint[4]
+    return modified_time is not None and edit_state is None
+
+
+def watch_layer(layer, max_nodes: int = DEFAULT_MAX_NODES):
+    """
+    Removes the stored pieces of a layer as soon as its data changes, edits that don't
+    change the file modification time (e.g. pending in a GeoPackage -wal file) included.
+    Must be called on the main thread, once per layer and vertex cap is enough.
+    """
+    key = (layer.id(), max_nodes)
+    if key in _watched:
+        return
+    _watched.add(key)
+
+    def remove_stored():
+        # Path of the current source and filter, the pieces are stored per filter
+        path = _store_path((layer.source(), layer.subsetString()), max_nodes)
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+                print(f"[DEBUG] Subdivided pieces removed after a data change: {path}")
+            except OSError as e:
+                print(f"[WARNING] Could not remove subdivided pieces {path}: {e}")
+
+    layer.dataChanged.connect(remove_stored)
+    layer.willBeDeleted.connect(lambda: _watched.discard(key))
+
+
+def _trim_store(keep_path: str):
+    """Removes the least recently used stored pieces until they fit in MAX_STORE_SIZE."""
+    directory = _store_dir()
+    files = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith('.pickle') and path != keep_path:
+            stat = os.stat(path)
+            files.append((stat.st_mtime, stat.st_size, path))
+    total_size = sum(size for _, size, _ in files) + os.path.getsize(keep_path)
+
+    for _, size, path in sorted(files):
+        if total_size <= MAX_STORE_SIZE:
+            break
+        os.remove(path)
+        total_size -= size
+        print(f"[DEBUG] Subdivided pieces removed to stay within {MAX_STORE_SIZE // (1024 * 1024)} MB: {path}")
+
+
+def subdivide_source(source, fingerprint: tuple, max_nodes: int = DEFAULT_MAX_NODES) -> list:
+    """
+    Splits every geometry of a feature source into pieces of at most max_nodes
+    vertices with QgsGeometry.subdivide(). Returns (feature id, piece WKB) tuples.
+
+    The pieces of file sources are stored on disk next to the QGIS settings, with
+    the fingerprint of the data they were made from, so the next run (or the next
+    QGIS session) only reads them back while the file is unchanged. The stored
+    files take at most MAX_STORE_SIZE, the least recently read go first.
+    """
+    path = _store_path(fingerprint, max_nodes)
+    storable = _is_storable(fingerprint)
+
+    if storable and os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                stored_fingerprint, pieces = pickle.load(f)
+            if stored_fingerprint == fingerprint:
+                print(f"[DEBUG] Subdivided pieces read from {path}")
+                # Recently read files are the last ones removed by _trim_store()
+                os.utime(path)
+                return pieces
+        except Exception as e:
+            print(f"[WARNING] Could not read subdivided pieces from {path}: {e}")
+
+    # 1. Cut every geometry into pieces, keeping the id of the feature they come from
+    pieces = []
+    request = QgsFeatureRequest().setNoAttributes()
+    for feature in source.getFeatures(request):
+        if not feature.hasGeometry() or feature.geometry().isEmpty():
+            continue
+        geometry = feature.geometry()
+        subdivided = geometry.subdivide(max_nodes)
+        if subdivided.isNull() or subdivided.isEmpty():
+            # GEOS fails on some invalid polygons, the zone is kept whole rather than dropped
+            print(f"[WARNING] Could not subdivide feature {feature.id()}, it is kept as a single piece")
+            if QgsWkbTypes.isCurvedType(geometry.wkbType()):
+                geometry = QgsGeometry(geometry.constGet().segmentize())
+            pieces.append((feature.id(), bytes(geometry.asWkb())))
+            continue
+        for part in subdivided.asGeometryCollection():
+            pieces.append((feature.id(), bytes(part.asWkb())))
+
+    # 2. Keep them for the next runs
+    if storable:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                pickle.dump((fingerprint, pieces), f, protocol=pickle.HIGHEST_PROTOCOL)
+            _trim_store(path)
+        except Exception as e:
+            print(f"[WARNING] Could not store subdivided pieces in {path}: {e}")
+
+    print(f"[DEBUG] Subdivided into {len(pieces)} pieces of at most {max_nodes} vertices")
+    return pieces
+
+
+def build_piece_index(pieces: list) -> tuple:
+    """
+    Builds a spatial index over subdivided pieces, storing their geometries like
+    build_geometry_index() does. The index works with piece ids: a target intersects
+    a feature exactly when it intersects one of its pieces, which piece doesn't matter.
+    Returns (index, approximate memory use), to be used as a cache builder.
+    """
+    index = QgsSpatialIndex(QgsSpatialIndex.FlagStoreFeatureGeometries)
+    feature = QgsFeature()
+    for piece_id, (_, wkb) in enumerate(pieces):
+        geometry = QgsGeometry()
+        geometry.fromWkb(wkb)
+        feature.setId(piece_id)
+        feature.setGeometry(geometry)
+        index.addFeature(feature)
+
+    estimated_size = sum(SpatialIndexCache.BYTES_PER_INDEX_ENTRY + len(wkb) for _, wkb in pieces)
+    return index, estimated_size
@@ -24,11 +24,13 @@
 from qgis.PyQt.QtCore import QSettings, QTranslator, QCoreApplication
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtWidgets import QAction
+from qgis.core import QgsApplication
 
 # Initialize Qt resources from file resources.py
 from .resources import *
 # Import the code for the dialog
 from .gis_auditor_report_dialog import GISAuditorReportDialog
+from .core.processing.provider import GISAuditorReportProvider
 import os.path
 
 
@@ -66,6 +68,7 @@ class GISAuditorReport:
         # Check if plugin was started the first time in current QGIS session
         # Must be set in initGui() to survive plugin reloads
         self.first_start = None
+        self.provider = None
 
     # noinspection PyMethodMayBeStatic
     def tr(self, message):
@@ -157,8 +160,14 @@ class GISAuditorReport:
 
         return action
 
+    def initProcessing(self):
+        """Registers the checks as Processing algorithms (also called by qgis_process)."""
+        self.provider = GISAuditorReportProvider()
+        QgsApplication.processingRegistry().addProvider(self.provider)
+
     def initGui(self):
         """Create the menu entries and toolbar icons inside the QGIS GUI."""
+        self.initProcessing()
 
         icon_path = ':/plugins/gis_auditor_report/icon.png'
         self.add_action(
@@ -179,6 +188,9 @@ class GISAuditorReport:
                 action)
             self.iface.removeToolBarIcon(action)
 
+        if self.provider:
+            QgsApplication.processingRegistry().removeProvider(self.provider)
+
 
     def run(self):
         """Run method that performs all the real work"""
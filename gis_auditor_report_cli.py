@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+#./gis_auditor_report_cli.py
+"""
+Headless batch entry point of the GIS Auditor Report plugin.
+
+Runs one audit per configuration file without the plugin dialog, e.g. for nightly
+audits on a build server:
+
+    python -m gis_auditor_report.gis_auditor_report_cli nightly/*.json --processes 4
+
+A configuration file (JSON, or YAML when PyYAML is installed) looks like:
+
+    {
+        "project": "site_a.qgz",
+        "layers": {
+            "assets": {"uri": "data/assets.gpkg|layername=assets", "provider": "ogr"}
+        },
+        "report_path": "reports/site_a.html",
+        "report_config": {"site_code": "Site A"},
+        "memory_limit_mb": 512,
+        "checks": [
+            {"check_type": "duplicate", "layer_id": "assets", "field_name": "asset_no"},
+            {"check_type": "duplicate", "layer_id": "assets",
+             "field_names": ["site_code", "asset_no", "phase"], "normalise": true}
+        ]
+    }
+
+"project", "layers", "memory_limit_mb" and "history_path" are optional. "checks" uses the same
+dictionaries as the dialog; the layer keys (layer_id, parent_id, child_id, target_id,
+exclusion_id) may hold a project layer ID, a layer name or an alias of the "layers"
+section. "memory_limit_mb" caps the memory of the duplicate counts, the values spill
+to temporary files above it. "history_path" is a SQLite audit history (like --history)
+the run is recorded in and compared with the previous run of the same audit.
+
+Exit code: 0 when no errors were found, 1 when at least one audit found errors,
+2 when an audit could not be run.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+from datetime import datetime
+from multiprocessing import get_context
+
+# Keys of a check configuration that refer to a layer
+LAYER_KEYS = ('layer_id', 'parent_id', 'child_id', 'target_id', 'exclusion_id')
+
+EXIT_OK = 0
+EXIT_ERRORS_FOUND = 1
+EXIT_FAILURE = 2
+
+QGIS_APP = None  # One headless QGIS application per process
+
+
+def _plugin_module(name: str):
+    """Imports a module of this plugin, whether the file runs as part of the package or as a script."""
+    if __package__:
+        return importlib.import_module(f"{__package__}.{name}")
+    plugin_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(plugin_dir))
+    return importlib.import_module(f"{os.path.basename(plugin_dir)}.{name}")
+
+
+def start_qgis():
+    """Starts a QGIS application without GUI, once per process."""
+    global QGIS_APP  # pylint: disable=W0603
+    if QGIS_APP is None:
+        from qgis.core import QgsApplication
+
+        # Make sure QGIS_PREFIX_PATH is set in your env if needed!
+        if os.environ.get('QGIS_PREFIX_PATH'):
+            QgsApplication.setPrefixPath(os.environ['QGIS_PREFIX_PATH'], True)
+        QGIS_APP = QgsApplication([], False)
+        QGIS_APP.initQgis()
+    return QGIS_APP
+
+
+def load_config(config_path: str) -> dict:
+    """Reads an audit configuration from a JSON or YAML file."""
+    with open(config_path, encoding='utf-8') as f:
+        if config_path.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("PyYAML is required to read YAML configurations, use JSON instead")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def _resolve_path(path: str, base_dir: str) -> str:
+    """Makes a path relative to the configuration file absolute."""
+    return path if os.path.isabs(path) else os.path.normpath(os.path.join(base_dir, path))
+
+
+def load_layers(config: dict, base_dir: str) -> dict:
+    """
+    Loads the project and the extra data sources of a configuration.
+    Returns a lookup from every accepted layer reference (ID, name, alias) to the layer ID.
+    """
+    from qgis.core import QgsProject, QgsVectorLayer
+
+    project = QgsProject.instance()
+    project.clear()
+
+    if config.get('project'):
+        project_path = _resolve_path(config['project'], base_dir)
+        if not project.read(project_path):
+            raise RuntimeError(f"Could not read project {project_path}: {project.error()}")
+
+    layer_lookup = {}
+    for layer in project.mapLayers().values():
+        layer_lookup.setdefault(layer.name(), layer.id())
+        layer_lookup[layer.id()] = layer.id()
+
+    for alias, layer_config in (config.get('layers') or {}).items():
+        uri = layer_config['uri']
+        provider = layer_config.get('provider', 'ogr')
+        if provider == 'ogr':
+            # Only the file part of an OGR URI is relative to the configuration file
+            path, _, options = uri.partition('|')
+            uri = _resolve_path(path, base_dir) + ('|' + options if options else '')
+        layer = QgsVectorLayer(uri, layer_config.get('name', alias), provider)
+        if not layer.isValid():
+            raise RuntimeError(f"Could not load layer '{alias}' from {uri}")
+        project.addMapLayer(layer)
+        layer_lookup[alias] = layer.id()
+
+    return layer_lookup
+
+
+def resolve_check_configs(checks: list, layer_lookup: dict) -> list:
+    """Replaces layer names and aliases of the check configurations by project layer IDs."""
+    resolved = []
+    for check in checks:
+        check = dict(check)
+        for key in LAYER_KEYS:
+            if key in check:
+                if check[key] not in layer_lookup:
+                    raise RuntimeError(f"Unknown layer '{check[key]}' in {check.get('check_type')} check")
+                check[key] = layer_lookup[check[key]]
+        resolved.append(check)
+    return resolved
+
+
+def count_errors(results: dict) -> int:
+    """Total number of errors over all check results of an audit."""
+    return sum(len(r.get('errors', [])) for check_results in results.values() for r in check_results)
+
+
+def run_audit(config_path: str, output_dir: str = None, max_workers: int = None, diagnostics: bool = False,
+              error_layer: bool = False, history_path: str = None, diff_details: bool = False) -> dict:
+    """
+    Runs the audit described by one configuration file and writes its report.
+    With an audit history the run is recorded in it, and compared with the previous
+    run of the same audit in the 'diff' key (numbers of new, resolved and persisting errors,
+    and with diff_details the errors themselves).
+    Never raises, a failure is returned in the 'failure' key.
+    """
+    summary = {'config': config_path, 'report_path': None, 'error_count': 0, 'failure': None, 'diff': None}
+    try:
+        start_qgis()
+        AuditRunner = _plugin_module('core.audit_runner').AuditRunner
+
+        config = load_config(config_path)
+        base_dir = os.path.dirname(os.path.abspath(config_path))
+        layer_lookup = load_layers(config, base_dir)
+        all_configs = resolve_check_configs(config.get('checks', []), layer_lookup)
+
+        report_config = config.get('report_config') or {}
+        report_config.setdefault('site_code', os.path.splitext(os.path.basename(config_path))[0])
+        if diagnostics:
+            report_config['diagnostics'] = True
+        if error_layer:
+            report_config['error_layer'] = True
+
+        if config.get('report_path'):
+            report_path = _resolve_path(config['report_path'], base_dir)
+        else:
+            # Same file name as the dialog suggests
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            report_path = os.path.join(base_dir, f"{report_config['site_code']}_GIS_Audit_Report_{timestamp}.html")
+        if output_dir:
+            report_path = os.path.join(output_dir, os.path.basename(report_path))
+        os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+
+        # The command line history wins over the one of the configuration file
+        if not history_path and config.get('history_path'):
+            history_path = _resolve_path(config['history_path'], base_dir)
+
+        # No progress bar in batch mode, the runner works on this thread
+        runner = AuditRunner(all_configs, None, report_path, report_config, max_workers=max_workers,
+                             memory_limit_mb=config.get('memory_limit_mb'), history_path=history_path)
+        runner.run_checks()
+
+        summary['report_path'] = report_path
+        summary['error_count'] = count_errors(runner.results)
+        if runner.history_run_id is not None:
+            summary['diff'] = diff_with_previous_run(history_path, runner.history_run_id, diff_details)
+    except Exception as e:
+        summary['failure'] = str(e)
+    return summary
+
+
+def diff_with_previous_run(history_path: str, run_id: int, details: bool = False):
+    """
+    New, resolved and persisting error counts of a run against the previous run of the same audit.
+    With details the errors of each kind are listed too, in the 'errors' key.
+    """
+    AuditHistory = _plugin_module('core.audit_history').AuditHistory
+    with AuditHistory(history_path) as history:
+        previous_run_id = history.previous_run(run_id)
+        if previous_run_id is None:
+            return None
+        diff = dict(history.diff_counts(previous_run_id, run_id), previous_run_id=previous_run_id)
+        if details:
+            diff['errors'] = {kind: list(history.diff_errors(previous_run_id, run_id, kind))
+                              for kind in ('new', 'resolved', 'persisting')}
+        return diff
+
+
+def print_diff_errors(diff: dict):
+    """Prints the new, resolved and persisting errors of a diff, one per line."""
+    for kind, errors in diff['errors'].items():
+        for error in errors:
+            fid = f" (fid {error['fid']})" if error['fid'] is not None else ''
+            count = f" x{error['count']}" if error['count'] is not None else ''
+            print(f"       {kind}: {error['check_label']}: {error['value']}{fid}{count}")
+
+
+def _run_audit_args(args: tuple) -> dict:
+    """Pool helper, unpacks the arguments of run_audit."""
+    return run_audit(*args)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run GIS Auditor Report audits without the QGIS GUI.")
+    parser.add_argument('configs', nargs='+', help="Audit configuration files (JSON or YAML)")
+    parser.add_argument('--output-dir', help="Folder for the reports, overrides the folder of report_path")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="Number of audits run at the same time, each in its own process")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Number of checks run at the same time inside one audit")
+    parser.add_argument('--diagnostics', action='store_true',
+                        help="Add run diagnostics to the reports and write them as <report>_diagnostics.json")
+    parser.add_argument('--error-layer', action='store_true',
+                        help="Write the failing features with their geometry to <report>_errors.gpkg")
+    parser.add_argument('--history',
+                        help="SQLite audit history to record the runs in; each run is compared with the previous one")
+    parser.add_argument('--diff-details', action='store_true',
+                        help="With an audit history, list the new, resolved and persisting errors, not only their numbers")
+    args = parser.parse_args(argv)
+
+    jobs = [(config_path, args.output_dir, args.workers, args.diagnostics, args.error_layer, args.history,
+             args.diff_details)
+            for config_path in args.configs]
+
+    if args.processes > 1 and len(jobs) > 1:
+        # 'spawn' gives every worker a clean interpreter to start its own QgsApplication in
+        with get_context('spawn').Pool(processes=min(args.processes, len(jobs))) as pool:
+            summaries = pool.map(_run_audit_args, jobs)
+    else:
+        summaries = [_run_audit_args(job) for job in jobs]
+
+    exit_code = EXIT_OK
+    for summary in summaries:
+        if summary['failure']:
+            print(f"[FAILED] {summary['config']}: {summary['failure']}")
+            exit_code = EXIT_FAILURE
+        else:
+            print(f"[DONE] {summary['config']}: {summary['error_count']} errors, report: {summary['report_path']}")
+            if summary['diff']:
+                diff = summary['diff']
+                print(f"       since run {diff['previous_run_id']}: {diff['new']} new, "
+                      f"{diff['resolved']} resolved, {diff['persisting']} persisting")
+                if 'errors' in diff:
+                    print_diff_errors(diff)
+            if summary['error_count'] and exit_code == EXIT_OK:
+                exit_code = EXIT_ERRORS_FOUND
+
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -29,7 +29,7 @@ from qgis.PyQt import QtWidgets
 from qgis.PyQt.QtWidgets import (QDialogButtonBox, QHBoxLayout, QPushButton, QWidget, QComboBox, QMessageBox)
 from qgis.PyQt.QtCore import Qt
 from qgis.gui import QgsMapLayerComboBox, QgsFieldComboBox
-from qgis.core import QgsMapLayerProxyModel 
+from qgis.core import QgsApplication, QgsMapLayerProxyModel 
 from .core.audit_runner import AuditRunner # 
 from qgis.PyQt.QtWidgets import QDialogButtonBox, QFileDialog, QMessageBox # Added QFileDialog, QMessageBox
 from qgis.PyQt.QtCore import QDateTime, QDir, QUrl # Added QDateTime, QDir for path handling
@@ -385,8 +385,29 @@ class GISAuditorReportDialog(QtWidgets.QDialog, FORM_CLASS):
     # Main Execution
     # ----------------------------------------------------------------------
 
+    def _history_path(self) -> str:
+        """SQLite audit history in the QGIS profile folder."""
+        folder = os.path.join(QgsApplication.qgisSettingsDirPath(), 'gis_auditor_report')
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, 'audit_history.sqlite')
+
+    def _handle_audit_finished(self):
+        """Re-enables the Run button once the background audit has stopped."""
+        run_button = self.button_box.button(QDialogButtonBox.Ok)
+        if run_button:
+            run_button.setEnabled(True)
+
     def run_audit_checks(self):
         """Main function to collect all configurations and initiate the audit process."""
+        # 0. Only one audit at a time, the previous one may still be running in the background
+        if getattr(self, 'runner', None) and self.runner.task:
+            QMessageBox.warning(
+                self,
+                "Audit Running",
+                "An audit is already running. Please wait for it to finish or cancel it from the task manager."
+            )
+            return
+
         # 1. Validate site code first (NEW)
         print('[DEBUG] Run button clicked')
         if not self._validate_site_code():
@@ -417,7 +438,10 @@ class GISAuditorReportDialog(QtWidgets.QDialog, FORM_CLASS):
             
         # 5. Collect the high-level report configuration
         report_config = {
-            'site_code': self.siteCodeLineEdit.text().strip()
+            'site_code': self.siteCodeLineEdit.text().strip(),
+            # When ticked, failing features are also written to <report>_errors.gpkg and shown on the map
+            'error_layer': self.errorLayerCheckBox.isChecked(),
+            'load_error_layer': self.errorLayerCheckBox.isChecked()
         }
                         
         # 6. Start the audit process: Instantiate the Runner
@@ -426,13 +450,18 @@ class GISAuditorReportDialog(QtWidgets.QDialog, FORM_CLASS):
             progress_bar=self.progressBar,
             report_path=report_path,
             report_config=report_config, 
-            parent=self
+            parent=self,
+            # Every run is kept in the audit history of the QGIS profile, to compare runs later
+            history_path=self._history_path()
         )
         
         # 7. Connect the Runner's signal to the completion handler
         self.runner.report_generated.connect(self._handle_audit_completion)
+        self.runner.finished.connect(self._handle_audit_finished)
 
-        # 6. Show the progress bar and Start the audit work
+        # 6. Show the progress bar and Start the audit work in the background,
+        # so QGIS stays responsive while big layers are checked
         self.progressBar.setValue(0)
         self.progressBar.show()
-        self.runner.run_checks()
\ No newline at end of file
+        self.button_box.button(QDialogButtonBox.Ok).setEnabled(False)
+        self.runner.run_checks_in_background()
\ No newline at end of file
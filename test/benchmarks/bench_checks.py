@@ -0,0 +1,223 @@
+# coding=utf-8
+"""Benchmark of the checks and of the report on synthetic layers.
+
+Generates reproducible layers (see synthetic_layers.py), times DuplicateCheck,
+SpatialCheck, ExclusionCheck and ReportGenerator on them and writes the
+timings to test/benchmarks/results/benchmark_<plugin version>_<time>.json:
+
+    python test/benchmarks/bench_checks.py --sizes 10000 100000 --formats memory gpkg
+
+Pass an earlier results file with --compare to print the change of every
+timing, e.g. between two versions of the plugin. Run it with the Python
+interpreter of QGIS; no display is needed, QGIS is started offscreen.
+"""
+
+import argparse
+import configparser
+import contextlib
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+# get_qgis_app() starts QGIS in GUI mode, offscreen it runs without a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from test.utilities import get_qgis_app  # noqa: E402
+
+QGIS_APP = get_qgis_app()[0]
+
+from qgis.core import Qgis, QgsMapLayerStore  # noqa: E402
+
+from core.check.duplicate_check import DuplicateCheck  # noqa: E402
+from core.check.exclusion_check import ExclusionCheck  # noqa: E402
+from core.check.spatial_check import SpatialCheck  # noqa: E402
+from core import subdivision  # noqa: E402
+from core.index_cache import SpatialIndexCache  # noqa: E402
+from core.report_generator import ReportGenerator  # noqa: E402
+from test.benchmarks import synthetic_layers  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def plugin_version() -> str:
+    parser = configparser.ConfigParser()
+    parser.read(os.path.join(ROOT, 'metadata.txt'))
+    return parser.get('general', 'version', fallback='unknown')
+
+
+def make_layers(size: int, args) -> dict:
+    """All the synthetic layers of one size, in memory."""
+    # About 100 children per parent and one exclusion zone per 1000 targets
+    cells_per_side = max(1, int(math.sqrt(size / 100)))
+    zone_count = min(1000, max(1, size // 1000))
+    return {
+        'points': synthetic_layers.point_layer(size, duplicate_rate=args.duplicate_rate),
+        'lines': synthetic_layers.line_layer(size, duplicate_rate=args.duplicate_rate),
+        'polygons': synthetic_layers.polygon_layer(max(1, size // 10), duplicate_rate=args.duplicate_rate),
+        'parents': synthetic_layers.parent_grid(cells_per_side),
+        'children': synthetic_layers.children_layer(size, outside_ratio=args.outside_ratio),
+        'exclusion_zones': synthetic_layers.exclusion_zones(zone_count, overlap_ratio=args.overlap_ratio),
+    }
+
+
+def make_checks(layers: dict) -> list:
+    """(name, check class, config) of every benchmarked check."""
+    return [
+        ('duplicate_points', DuplicateCheck, {'layer_id': layers['points'].id(), 'field_name': 'code'}),
+        ('duplicate_lines', DuplicateCheck, {'layer_id': layers['lines'].id(), 'field_name': 'code'}),
+        ('spatial_points', SpatialCheck, {
+            'parent_id': layers['parents'].id(), 'child_id': layers['children'].id(), 'child_unique_field': 'uid'}),
+        ('spatial_polygons', SpatialCheck, {
+            'parent_id': layers['parents'].id(), 'child_id': layers['polygons'].id(), 'child_unique_field': 'uid'}),
+        ('exclusion_points', ExclusionCheck, {
+            'exclusion_id': layers['exclusion_zones'].id(), 'target_id': layers['points'].id(),
+            'target_unique_field': 'uid'}),
+        ('exclusion_lines', ExclusionCheck, {
+            'exclusion_id': layers['exclusion_zones'].id(), 'target_id': layers['lines'].id(),
+            'target_unique_field': 'uid'}),
+    ]
+
+
+def timed(function, repeat: int) -> tuple:
+    """Runs function repeat times, returns the timings and the last return value."""
+    timings = []
+    value = None
+    for _ in range(repeat):
+        # Every run starts cold, neither the indexes nor the subdivided pieces stored on disk are reused
+        SpatialIndexCache.instance().clear()
+        subdivision.clear_store()
+        start = time.perf_counter()
+        # The checks print a lot of [DEBUG] lines, they would drown the benchmark output
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            value = function()
+        timings.append(time.perf_counter() - start)
+    return timings, value
+
+
+def summary(timings: list) -> dict:
+    return {
+        'min': round(min(timings), 4),
+        'median': round(statistics.median(timings), 4),
+        'max': round(max(timings), 4),
+        'runs': len(timings),
+    }
+
+
+def run_size(size: int, layer_format: str, args, work_dir: str) -> list:
+    """Times every check and the report on layers of one size and format."""
+    start = time.perf_counter()
+    layers = make_layers(size, args)
+    if layer_format == 'gpkg':
+        folder = os.path.join(work_dir, str(size))
+        os.makedirs(folder, exist_ok=True)
+        layers = {name: synthetic_layers.to_geopackage(layer, folder) for name, layer in layers.items()}
+    print(f"{layer_format:>6} {size:>9}: layers generated in {time.perf_counter() - start:.1f}s")
+
+    store = QgsMapLayerStore()
+    store.addMapLayers(list(layers.values()))
+
+    rows = []
+    all_results = {'duplicate': [], 'spatial': [], 'exclusion': []}
+    for name, check_class, config in make_checks(layers):
+        timings, results = timed(lambda: check_class(dict(config), store).run(), args.repeat)
+        if results:
+            all_results[results['check_type']].append(results)
+        row = {
+            'benchmark': name,
+            'size': size,
+            'format': layer_format,
+            'seconds': summary(timings),
+            'error_count': len(results.get('errors', [])) if results else None,
+            'diagnostics': results.get('diagnostics') if results else None,
+        }
+        rows.append(row)
+        print(f"{layer_format:>6} {size:>9}: {name:<18} {row['seconds']['median']:8.3f}s  "
+              f"({row['error_count']} errors)")
+
+    report_path = os.path.join(work_dir, f"report_{layer_format}_{size}.html")
+    report_config = {'site_code': 'Benchmark', 'diagnostics': True}
+    timings, _ = timed(lambda: ReportGenerator(report_path, all_results, report_config).generate_report(), args.repeat)
+    rows.append({
+        'benchmark': 'report',
+        'size': size,
+        'format': layer_format,
+        'seconds': summary(timings),
+        'error_count': sum(len(r.get('errors', [])) for check_results in all_results.values() for r in check_results),
+        'report_bytes': os.path.getsize(report_path) if os.path.exists(report_path) else None,
+    })
+    print(f"{layer_format:>6} {size:>9}: {'report':<18} {rows[-1]['seconds']['median']:8.3f}s")
+
+    store.removeAllMapLayers()
+    return rows
+
+
+def compare(rows: list, baseline_path: str):
+    """Prints the change of the median timings against an earlier results file."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(r['benchmark'], r['size'], r['format']): r['seconds']['median'] for r in baseline['results']}
+    print(f"\nCompared with {baseline.get('plugin_version')} ({os.path.basename(baseline_path)}):")
+    for row in rows:
+        before = previous.get((row['benchmark'], row['size'], row['format']))
+        if not before:
+            continue
+        after = row['seconds']['median']
+        print(f"{row['format']:>6} {row['size']:>9}: {row['benchmark']:<18} {before:8.3f}s -> {after:8.3f}s  "
+              f"x{after / before:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000],
+                        help="feature counts, from 10000 up to 5000000")
+    parser.add_argument('--formats', nargs='+', choices=['memory', 'gpkg'], default=['memory', 'gpkg'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--duplicate-rate', type=float, default=0.01)
+    parser.add_argument('--outside-ratio', type=float, default=0.01)
+    parser.add_argument('--overlap-ratio', type=float, default=0.05)
+    parser.add_argument('--output', default=RESULTS_DIR, help="folder of the JSON results")
+    parser.add_argument('--compare', help="earlier JSON results file to compare with")
+    args = parser.parse_args(argv)
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix='gis_auditor_bench_') as work_dir:
+        # The subdivided pieces go to the work folder, not to the QGIS profile
+        subdivision.store_dir = os.path.join(work_dir, 'subdivided')
+        for layer_format in args.formats:
+            for size in args.sizes:
+                rows.extend(run_size(size, layer_format, args, work_dir))
+
+    version = plugin_version()
+    os.makedirs(args.output, exist_ok=True)
+    output_path = os.path.join(args.output, f"benchmark_{version}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'plugin_version': version,
+            'qgis_version': Qgis.QGIS_VERSION,
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'parameters': {
+                'duplicate_rate': args.duplicate_rate,
+                'outside_ratio': args.outside_ratio,
+                'overlap_ratio': args.overlap_ratio,
+                'repeat': args.repeat,
+            },
+            'results': rows,
+        }, f, indent=2)
+    print(f"\nResults written to {output_path}")
+
+    if args.compare:
+        compare(rows, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+# coding=utf-8
+"""Reproducible synthetic layers for the benchmarks.
+
+Every generator takes a seed, so the same arguments always give the same
+features. Layers are built in memory and can be written to a GeoPackage
+with to_geopackage() to measure a file provider instead.
+"""
+
+import math
+import os
+import random
+
+from qgis.core import (
+    QgsCoordinateTransformContext,
+    QgsFeature,
+    QgsGeometry,
+    QgsPointXY,
+    QgsVectorFileWriter,
+    QgsVectorLayer,
+)
+
+CRS = 'EPSG:27700'
+# Square area every generator works in
+EXTENT_SIZE = 100000.0
+# Features are added to the provider in batches
+BATCH_SIZE = 50000
+
+
+def _memory_layer(geometry_type: str, name: str) -> QgsVectorLayer:
+    uri = f"{geometry_type}?crs={CRS}&field=uid:integer&field=code:string(20)"
+    return QgsVectorLayer(uri, name, 'memory')
+
+
+def _fill(layer: QgsVectorLayer, geometries):
+    """Adds (uid, code, geometry) tuples to a memory layer in batches."""
+    provider = layer.dataProvider()
+    batch = []
+    for uid, code, geometry in geometries:
+        feature = QgsFeature(layer.fields())
+        feature.setAttributes([uid, code])
+        feature.setGeometry(geometry)
+        batch.append(feature)
+        if len(batch) >= BATCH_SIZE:
+            provider.addFeatures(batch)
+            batch = []
+    if batch:
+        provider.addFeatures(batch)
+    layer.updateExtents()
+    return layer
+
+
+def _codes(count: int, duplicate_rate: float, rng: random.Random):
+    """Asset codes where about duplicate_rate of the features repeat an earlier code."""
+    for uid in range(count):
+        if uid and rng.random() < duplicate_rate:
+            yield f"A{rng.randrange(uid):09d}"
+        else:
+            yield f"A{uid:09d}"
+
+
+def _star(center_x: float, center_y: float, radius: float, vertices: int, rng: random.Random) -> QgsGeometry:
+    """A jagged star shaped polygon, complex enough to make GEOS work."""
+    points = []
+    for i in range(vertices):
+        angle = 2 * math.pi * i / vertices
+        r = radius * (0.6 + 0.4 * rng.random())
+        points.append(QgsPointXY(center_x + r * math.cos(angle), center_y + r * math.sin(angle)))
+    return QgsGeometry.fromPolygonXY([points + [points[0]]])
+
+
+def point_layer(count: int, duplicate_rate: float = 0.01, seed: int = 1, name: str = 'points') -> QgsVectorLayer:
+    """Points spread over the whole extent."""
+    rng = random.Random(seed)
+    codes = _codes(count, duplicate_rate, rng)
+    return _fill(_memory_layer('Point', name), (
+        (uid, next(codes), QgsGeometry.fromPointXY(QgsPointXY(rng.random() * EXTENT_SIZE, rng.random() * EXTENT_SIZE)))
+        for uid in range(count)
+    ))
+
+
+def line_layer(count: int, duplicate_rate: float = 0.01, seed: int = 2, name: str = 'lines',
+               segment_length: float = 200.0, vertices: int = 10) -> QgsVectorLayer:
+    """Short random walks, e.g. cable or pipe sections."""
+    rng = random.Random(seed)
+    codes = _codes(count, duplicate_rate, rng)
+
+    def lines():
+        for uid in range(count):
+            x, y = rng.random() * EXTENT_SIZE, rng.random() * EXTENT_SIZE
+            points = [QgsPointXY(x, y)]
+            for _ in range(vertices - 1):
+                angle = rng.random() * 2 * math.pi
+                x += math.cos(angle) * segment_length / vertices
+                y += math.sin(angle) * segment_length / vertices
+                points.append(QgsPointXY(x, y))
+            yield uid, next(codes), QgsGeometry.fromPolylineXY(points)
+
+    return _fill(_memory_layer('LineString', name), lines())
+
+
+def polygon_layer(count: int, vertices: int = 64, duplicate_rate: float = 0.01, seed: int = 3,
+                  name: str = 'polygons') -> QgsVectorLayer:
+    """Complex star shaped polygons of the given number of vertices, spread over the extent."""
+    rng = random.Random(seed)
+    codes = _codes(count, duplicate_rate, rng)
+    radius = EXTENT_SIZE / math.sqrt(count) / 2
+    return _fill(_memory_layer('Polygon', name), (
+        (uid, next(codes), _star(rng.random() * EXTENT_SIZE, rng.random() * EXTENT_SIZE, radius, vertices, rng))
+        for uid in range(count)
+    ))
+
+
+def parent_grid(cells_per_side: int, vertices_per_edge: int = 16, name: str = 'parents') -> QgsVectorLayer:
+    """
+    Parent polygons tiling the whole extent, with densified edges so that the
+    containment tests are not trivial. Every point of the extent is in a parent.
+    """
+    size = EXTENT_SIZE / cells_per_side
+
+    def cells():
+        uid = 0
+        for row in range(cells_per_side):
+            for column in range(cells_per_side):
+                x0, y0 = column * size, row * size
+                corners = [(x0, y0), (x0 + size, y0), (x0 + size, y0 + size), (x0, y0 + size)]
+                ring = []
+                for (ax, ay), (bx, by) in zip(corners, corners[1:] + corners[:1]):
+                    for i in range(vertices_per_edge):
+                        t = i / vertices_per_edge
+                        ring.append(QgsPointXY(ax + (bx - ax) * t, ay + (by - ay) * t))
+                yield uid, f"P{uid:06d}", QgsGeometry.fromPolygonXY([ring + [ring[0]]])
+                uid += 1
+
+    return _fill(_memory_layer('Polygon', name), cells())
+
+
+def children_layer(count: int, outside_ratio: float = 0.01, seed: int = 4, name: str = 'children') -> QgsVectorLayer:
+    """
+    Points for the spatial check: about outside_ratio of them fall outside the
+    extent, i.e. outside every parent of parent_grid().
+    """
+    rng = random.Random(seed)
+
+    def points():
+        for uid in range(count):
+            x, y = rng.random() * EXTENT_SIZE, rng.random() * EXTENT_SIZE
+            if rng.random() < outside_ratio:
+                x += EXTENT_SIZE * 1.5
+            yield uid, f"C{uid:09d}", QgsGeometry.fromPointXY(QgsPointXY(x, y))
+
+    return _fill(_memory_layer('Point', name), points())
+
+
+def exclusion_zones(count: int, overlap_ratio: float = 0.05, vertices: int = 2000, seed: int = 5,
+                    name: str = 'exclusion_zones') -> QgsVectorLayer:
+    """
+    Vertex heavy zones covering about overlap_ratio of the extent, so that about
+    that ratio of uniformly spread targets intersects one of them.
+    """
+    rng = random.Random(seed)
+    # Non overlapping circles-ish of equal area adding up to the requested ratio
+    radius = math.sqrt(overlap_ratio * EXTENT_SIZE * EXTENT_SIZE / (count * math.pi))
+    per_side = int(math.ceil(math.sqrt(count)))
+    spacing = EXTENT_SIZE / per_side
+
+    def zones():
+        for uid in range(count):
+            center_x = (uid % per_side + 0.5) * spacing
+            center_y = (uid // per_side + 0.5) * spacing
+            points = []
+            for i in range(vertices):
+                angle = 2 * math.pi * i / vertices
+                r = radius * (0.97 + 0.03 * rng.random())
+                points.append(QgsPointXY(center_x + r * math.cos(angle), center_y + r * math.sin(angle)))
+            yield uid, f"Z{uid:06d}", QgsGeometry.fromPolygonXY([points + [points[0]]])
+
+    return _fill(_memory_layer('Polygon', name), zones())
+
+
+def to_geopackage(layer: QgsVectorLayer, folder: str) -> QgsVectorLayer:
+    """Writes a layer to <folder>/<layer name>.gpkg and returns the GeoPackage layer."""
+    path = os.path.join(folder, f"{layer.name()}.gpkg")
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = 'GPKG'
+    options.layerName = layer.name()
+    error = QgsVectorFileWriter.writeAsVectorFormatV2(layer, path, QgsCoordinateTransformContext(), options)
+    if error[0] != QgsVectorFileWriter.NoError:
+        raise RuntimeError(f"Could not write {path}: {error}")
+    return QgsVectorLayer(f"{path}|layername={layer.name()}", layer.name(), 'ogr')
@@ -0,0 +1,75 @@
+# coding=utf-8
+"""Audit history test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import os
+import tempfile
+import unittest
+
+from core.audit_history import AuditHistory, config_hash
+
+
+def _results(child_ids, duplicated_values):
+    return {
+        'duplicate': [{
+            'check_type': 'duplicate', 'layer_name': 'assets', 'field_name': 'asset_no',
+            'errors': [{'value': value, 'count': 2} for value in duplicated_values],
+        }],
+        'spatial': [{
+            'check_type': 'spatial', 'parent_layer_name': 'sites', 'child_layer_name': 'poles',
+            'errors': [{'child_id': child_id, 'fid': fid} for fid, child_id in enumerate(child_ids)],
+        }],
+        'exclusion': [],
+    }
+
+
+class AuditHistoryTest(unittest.TestCase):
+    """Test the run history and the diffs between runs."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.history = AuditHistory(os.path.join(self.temp_dir.name, 'history.sqlite'))
+
+    def tearDown(self):
+        self.history.close()
+        self.temp_dir.cleanup()
+
+    def test_diff(self):
+        """Errors are new, resolved or persisting by their value, not their feature ID."""
+        configs = config_hash([{'check_type': 'spatial', 'parent_id': 'sites', 'child_id': 'poles'}])
+        first = self.history.record_run('site_a', configs, _results([1, 2, 3], ['A1']))
+        second = self.history.record_run('site_a', configs, _results([3, 4], ['A1', 'A9']))
+        other = self.history.record_run('site_b', configs, _results([], []))
+
+        self.assertEqual(self.history.previous_run(second), first)
+        self.assertIsNone(self.history.previous_run(other))
+        self.assertEqual([run['error_count'] for run in self.history.runs('site_a')], [4, 4])
+
+        self.assertEqual(self.history.diff_counts(first, second), {'new': 2, 'resolved': 2, 'persisting': 2})
+        new = sorted(error['value'] for error in self.history.diff_errors(first, second, 'new'))
+        self.assertEqual(new, ['4', 'A9'])
+        resolved = sorted(error['value'] for error in self.history.diff_errors(first, second, 'resolved'))
+        self.assertEqual(resolved, ['1', '2'])
+
+    def test_config_hash_by_layer_source(self):
+        """Layers loaded again get new IDs, hashed by their source the audit stays the same."""
+        first = config_hash([{'check_type': 'duplicate', 'layer_id': 'assets_1a2b', 'field_name': 'code'}],
+                            {'assets_1a2b': '/data/assets.gpkg|layername=assets'})
+        second = config_hash([{'check_type': 'duplicate', 'layer_id': 'assets_3c4d', 'field_name': 'code'}],
+                             {'assets_3c4d': '/data/assets.gpkg|layername=assets'})
+        other = config_hash([{'check_type': 'duplicate', 'layer_id': 'assets_5e6f', 'field_name': 'code'}],
+                            {'assets_5e6f': '/data/other.gpkg|layername=assets'})
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(AuditHistoryTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,97 @@
+# coding=utf-8
+"""Batch audit history test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+# No display is needed for the batch mode
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransformContext,
+    QgsFeature,
+    QgsField,
+    QgsFields,
+    QgsGeometry,
+    QgsPointXY,
+    QgsVectorFileWriter,
+    QgsWkbTypes,
+)
+from qgis.PyQt.QtCore import QVariant
+
+from .utilities import get_qgis_app
+QGIS_APP = get_qgis_app()
+
+import gis_auditor_report_cli
+
+
+class CliHistoryTest(unittest.TestCase):
+    """Runs of the same configuration file are compared with each other."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        folder = self.temp_dir.name
+
+        # 1. A GeoPackage with duplicated asset codes
+        fields = QgsFields()
+        fields.append(QgsField('code', QVariant.String))
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = 'GPKG'
+        options.layerName = 'assets'
+        writer = QgsVectorFileWriter.create(os.path.join(folder, 'assets.gpkg'), fields, QgsWkbTypes.Point,
+                                            QgsCoordinateReferenceSystem('EPSG:27700'),
+                                            QgsCoordinateTransformContext(), options)
+        features = []
+        for index, code in enumerate(['A1', 'A1', 'A2', 'A3', 'A3', 'A3']):
+            feature = QgsFeature(fields)
+            feature.setAttributes([code])
+            feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(index, index)))
+            features.append(feature)
+        writer.addFeatures(features)
+        del writer
+
+        # 2. The audit, its layer loaded through an alias
+        self.config_path = os.path.join(folder, 'nightly.json')
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'layers': {'assets': {'uri': 'assets.gpkg|layername=assets'}},
+                'report_path': 'nightly.html',
+                'checks': [{'check_type': 'duplicate', 'layer_id': 'assets', 'field_name': 'code'}],
+            }, f)
+        self.history_path = os.path.join(folder, 'history.sqlite')
+
+        # The batch mode must not start a second QGIS application
+        gis_auditor_report_cli.QGIS_APP = QGIS_APP[0]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_same_config_twice(self):
+        """The second run finds the first one although the layer got a new ID, the errors persist."""
+        first = gis_auditor_report_cli.run_audit(self.config_path, history_path=self.history_path)
+        self.assertIsNone(first['failure'])
+        self.assertEqual(first['error_count'], 2)
+        self.assertIsNone(first['diff'])
+
+        second = gis_auditor_report_cli.run_audit(self.config_path, history_path=self.history_path)
+        self.assertIsNone(second['failure'])
+        self.assertIsNotNone(second['diff'])
+        self.assertEqual(second['diff']['persisting'], 2)
+        self.assertEqual(second['diff']['new'], 0)
+        self.assertEqual(second['diff']['resolved'], 0)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(CliHistoryTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
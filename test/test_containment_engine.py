@@ -0,0 +1,90 @@
+# coding=utf-8
+"""Containment engine test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import math
+import os
+import unittest
+
+# No display is needed for memory layers
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from qgis.core import QgsFeature, QgsGeometry, QgsVectorLayer
+
+from .utilities import get_qgis_app
+QGIS_APP = get_qgis_app()
+
+from core.containment_engine import ContainmentCells, ContainmentEngine
+from core.predicate_engine import PreparedPredicateEngine
+
+
+def _circle_wkt(radius: float, vertices: int) -> str:
+    """Polygon of the given number of vertices around (0, 0)."""
+    points = [(radius * math.cos(2 * math.pi * i / vertices), radius * math.sin(2 * math.pi * i / vertices))
+              for i in range(vertices)]
+    points.append(points[0])
+    return 'POLYGON((' + ', '.join(f"{x} {y}" for x, y in points) + '))'
+
+
+def _square(x: float, y: float, size: float) -> QgsGeometry:
+    return QgsGeometry.fromWkt(f"POLYGON(({x} {y}, {x + size} {y}, {x + size} {y + size}, {x} {y + size}, {x} {y}))")
+
+
+class ContainmentEngineTest(unittest.TestCase):
+    """Test the interior cell shortcut and the exact test of large parents."""
+
+    def setUp(self):
+        self.parent_wkt = _circle_wkt(100.0, 128)
+        layer = QgsVectorLayer("Polygon?crs=EPSG:27700", 'sites', 'memory')
+        feature = QgsFeature()
+        feature.setGeometry(QgsGeometry.fromWkt(self.parent_wkt))
+        layer.dataProvider().addFeatures([feature])
+        self.cells, _ = ContainmentCells.build(layer, max_depth=5)
+        self.engine = ContainmentEngine(self.cells, PreparedPredicateEngine(self.cells.geometries.get))
+
+    def test_parent_gets_interior_cells(self):
+        """A parent of MIN_VERTICES or more vertices is split into interior and boundary cells."""
+        self.assertGreaterEqual(128, ContainmentCells.MIN_VERTICES)
+        self.assertTrue(self.cells.interior_cells)
+        self.assertTrue(self.cells.boundary_cells)
+
+    def test_inside(self):
+        """A child well inside the parent is answered by an interior cell, without the exact test."""
+        self.assertTrue(self.engine.within_any(_square(-2.0, -2.0, 1.0)))
+        self.assertEqual(self.engine.shortcut_count, 1)
+        self.assertEqual(self.engine.predicates.call_count, 0)
+
+    def test_inside_near_boundary(self):
+        """A child inside the parent but close to its boundary gets the exact test."""
+        self.assertTrue(self.engine.within_any(_square(90.0, -1.0, 2.0)))
+        self.assertGreater(self.engine.predicates.call_count, 0)
+
+    def test_on_boundary(self):
+        """A child crossing the boundary is not within the parent."""
+        self.assertFalse(self.engine.within_any(_square(95.0, -5.0, 10.0)))
+
+    def test_outside(self):
+        """A child outside the parent is not within it, and needs no exact test."""
+        self.assertFalse(self.engine.within_any(_square(150.0, 150.0, 5.0)))
+        self.assertEqual(self.engine.predicates.call_count, 0)
+
+    def test_same_answers_as_exact_test(self):
+        """The cells never change the answer of the exact GEOS test."""
+        parent = QgsGeometry.fromWkt(self.parent_wkt)
+        for x in range(-110, 110, 7):
+            for y in range(-110, 110, 7):
+                child = _square(float(x), float(y), 3.0)
+                with self.subTest(x=x, y=y):
+                    self.assertEqual(self.engine.within_any(child), parent.contains(child))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(ContainmentEngineTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,118 @@
+# coding=utf-8
+"""Duplicate check key test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import os
+import unittest
+
+# No display is needed for memory layers
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from qgis.core import NULL, QgsFeature, QgsProject, QgsVectorLayer
+
+from .utilities import get_qgis_app
+QGIS_APP = get_qgis_app()
+
+from core.check.duplicate_check import DuplicateCheck
+from core.result_store import iter_errors
+
+
+class DuplicateCheckTest(unittest.TestCase):
+    """Test the keys duplicates are counted by: composite keys, NULL parts and normalisation."""
+
+    def setUp(self):
+        self.layer = QgsVectorLayer("NoGeometry?field=site:string&field=asset:string&field=phase:integer",
+                                    'assets', 'memory')
+        features = []
+        for attributes in (
+            ['A1', '0042', 1],
+            ['A1', '0042', 1],
+            ['A1', '0042', 2],
+            [' a1 ', '0042', 1],
+            ['A1', NULL, 1],
+            ['A1', '', 1],
+            ['NULL', '0007', 3],
+            [NULL, '0007', 3],
+        ):
+            feature = QgsFeature(self.layer.fields())
+            feature.setAttributes(attributes)
+            features.append(feature)
+        self.layer.dataProvider().addFeatures(features)
+        QgsProject.instance().addMapLayer(self.layer)
+
+    def tearDown(self):
+        QgsProject.instance().removeMapLayer(self.layer.id())
+
+    def _check(self, **config):
+        config = dict({'check_type': 'duplicate', 'layer_id': self.layer.id()}, **config)
+        return DuplicateCheck(config)
+
+    def _errors(self, **config):
+        return list(iter_errors(self._check(**config).run()['errors'], 'value', 'count'))
+
+    def test_key_part(self):
+        """NULL and empty values are None, set apart from a 'NULL' text."""
+        checker = self._check(field_name='site')
+        self.assertIsNone(checker._key_part(None))
+        self.assertIsNone(checker._key_part(NULL))
+        self.assertIsNone(checker._key_part(''))
+        self.assertEqual(checker._key_part('NULL'), 'NULL')
+        self.assertEqual(checker._key_part(' A1 '), ' A1 ')
+        self.assertEqual(checker._key_part(42), '42')
+
+    def test_key_part_normalised(self):
+        """Normalised values ignore case and runs of whitespace, blank values are NULL."""
+        checker = self._check(field_name='site', normalise=True)
+        self.assertEqual(checker._key_part('  North   Site '), 'north site')
+        self.assertEqual(checker._key_part('NORTH SITE'), 'north site')
+        self.assertIsNone(checker._key_part('   '))
+
+    def test_display_key(self):
+        """Composite keys are shown with their values joined, NULL parts as NULL."""
+        self.assertEqual(DuplicateCheck._display_key(('A12', '0042', '2')), 'A12 | 0042 | 2')
+        self.assertEqual(DuplicateCheck._display_key(('A12', None)), 'A12 | NULL')
+
+    def test_single_field(self):
+        """A 'NULL' text is not counted with the NULL values."""
+        self.assertEqual(self._errors(field_name='site'), [('A1', 5)])
+        self.assertEqual(self._errors(field_name='asset'), [('0042', 4), (None, 2), ('0007', 2)])
+
+    def test_composite_key(self):
+        """All fields of the key must match, NULL and empty parts are the same NULL."""
+        self.assertEqual(self._errors(field_names=['site', 'asset', 'phase']),
+                         [('A1 | 0042 | 1', 2), ('A1 | NULL | 1', 2)])
+
+    def test_composite_key_normalised(self):
+        """Normalised, ' a1 ' is the same site as 'A1'."""
+        self.assertEqual(self._errors(field_names=['site', 'asset', 'phase'], normalise=True),
+                         [('a1 | 0042 | 1', 3), ('a1 | NULL | 1', 2)])
+
+    def test_composite_key_with_separator(self):
+        """Only the features of a duplicated key match it, even when the joined values look the same."""
+        features = []
+        for attributes in (['S | 1', 'X', 1], ['S | 1', 'X', 1], ['S', '1 | X', 1]):
+            feature = QgsFeature(self.layer.fields())
+            feature.setAttributes(attributes)
+            features.append(feature)
+        self.layer.dataProvider().addFeatures(features)
+
+        checker = self._check(field_names=['site', 'asset'])
+        checker.run()
+        duplicated_keys = checker.duplicated_keys()
+        keys = [checker.error_key(feature) for feature in self.layer.getFeatures() if feature['phase'] == 1
+                and feature['site'] in ('S | 1', 'S')]
+        self.assertEqual(keys, [('S | 1', 'X'), ('S | 1', 'X'), ('S', '1 | X')])
+        self.assertEqual(duplicated_keys[('S | 1', 'X')], 'S | 1 | X')
+        self.assertNotIn(('S', '1 | X'), duplicated_keys)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(DuplicateCheckTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,141 @@
+# coding=utf-8
+"""Join plan and engine test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import os
+import unittest
+
+# No display is needed for memory layers
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from qgis.core import QgsFeature, QgsGeometry, QgsProject, QgsVectorLayer
+
+from .utilities import get_qgis_app
+QGIS_APP = get_qgis_app()
+
+from core.check.spatial_check import SpatialCheck
+from core.check.exclusion_check import ExclusionCheck
+from core.result_store import iter_errors
+
+PLANS = ('forward', 'reverse')
+ENGINES = ('qgis', 'auto')
+
+
+def _memory_layer(geometry_type: str, name: str, rows: list) -> QgsVectorLayer:
+    """Memory layer with a 'code' field, rows are (code, WKT or None for a NULL geometry)."""
+    layer = QgsVectorLayer(f"{geometry_type}?crs=EPSG:27700&field=code:string", name, 'memory')
+    features = []
+    for code, wkt in rows:
+        feature = QgsFeature(layer.fields())
+        feature.setAttributes([code])
+        if wkt:
+            feature.setGeometry(QgsGeometry.fromWkt(wkt))
+        features.append(feature)
+    layer.dataProvider().addFeatures(features)
+    layer.updateExtents()
+    return layer
+
+
+class JoinPlannerTest(unittest.TestCase):
+    """The errors of a check don't depend on the join plan or the engine."""
+
+    def setUp(self):
+        self.parents = _memory_layer('Polygon', 'sites', [
+            ('S1', 'POLYGON((0 0, 10 0, 10 10, 0 10, 0 0))'),
+            ('S2', 'POLYGON((20 0, 30 0, 30 10, 20 10, 20 0))'),
+            ('S3', None),
+        ])
+        self.point_children = _memory_layer('Point', 'poles', [
+            ('P1', 'POINT(5 5)'),
+            ('P2', 'POINT(15 5)'),
+            ('P3', None),
+            ('P4', 'POINT(25 5)'),
+            ('P5', 'POINT(40 40)'),
+        ])
+        self.polygon_children = _memory_layer('Polygon', 'plots', [
+            ('A1', 'POLYGON((1 1, 4 1, 4 4, 1 4, 1 1))'),
+            ('A2', 'POLYGON((8 2, 22 2, 22 4, 8 4, 8 2))'),
+            ('A3', None),
+            ('A4', 'POLYGON((21 1, 29 1, 29 9, 21 9, 21 1))'),
+            ('A5', 'POLYGON((12 12, 14 12, 14 14, 12 14, 12 12))'),
+        ])
+        self.layers = [self.parents, self.point_children, self.polygon_children]
+        QgsProject.instance().addMapLayers(self.layers)
+
+    def tearDown(self):
+        QgsProject.instance().removeMapLayers([layer.id() for layer in self.layers])
+
+    def _spatial_errors(self, child_layer, plan, engine):
+        checker = SpatialCheck({
+            'check_type': 'spatial', 'parent_id': self.parents.id(), 'child_id': child_layer.id(),
+            'child_unique_field': 'code', 'plan': plan, 'engine': engine,
+        })
+        return list(iter_errors(checker.run()['errors'], 'child_id', 'fid'))
+
+    def _exclusion_errors(self, target_layer, plan, engine):
+        checker = ExclusionCheck({
+            'check_type': 'exclusion', 'target_id': target_layer.id(), 'exclusion_id': self.parents.id(),
+            'target_unique_field': 'code', 'plan': plan, 'engine': engine,
+        })
+        return list(iter_errors(checker.run()['errors'], 'target_id', 'fid'))
+
+    def test_spatial_plans(self):
+        """Children outside all parents, NULL geometries included, whatever the plan and engine."""
+        expected = {
+            self.point_children.name(): ['P2', 'P3', 'P5'],
+            self.polygon_children.name(): ['A2', 'A3', 'A5'],
+        }
+        for child_layer in (self.point_children, self.polygon_children):
+            reference = self._spatial_errors(child_layer, 'forward', 'qgis')
+            self.assertEqual([child_id for child_id, _ in reference], expected[child_layer.name()])
+            for plan in PLANS:
+                for engine in ENGINES:
+                    with self.subTest(layer=child_layer.name(), plan=plan, engine=engine):
+                        self.assertEqual(self._spatial_errors(child_layer, plan, engine), reference)
+
+    def test_exclusion_plans(self):
+        """Targets in an exclusion zone, NULL geometries never are, whatever the plan and engine."""
+        expected = {
+            self.point_children.name(): ['P1', 'P4'],
+            self.polygon_children.name(): ['A1', 'A2', 'A4'],
+        }
+        for target_layer in (self.point_children, self.polygon_children):
+            reference = self._exclusion_errors(target_layer, 'forward', 'qgis')
+            self.assertEqual([target_id for target_id, _ in reference], expected[target_layer.name()])
+            for plan in PLANS:
+                for engine in ENGINES:
+                    with self.subTest(layer=target_layer.name(), plan=plan, engine=engine):
+                        self.assertEqual(self._exclusion_errors(target_layer, plan, engine), reference)
+
+    def test_curved_geometries(self):
+        """Curved parents and children are segmentized for the STRtree, the errors don't change."""
+        curved_parents = _memory_layer('CurvePolygon', 'curved sites', [
+            ('S1', 'CURVEPOLYGON(CIRCULARSTRING(0 0, 10 10, 20 0, 10 -10, 0 0))'),
+        ])
+        curved_children = _memory_layer('MultiSurface', 'curved plots', [
+            ('C1', 'MULTISURFACE(CURVEPOLYGON(CIRCULARSTRING(8 0, 10 2, 12 0, 10 -2, 8 0)))'),
+            ('C2', 'MULTISURFACE(CURVEPOLYGON(CIRCULARSTRING(38 0, 40 2, 42 0, 40 -2, 38 0)))'),
+        ])
+        QgsProject.instance().addMapLayers([curved_parents, curved_children])
+        self.layers.extend([curved_parents, curved_children])
+        self.parents = curved_parents
+
+        for plan in PLANS:
+            for engine in ENGINES:
+                with self.subTest(plan=plan, engine=engine):
+                    spatial = self._spatial_errors(curved_children, plan, engine)
+                    self.assertEqual([child_id for child_id, _ in spatial], ['C2'])
+                    exclusion = self._exclusion_errors(curved_children, plan, engine)
+                    self.assertEqual([target_id for target_id, _ in exclusion], ['C1'])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(JoinPlannerTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,57 @@
+# coding=utf-8
+"""Error store test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import unittest
+
+from core.result_store import ErrorStore, iter_errors
+
+
+class ErrorStoreTest(unittest.TestCase):
+    """Test the columnar list of errors."""
+
+    def _errors(self):
+        return [
+            {'child_id': 12, 'fid': 1},
+            {'child_id': 'A-7', 'fid': 2},
+            {'child_id': None, 'fid': 3},
+            {'child_id': 'A-7', 'fid': 5},
+            {'child_id': 2 ** 70, 'fid': 8},
+        ]
+
+    def test_behaves_like_a_list(self):
+        """Iterates as the dictionaries it was given, in order."""
+        store = ErrorStore((('child_id', 'value'), ('fid', 'int')), spill_rows=0)
+        self.assertFalse(store)
+        for error in self._errors():
+            store.add(error['child_id'], error['fid'])
+        self.assertTrue(store)
+        self.assertEqual(len(store), 5)
+        self.assertEqual(list(store), self._errors())
+        self.assertEqual(list(iter_errors(store, 'fid')), [(1,), (2,), (3,), (5,), (8,)])
+        # The repeated value is stored once
+        self.assertEqual(store._values, ['A-7', 2 ** 70])
+
+    def test_spill(self):
+        """Rows written to disk come back in order, after the ones in memory."""
+        store = ErrorStore((('value', 'value'), ('count', 'int')), spill_rows=2)
+        errors = [{'value': f"V{i % 3}", 'count': i} for i in range(7)]
+        store.extend(errors)
+        self.assertEqual(store.spill_count, 3)
+        self.assertEqual(len(store), 7)
+        self.assertEqual(list(store), errors)
+        # Iterating twice reads the spill file again
+        self.assertEqual(list(store.iter_rows('count')), [(i,) for i in range(7)])
+        store.close()
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(ErrorStoreTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
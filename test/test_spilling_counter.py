@@ -0,0 +1,58 @@
+# coding=utf-8
+"""Spilling counter test.
+
+.. note:: This program is free software; you can redistribute it and/or modify
+     it under the terms of the GNU General Public License as published by
+     the Free Software Foundation; either version 2 of the License, or
+     (at your option) any later version.
+
+"""
+
+import random
+import unittest
+
+from core.check.spilling_counter import SpillingCounter
+
+
+class SpillingCounterTest(unittest.TestCase):
+    """Test the bounded memory duplicate count."""
+
+    def _dict_duplicates(self, values):
+        counts = {}
+        for value in values:
+            counts[value] = counts.get(value, 0) + 1
+        return [(k, v) for k, v in counts.items() if v > 1]
+
+    def test_in_memory(self):
+        """Without reaching the limit nothing is spilled."""
+        counter = SpillingCounter(memory_limit_mb=10)
+        for value in ['a', 'b', 'a', 'c', 'b', 'a']:
+            counter.add(value)
+        self.assertEqual(counter.duplicates(), [('a', 3), ('b', 2)])
+        self.assertEqual(counter.spill_count, 0)
+
+    def test_spilled_same_as_dict(self):
+        """A spilled count finds the same duplicates, in the same order."""
+        random.seed(1)
+        values = [f"V{random.randrange(5000)}" for _ in range(20000)]
+        counter = SpillingCounter(memory_limit_mb=0.05, partitions=8)
+        for value in values:
+            counter.add(value)
+        self.assertEqual(counter.duplicates(), self._dict_duplicates(values))
+        self.assertGreater(counter.spill_count, 1)
+
+    def test_partition_split_while_merging(self):
+        """Partitions with more distinct values than the limit are split, the result stays the same."""
+        random.seed(2)
+        values = [f"V{random.randrange(20000)}" for _ in range(40000)]
+        counter = SpillingCounter(memory_limit_mb=0.05, partitions=2)
+        for value in values:
+            counter.add(value)
+        self.assertEqual(counter.duplicates(), self._dict_duplicates(values))
+        self.assertGreater(counter.split_count, 0)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(SpillingCounterTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)